@@ -0,0 +1,255 @@
+"""Synthetic expense data for benchmarks.
+
+Rows are drawn from a seeded generator, so that the same
+arguments always produce the same data. Dates run forward at a
+steady rate, several expenses per day, with monthly rent and
+bills on fixed days; amounts follow a log-normal distribution
+per type.
+
+Functions
+-----------------------
+generateRows()
+    Yield synthetic (date, type, amount, justification) rows.
+writeCSV()
+    Write synthetic rows to a CSV file.
+writeDB()
+    Create a database filled with synthetic rows.
+main()
+    Generate a CSV file and/or a database from the shell.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from collections.abc import Iterator
+import argparse
+import csv
+import datetime
+import math
+import random
+
+
+# first date of the generated data
+START_DATE = datetime.date(2000, 1, 1)
+# longest generated span, keeping dates within 4 digit years
+MAX_YEARS = 50
+# expenses per year at which the span stops growing
+ROWS_PER_YEAR = 10000
+# rows bound per batch when filling databases
+INSERT_CHUNK_SIZE = 5000
+
+# type -> (weight, median amount, log-normal sigma, words)
+DAILY_TYPES = {
+    "f": (0.45, 12.0, 0.8, ["groceries", "lunch", "dinner", "coffee"]),
+    "t": (0.20, 8.0, 0.9, ["bus", "train", "fuel", "taxi"]),
+    "s": (0.15, 35.0, 1.0, ["clothes", "books", "electronics", "gifts"]),
+    "e": (0.12, 25.0, 0.9, ["cinema", "concert", "restaurant", "trip"]),
+    "m": (0.08, 40.0, 1.1, ["pharmacy", "doctor", "dentist", "insurance"]),
+}
+
+# type -> (day of month, amount, justification)
+MONTHLY_TYPES = {
+    "h": (1, 850.0, "rent"),
+    "b": (15, 120.0, "utility bills"),
+}
+
+
+def generateRows(rows: int, seed: int = 0) -> Iterator[tuple]:
+    """Yield synthetic (date, type, amount, justification) rows.
+
+    Parameters
+    -----------------------
+    rows : int
+        Number of rows to generate
+    seed : int
+        Seed of the random generator
+
+    Yields
+    -----------------------
+    tuple[str, str, float, str]
+        Expense rows, in date order
+    """
+    rng = random.Random(seed)
+
+    years = min(MAX_YEARS, max(1, math.ceil(rows / ROWS_PER_YEAR)))
+    days = (START_DATE.replace(year=START_DATE.year + years) - START_DATE).days
+
+    types = list(DAILY_TYPES)
+    weights = [DAILY_TYPES[t][0] for t in types]
+
+    # fixed monthly expenses first, one per matching day
+    monthly = {spec[0]: (etype, spec) for etype, spec in MONTHLY_TYPES.items()}
+    lastDay = -1
+
+    for ir in range(rows):
+        day = ir * days // rows
+        date = START_DATE + datetime.timedelta(days=day)
+
+        if day != lastDay and date.day in monthly:
+            lastDay = day
+            etype, (_, amount, word) = monthly[date.day]
+            # small yearly increases
+            amount *= 1.02 ** (day // 365)
+            yield (date.isoformat(), etype, round(amount, 2), word)
+            continue
+
+        etype = rng.choices(types, weights)[0]
+        _, median, sigma, words = DAILY_TYPES[etype]
+        amount = round(rng.lognormvariate(math.log(median), sigma), 2)
+        yield (date.isoformat(), etype, amount, rng.choice(words))
+
+
+def writeCSV(filename: str, rows: int, seed: int = 0):
+    """Write synthetic rows to a CSV file.
+
+    The file is in the format read by importCSV(), with empty
+    ids so that it can be appended to any database.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the output CSV file
+    rows : int
+        Number of rows to generate
+    seed : int
+        Seed of the random generator
+    """
+    with open(filename, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile, quotechar='"')
+        writer.writerows(("",) + row for row in generateRows(rows, seed))
+
+
+def writeDB(filename: str, rows: int, seed: int = 0):
+    """Create a database filled with synthetic rows.
+
+    Requires a QCoreApplication instance.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the database, must not exist
+    rows : int
+        Number of rows to generate
+    seed : int
+        Seed of the random generator
+
+    Raises
+    -----------------------
+    - DatabaseError if database exists
+    - DatabaseError if connection or insertion errors
+    """
+    # pylint: disable=import-outside-toplevel
+    import os
+
+    from PyQt6.QtSql import QSqlQuery
+
+    from modules.Database import DatabaseError, connect, disconnect
+    from modules.Schema import createSchema
+
+    if os.path.isfile(filename):
+        raise DatabaseError("Database already exists")
+
+    name = "sem-generate"
+    conn = connect(filename, name)
+    createSchema(conn)
+
+    query = QSqlQuery(conn)
+    query.prepare(
+        """
+        INSERT INTO expenses (date, type, amount, justification)
+        VALUES (?, ?, ?, ?) ;
+    """
+    )
+
+    conn.transaction()
+
+    chunk = []
+    for row in generateRows(rows, seed):
+        chunk.append(row)
+        if len(chunk) == INSERT_CHUNK_SIZE:
+            _insertChunk(query, chunk)
+            chunk = []
+    _insertChunk(query, chunk)
+
+    query.finish()
+    if not conn.commit():
+        raise DatabaseError(conn.lastError().text())
+
+    del query, conn
+    disconnect(name)
+
+
+def _insertChunk(query, chunk: list[tuple]):
+    """Insert a chunk of rows with a batch-bound statement.
+
+    Parameters
+    -----------------------
+    query : QSqlQuery
+        Prepared INSERT statement
+    chunk : list[tuple]
+        Rows to insert
+
+    Raises
+    -----------------------
+    - DatabaseError if insertion errors
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.Database import DatabaseError
+
+    if not chunk:
+        return
+
+    for col in zip(*chunk):
+        query.addBindValue(list(col))
+
+    if not query.execBatch():
+        raise DatabaseError(query.lastError().text())
+
+
+def main():
+    """Generate a CSV file and/or a database from the shell."""
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic expense data."
+    )
+    parser.add_argument("rows", type=int, help="number of rows")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--csv", metavar="FILE", help="CSV file to write")
+    parser.add_argument("--db", metavar="FILE", help="database to create")
+    args = parser.parse_args()
+
+    if args.csv is not None:
+        writeCSV(args.csv, args.rows, args.seed)
+
+    if args.db is not None:
+        # pylint: disable=import-outside-toplevel
+        from PyQt6.QtCore import QCoreApplication
+
+        app = QCoreApplication([])
+        writeDB(args.db, args.rows, args.seed)
+        del app
+
+
+if __name__ == "__main__":
+    main()
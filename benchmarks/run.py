@@ -0,0 +1,378 @@
+"""Benchmarks of the database operations of ModelWrapper.
+
+Each operation is timed `repeat` times per scale on synthetic
+data, and its best and median wall times are stored as JSON.
+Results can be compared to a saved baseline: operations slower
+than the baseline by more than `threshold` are reported as
+regressions, and make the run exit with status 1.
+
+Functions
+-----------------------
+runBenchmarks()
+    Time every operation at the given scales.
+compareResults()
+    Return the regressions of results with respect to a baseline.
+main()
+    Run the benchmarks from the shell.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from collections.abc import Callable
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+
+# default number of rows of the benchmark databases
+DEFAULT_SCALES = [10000, 100000]
+# default number of runs of each operation
+DEFAULT_REPEAT = 3
+# default slowdown reported as a regression
+DEFAULT_THRESHOLD = 0.2
+# fraction of the rows deleted by removeRecords()
+REMOVE_FRACTION = 0.1
+# profile of the benchmark databases
+DEFAULT_PROFILE = "balanced"
+
+
+def runBenchmarks(
+    scales: list[int], repeat: int, seed: int, workdir: str, profile: str
+) -> dict:
+    """Time every operation at the given scales.
+
+    Requires a QApplication instance.
+
+    Parameters
+    -----------------------
+    scales : list[int]
+        Numbers of rows of the benchmark data
+    repeat : int
+        Number of runs of each operation
+    seed : int
+        Seed of the data generator
+    workdir : str
+        Directory for the generated files
+    profile : str
+        Database performance profile
+
+    Returns
+    -----------------------
+    dict
+        Environment of the run, and {scale: {operation: timings}}
+    """
+    # pylint: disable=import-outside-toplevel
+    from PyQt6.QtCore import QT_VERSION_STR, QPersistentModelIndex
+
+    from benchmarks.generate import START_DATE, writeCSV, writeDB
+    from modules.Database import DatabaseError
+    from modules.ModelWrapper import ModelWrapper
+
+    results = {}
+
+    for rows in scales:
+        print(f"{rows} rows: generating data", file=sys.stderr)
+
+        source = os.path.join(workdir, f"source-{rows}.db")
+        csvfile = os.path.join(workdir, f"source-{rows}.csv")
+        writeDB(source, rows, seed)
+        writeCSV(csvfile, rows, seed)
+
+        # about the first year of data
+        dates = [
+            START_DATE.isoformat(),
+            START_DATE.replace(year=START_DATE.year + 1).isoformat(),
+        ]
+
+        db = os.path.join(workdir, "bench.db")
+        output = os.path.join(workdir, "bench.csv")
+
+        wrapper = ModelWrapper(None, profile)
+        timings = {}
+
+        def fresh(copy: bool = True) -> ModelWrapper:
+            """Close the wrapper, and restore the source database."""
+            try:
+                wrapper.closeDB()
+            except DatabaseError:
+                # nothing open yet
+                pass
+
+            _remove(db)
+            if copy:
+                shutil.copyfile(source, db)
+            return wrapper
+
+        def create():
+            fresh(False)
+            return lambda: wrapper.createDB(db)
+
+        def openDB():
+            fresh()
+            return lambda: wrapper.openDB(db)
+
+        def initModels():
+            fresh().openDB(db)
+            return wrapper.initModels
+
+        def applyDateFilter():
+            fresh().openDB(db)
+            wrapper.initModels()
+            return lambda: _filterAndFetch(wrapper, dates)
+
+        def importCSV():
+            fresh(False).createDB(db)
+            wrapper.initModels()
+            return lambda: wrapper.importCSV(csvfile)
+
+        def saveCSV():
+            fresh().openDB(db)
+            wrapper.initModels()
+            _remove(output)
+            return lambda: wrapper.saveCSV(output)
+
+        def removeRecords():
+            fresh().openDB(db)
+            wrapper.initModels()
+            model = wrapper.listModel
+            indices = [
+                QPersistentModelIndex(model.index(row, 0))
+                for row in range(int(model.rowCount() * REMOVE_FRACTION))
+            ]
+            return lambda: wrapper.removeRecords(indices)
+
+        for name, setup in [
+            ("createDB", create),
+            ("openDB", openDB),
+            ("initModels", initModels),
+            ("applyDateFilter", applyDateFilter),
+            ("importCSV", importCSV),
+            ("saveCSV", saveCSV),
+            ("removeRecords", removeRecords),
+        ]:
+            print(f"{rows} rows: {name}", file=sys.stderr)
+            timings[name] = _time(setup, repeat)
+
+        fresh(False)
+        del wrapper
+
+        results[str(rows)] = timings
+
+    return {
+        "environment": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+            "profile": profile,
+        },
+        "results": results,
+    }
+
+
+def _filterAndFetch(wrapper, dates: list[str]):
+    """Apply a date filter, and read the first row as a view would.
+
+    Parameters
+    -----------------------
+    wrapper : ModelWrapper
+        Wrapper with initialized models
+    dates : list[str]
+        [startDate, endDate], both included
+    """
+    wrapper.applyDateFilter(dates)
+
+    model = wrapper.listModel
+    for column in range(model.columnCount()):
+        model.data(model.index(0, column))
+
+
+def _time(setup: Callable[[], Callable], repeat: int) -> dict:
+    """Time an operation.
+
+    Parameters
+    -----------------------
+    setup : Callable[[], Callable]
+        Prepares a run, untimed, and returns the operation
+    repeat : int
+        Number of runs
+
+    Returns
+    -----------------------
+    dict
+        Best and median wall times in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        operation = setup()
+        start = time.perf_counter()
+        operation()
+        times.append(time.perf_counter() - start)
+
+    return {"min": min(times), "median": statistics.median(times)}
+
+
+def _remove(filename: str):
+    """Remove a file if it exists.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the file
+    """
+    if os.path.isfile(filename):
+        os.remove(filename)
+
+
+def compareResults(
+    results: dict, baseline: dict, threshold: float
+) -> list[str]:
+    """Return the regressions of results with respect to a baseline.
+
+    Best times are compared, for the scales and operations
+    present in both.
+
+    Parameters
+    -----------------------
+    results : dict
+        Results of runBenchmarks()
+    baseline : dict
+        Results of a previous run
+    threshold : float
+        Relative slowdown reported as a regression
+
+    Returns
+    -----------------------
+    list[str]
+        One description per regression
+    """
+    regressions = []
+
+    for scale, timings in results["results"].items():
+        reference = baseline["results"].get(scale, {})
+
+        for name, timing in timings.items():
+            if name not in reference:
+                continue
+
+            ratio = timing["min"] / reference[name]["min"]
+            line = (
+                f"{scale:>10} {name:<16} {reference[name]['min']:10.4f}s"
+                f" -> {timing['min']:10.4f}s ({ratio:5.2f}x)"
+            )
+
+            if ratio > 1.0 + threshold:
+                regressions.append(line)
+                line += "  REGRESSION"
+
+            print(line, file=sys.stderr)
+
+    return regressions
+
+
+def main():
+    """Run the benchmarks from the shell."""
+    parser = argparse.ArgumentParser(
+        description="Time the database operations of sem-qt6."
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SCALES,
+        help="numbers of rows of the benchmark data",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="number of runs of each operation",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the data generator"
+    )
+    parser.add_argument(
+        "--profile",
+        default=DEFAULT_PROFILE,
+        help="database performance profile",
+    )
+    parser.add_argument(
+        "--output", metavar="FILE", help="JSON file to store the results"
+    )
+    parser.add_argument(
+        "--baseline", metavar="FILE", help="JSON results to compare with"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="relative slowdown reported as a regression",
+    )
+    args = parser.parse_args()
+
+    # no display required
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    # each run replaces the default connection
+    os.environ.setdefault("QT_LOGGING_RULES", "qt.sql.qsqldatabase=false")
+
+    # pylint: disable=import-outside-toplevel
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication([])
+
+    with tempfile.TemporaryDirectory(prefix="sem-bench-") as workdir:
+        results = runBenchmarks(
+            args.rows, args.repeat, args.seed, workdir, args.profile
+        )
+
+    del app
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+        if compareResults(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,644 @@
+"""Vectorized expense analytics.
+
+The id, date, type and amount columns of the expenses are
+loaded once into NumPy arrays, sorted by date, and statistics
+are computed on them without further queries. The arrays can
+be cached on disk, and memory-mapped by later loads until the
+database files change (size or modification time, including
+the write-ahead log).
+
+Requires the optional `numpy` package.
+
+Classes
+-----------------------
+Analytics
+    Expense columns in NumPy arrays, and statistics on them.
+
+Functions
+-----------------------
+fingerprint()
+    Return the state of database files, for cache invalidation.
+loadAnalytics()
+    Load the expense columns, from the cache if up to date.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import hashlib
+import json
+import os
+
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from modules import SqlTrace
+from modules.Database import DatabaseError
+
+
+# computed percentiles of the amounts of each type
+PERCENTILES = [5, 25, 50, 75, 95]
+# number of months of rolling averages
+ROLLING_WINDOW = 3
+# interquartile ranges beyond the quartiles of outliers
+OUTLIER_FACTOR = 1.5
+
+# statistics, with their column names
+STATISTICS = {
+    "percentiles": ["type", "count"] + [f"p{p}" for p in PERCENTILES],
+    "rolling": ["month", "total", "average"],
+    "balance": ["date", "total", "balance"],
+    "outliers": ["id", "date", "type", "amount"],
+}
+
+# format version of the cache, bumped on layout changes
+CACHE_VERSION = 1
+# arrays of the cache, one .npy file each
+CACHE_ARRAYS = ["ids", "days", "types", "amounts"]
+
+
+class Analytics:
+    """Expense columns in NumPy arrays, and statistics on them.
+
+    Statistics accept a date range, selected by binary search
+    on the sorted dates. Amounts in the results are rounded to
+    2 decimal places.
+
+    Private attributes
+    -----------------------
+    __ids: numpy.ndarray
+        Ids of the expenses (int64)
+    __days: numpy.ndarray
+        Dates of the expenses, sorted (datetime64[D])
+    __types: numpy.ndarray
+        Types of the expenses (unicode)
+    __amounts: numpy.ndarray
+        Amounts of the expenses (float64)
+
+    Public methods
+    -----------------------
+    __init__(dict[str, numpy.ndarray])
+        Construct class instance.
+    arrays() -> dict[str, numpy.ndarray]
+        Return the arrays, by name.
+    table(str, list[str]) -> tuple[list[str], list[list]]
+        Return a statistic by name, with its column names.
+    percentiles(list[str]) -> list[list]
+        Return count and amount percentiles of each type.
+    rollingAverages(list[str], int) -> list[list]
+        Return monthly totals and their rolling averages.
+    runningBalance(list[str]) -> list[list]
+        Return daily totals and their cumulative sum.
+    outliers(list[str], float) -> list[list]
+        Return the expenses far from the amounts of their type.
+
+    Private methods
+    -----------------------
+    __select(list[str]) -> slice
+        Return the slice of the arrays in a date range.
+    """
+
+    def __init__(self, arrays: dict):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        arrays : dict[str, numpy.ndarray]
+            One array per name in CACHE_ARRAYS, sorted by date
+        """
+        self.__ids = arrays["ids"]
+        self.__days = arrays["days"]
+        self.__types = arrays["types"]
+        self.__amounts = arrays["amounts"]
+
+    def arrays(self) -> dict:
+        """Return the arrays, by name.
+
+        Returns
+        -----------------------
+        dict[str, numpy.ndarray]
+            One array per name in CACHE_ARRAYS
+        """
+        return {
+            "ids": self.__ids,
+            "days": self.__days,
+            "types": self.__types,
+            "amounts": self.__amounts,
+        }
+
+    def table(
+        self, statistic: str, dates: list[str] = None
+    ) -> tuple[list[str], list[list]]:
+        """Return a statistic by name, with its column names.
+
+        Parameters
+        -----------------------
+        statistic : str
+            A key of STATISTICS
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` uses all expenses
+
+        Returns
+        -----------------------
+        tuple[list[str], list[list]]
+            Column names, and rows of the statistic
+
+        Raises
+        -----------------------
+        - DatabaseError if unknown statistic
+        - DatabaseError if invalid date range
+        """
+        methods = {
+            "percentiles": self.percentiles,
+            "rolling": self.rollingAverages,
+            "balance": self.runningBalance,
+            "outliers": self.outliers,
+        }
+
+        if statistic not in methods:
+            raise DatabaseError(f"Unknown statistic '{statistic}'")
+
+        return STATISTICS[statistic], methods[statistic](dates)
+
+    def percentiles(self, dates: list[str] = None) -> list[list]:
+        """Return count and amount percentiles of each type.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` uses all expenses
+
+        Returns
+        -----------------------
+        list[list]
+            [type, count, percentiles...] rows, by type
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid date range
+        """
+        s = self.__select(dates)
+        labels, counts, values = _quantiles(
+            self.__types[s], self.__amounts[s], PERCENTILES
+        )
+
+        return [
+            [label, count] + row
+            for label, count, row in zip(
+                labels.tolist(), counts.tolist(), values.round(2).tolist()
+            )
+        ]
+
+    def rollingAverages(
+        self, dates: list[str] = None, window: int = ROLLING_WINDOW
+    ) -> list[list]:
+        """Return monthly totals and their rolling averages.
+
+        Months without expenses count as zero; the first months
+        are averaged over the available ones.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` uses all expenses
+        window : int
+            Number of months of each average
+
+        Returns
+        -----------------------
+        list[list]
+            [month ('yyyy-mm'), total, average] rows, by month
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid date range
+        """
+        s = self.__select(dates)
+        if s.start == s.stop:
+            return []
+
+        months = self.__days[s].astype("datetime64[M]")
+        index = (months - months[0]).astype("int64")
+        totals = numpy.bincount(index, weights=self.__amounts[s])
+
+        cumulative = numpy.concatenate(([0.0], numpy.cumsum(totals)))
+        ends = numpy.arange(1, totals.size + 1)
+        starts = numpy.maximum(ends - window, 0)
+        averages = (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+        labels = numpy.arange(months[0], months[0] + totals.size)
+
+        return [
+            [label, total, average]
+            for label, total, average in zip(
+                labels.astype(str).tolist(),
+                totals.round(2).tolist(),
+                averages.round(2).tolist(),
+            )
+        ]
+
+    def runningBalance(self, dates: list[str] = None) -> list[list]:
+        """Return daily totals and their cumulative sum.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` uses all expenses
+
+        Returns
+        -----------------------
+        list[list]
+            [date, total, balance] rows, for each day with
+            expenses
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid date range
+        """
+        s = self.__select(dates)
+        if s.start == s.stop:
+            return []
+
+        days = self.__days[s]
+
+        # first expense of each day, dates being sorted
+        starts = numpy.flatnonzero(
+            numpy.concatenate(([True], days[1:] != days[:-1]))
+        )
+        totals = numpy.add.reduceat(self.__amounts[s], starts)
+        balances = numpy.cumsum(totals)
+
+        return [
+            [day, total, balance]
+            for day, total, balance in zip(
+                days[starts].astype(str).tolist(),
+                totals.round(2).tolist(),
+                balances.round(2).tolist(),
+            )
+        ]
+
+    def outliers(
+        self, dates: list[str] = None, factor: float = OUTLIER_FACTOR
+    ) -> list[list]:
+        """Return the expenses far from the amounts of their type.
+
+        An amount is an outlier if further than `factor`
+        interquartile ranges from the quartiles of its type.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` uses all expenses
+        factor : float
+            Interquartile ranges beyond the quartiles
+
+        Returns
+        -----------------------
+        list[list]
+            [id, date, type, amount] rows, by date
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid date range
+        """
+        s = self.__select(dates)
+        types, amounts = self.__types[s], self.__amounts[s]
+
+        labels, _, quartiles = _quantiles(types, amounts, [25, 75])
+        spread = factor * (quartiles[:, 1] - quartiles[:, 0])
+        low = quartiles[:, 0] - spread
+        high = quartiles[:, 1] + spread
+
+        # bounds of each expense, from the sorted type labels
+        group = numpy.searchsorted(labels, types)
+        mask = (amounts < low[group]) | (amounts > high[group])
+
+        return [
+            list(row)
+            for row in zip(
+                self.__ids[s][mask].tolist(),
+                self.__days[s][mask].astype(str).tolist(),
+                types[mask].tolist(),
+                amounts[mask].tolist(),
+            )
+        ]
+
+    def __select(self, dates: list[str]) -> slice:
+        """Return the slice of the arrays in a date range.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` selects all expenses
+
+        Returns
+        -----------------------
+        slice
+            Bounds of the range in the sorted arrays
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid date range
+        """
+        if dates is None:
+            return slice(0, self.__days.size)
+
+        try:
+            start, end = (numpy.datetime64(d, "D") for d in dates)
+        except ValueError as err:
+            raise DatabaseError("Invalid date interval") from err
+
+        return slice(
+            int(numpy.searchsorted(self.__days, start, "left")),
+            int(numpy.searchsorted(self.__days, end, "right")),
+        )
+
+
+def _quantiles(types, amounts, percents: list[float]) -> tuple:
+    """Return linear-interpolated percentiles of the amounts of each type.
+
+    All types are processed at once, sorting the amounts by
+    type and amount; results match numpy.percentile().
+
+    Parameters
+    -----------------------
+    types : numpy.ndarray
+        Types of the expenses
+    amounts : numpy.ndarray
+        Amounts of the expenses
+    percents : list[float]
+        Percentiles to compute, in [0, 100]
+
+    Returns
+    -----------------------
+    tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Sorted types, number of expenses of each type, and
+        percentiles (one row per type)
+    """
+    order = numpy.lexsort((amounts, types))
+    sortedTypes, sortedAmounts = types[order], amounts[order]
+
+    labels, starts, counts = numpy.unique(
+        sortedTypes, return_index=True, return_counts=True
+    )
+
+    positions = starts[:, None] + (counts[:, None] - 1) * (
+        numpy.asarray(percents, dtype="float64") / 100.0
+    )
+    lower = numpy.floor(positions).astype("int64")
+    upper = numpy.ceil(positions).astype("int64")
+
+    values = sortedAmounts[lower] + (
+        sortedAmounts[upper] - sortedAmounts[lower]
+    ) * (positions - lower)
+
+    return labels, counts, values
+
+
+def fingerprint(filenames: list[str]) -> list:
+    """Return the state of database files, for cache invalidation.
+
+    Any write to a database changes the size or modification
+    time of its file, or of its write-ahead log.
+
+    Parameters
+    -----------------------
+    filenames : list[str]
+        Paths of the databases
+
+    Returns
+    -----------------------
+    list
+        [path, size, mtime] of each file and log, `None` size and
+        mtime if missing or empty
+    """
+    result = []
+    for filename in filenames:
+        path = os.path.abspath(filename)
+        for path in [path, f"{path}-wal"]:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+
+            # empty logs are created anew by each connection
+            if stat is None or stat.st_size == 0:
+                result.append([path, None, None])
+            else:
+                result.append([path, stat.st_size, stat.st_mtime_ns])
+
+    return result
+
+
+@SqlTrace.traced
+def loadAnalytics(
+    conn: QSqlDatabase,
+    filenames: list[str],
+    cache: str = None,
+    table: str = "expenses",
+) -> Analytics:
+    """Load the expense columns, from the cache if up to date.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    filenames : list[str]
+        Paths of the databases of the connection, for cache
+        invalidation
+    cache : str
+        Cache directory, `None` to always query the database
+    table : str
+        Table or view of the expenses
+
+    Returns
+    -----------------------
+    Analytics
+        The loaded arrays; memory-mapped, read-only arrays if
+        read from the cache
+
+    Raises
+    -----------------------
+    - DatabaseError if numpy is not installed
+    - DatabaseError if query errors
+    """
+    if numpy is None:
+        raise DatabaseError("Analytics require the 'numpy' package")
+
+    # taken before querying, later writes invalidate the cache
+    key = fingerprint(filenames)
+
+    directory = None
+    if cache is not None:
+        name = hashlib.sha1(
+            "\n".join(os.path.abspath(f) for f in filenames).encode()
+        ).hexdigest()
+        directory = os.path.join(cache, "analytics", name)
+
+        arrays = _readCache(directory, key)
+        if arrays is not None:
+            return Analytics(arrays)
+
+    arrays = _queryArrays(conn, table)
+
+    if directory is not None:
+        _writeCache(directory, key, arrays)
+
+    return Analytics(arrays)
+
+
+def _queryArrays(conn: QSqlDatabase, table: str) -> dict:
+    """Read the expense columns into arrays.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    table : str
+        Table or view of the expenses
+
+    Returns
+    -----------------------
+    dict[str, numpy.ndarray]
+        One array per name in CACHE_ARRAYS, sorted by date
+
+    Raises
+    -----------------------
+    - DatabaseError if query errors
+    """
+    query = QSqlQuery(conn)
+    # no caching of rows already read
+    query.setForwardOnly(True)
+
+    if not SqlTrace.execQuery(
+        query,
+        f"""
+        SELECT id, date, type, amount
+        FROM {table}
+        ORDER BY date, id ;
+    """,
+    ):
+        raise DatabaseError(query.lastError().text())
+
+    ids, days, types, amounts = [], [], [], []
+    value = query.value
+    while query.next():
+        ids.append(value(0))
+        days.append(value(1))
+        types.append(value(2))
+        amounts.append(value(3))
+
+    query.finish()
+    SqlTrace.fetched(len(ids))
+
+    return {
+        "ids": numpy.array(ids, dtype="int64"),
+        "days": numpy.array(days, dtype="datetime64[D]"),
+        "types": numpy.array(types, dtype="U1"),
+        "amounts": numpy.array(amounts, dtype="float64"),
+    }
+
+
+def _readCache(directory: str, key: list) -> dict:
+    """Memory-map the cached arrays, if up to date.
+
+    Parameters
+    -----------------------
+    directory : str
+        Cache directory of the databases
+    key : list
+        Current fingerprint of the databases
+
+    Returns
+    -----------------------
+    dict[str, numpy.ndarray]
+        The read-only arrays, `None` if missing or outdated
+    """
+    try:
+        with open(
+            os.path.join(directory, "meta.json"), encoding="utf-8"
+        ) as metafile:
+            meta = json.load(metafile)
+
+        if meta != {"version": CACHE_VERSION, "fingerprint": key}:
+            return None
+
+        return {
+            name: numpy.load(
+                os.path.join(directory, f"{name}.npy"), mmap_mode="r"
+            )
+            for name in CACHE_ARRAYS
+        }
+    except (OSError, ValueError):
+        return None
+
+
+def _writeCache(directory: str, key: list, arrays: dict):
+    """Write the arrays to the cache.
+
+    Files are replaced atomically, so that arrays mapped by
+    other processes stay valid. Errors are ignored, the cache
+    being only an optimization.
+
+    Parameters
+    -----------------------
+    directory : str
+        Cache directory of the databases
+    key : list
+        Fingerprint of the databases, when the arrays were read
+    arrays : dict[str, numpy.ndarray]
+        One array per name in CACHE_ARRAYS
+    """
+    meta = os.path.join(directory, "meta.json")
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+
+        # invalidating the cache while arrays are replaced
+        if os.path.exists(meta):
+            os.remove(meta)
+
+        for name in CACHE_ARRAYS:
+            path = os.path.join(directory, f"{name}.npy")
+            with open(f"{path}.tmp", "wb") as npyfile:
+                numpy.save(npyfile, arrays[name])
+            os.replace(f"{path}.tmp", path)
+
+        with open(f"{meta}.tmp", "w", encoding="utf-8") as metafile:
+            json.dump({"version": CACHE_VERSION, "fingerprint": key}, metafile)
+        os.replace(f"{meta}.tmp", meta)
+    except OSError:
+        pass
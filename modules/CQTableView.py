@@ -31,20 +31,70 @@ CQTableView
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+from PyQt6 import QtCore
+from PyQt6.QtCore import QAbstractItemModel, QModelIndex
 from PyQt6.QtGui import QColor, QPalette
 from PyQt6.QtWidgets import QWidget, QHeaderView, QTableView
 
 
+# number of rows sampled at each end of the model for column widths
+SAMPLE_ROWS = 50
+
+
 class CQTableView(QTableView):
     """Custom QTableView.
 
     Builtin column width/sorting behavior and coloring
     routines.
 
+    Column widths fit the contents of a bounded sample of rows
+    (head, tail and visible ones) instead of all of them, and
+    are cached for each model until its rows are inserted or
+    removed. Resets of the model (sorting, filtering) keep the
+    cached widths, only widened to fit the visible rows.
+    Columns resized by the user keep their width for as long
+    as the model is shown, unless its columns change.
+
+    Private attributes
+    -----------------------
+    __widths: dict[int, dict[int, int]]
+        Cached column widths, by model id and column
+    __userWidths: dict[int, dict[int, int]]
+        Widths set by the user, by model id and column
+    __resizing: bool
+        Whether columns are being resized by the view or by a
+        model reset, not by the user
+
     Public methods
     -----------------------
     __init__(parent: QWidget)
         Constructor
+    setModel(QAbstractItemModel)
+        Set model and fit columns to its contents.
+
+    Private methods
+    -----------------------
+    __sampleRows() -> list[int]
+        Return the rows measured to fit columns.
+    __visibleRows() -> range
+        Return the rows in the viewport.
+    __columnWidth(int, list[int] | range) -> int
+        Return the width fitting the given rows of a column.
+    __applyWidths()
+        Resize columns to the cached widths.
+
+    Private slots
+    -----------------------
+    __fitColumns()
+        Recompute and apply the widths of all columns.
+    __holdWidths()
+        Ignore column resizes until the model is reset.
+    __refitColumns()
+        Apply the cached widths, widened to the visible rows.
+    __growColumns(QModelIndex, QModelIndex)
+        Widen columns to fit changed fields.
+    __recordWidth(int, int, int)
+        Record the width of a column resized by the user.
     """
 
     def __init__(self, parent: QWidget):
@@ -68,13 +118,213 @@ class CQTableView(QTableView):
         p.setBrush(QPalette.ColorRole.AlternateBase, gray)
         self.setPalette(p)
 
-        # autosize columns
+        # columns are autosized on samples, resizable by the user
         self.horizontalHeader().setSectionResizeMode(
-            QHeaderView.ResizeMode.ResizeToContents
+            QHeaderView.ResizeMode.Interactive
         )
+        self.__widths = {}
+        self.__userWidths = {}
+        self.__resizing = False
+        self.horizontalHeader().sectionResized.connect(self.__recordWidth)
 
         # sets last column to take all available space
         self.horizontalHeader().setStretchLastSection(True)
 
         # alternating row colors
         self.setAlternatingRowColors(True)
+
+    def setModel(self, model: QAbstractItemModel):
+        """Set model and fit columns to its contents.
+
+        Parameters
+        -----------------------
+        model : QAbstractItemModel
+            Model to display, `None` for none
+        """
+        old = self.model()
+        if old is not None:
+            old.modelAboutToBeReset.disconnect(self.__holdWidths)
+            old.modelReset.disconnect(self.__refitColumns)
+            old.rowsInserted.disconnect(self.__fitColumns)
+            old.rowsRemoved.disconnect(self.__fitColumns)
+            old.dataChanged.disconnect(self.__growColumns)
+            self.__widths.pop(id(old), None)
+            self.__userWidths.pop(id(old), None)
+
+        # the header resets its sections
+        self.__resizing = True
+        try:
+            super().setModel(model)
+        finally:
+            self.__resizing = False
+
+        if model is None:
+            return
+
+        model.modelAboutToBeReset.connect(self.__holdWidths)
+        model.modelReset.connect(self.__refitColumns)
+        model.rowsInserted.connect(self.__fitColumns)
+        model.rowsRemoved.connect(self.__fitColumns)
+        model.dataChanged.connect(self.__growColumns)
+
+        self.__fitColumns()
+
+    @QtCore.pyqtSlot()
+    def __fitColumns(self):
+        """Recompute and apply the widths of all columns."""
+        model = self.model()
+        rows = self.__sampleRows()
+
+        self.__widths[id(model)] = {
+            col: self.__columnWidth(col, rows)
+            for col in range(model.columnCount())
+        }
+
+        self.__applyWidths()
+
+    @QtCore.pyqtSlot()
+    def __holdWidths(self):
+        """Ignore column resizes until the model is reset.
+
+        The header resets its sections along with the model,
+        before __refitColumns() restores them.
+        """
+        self.__resizing = True
+
+    @QtCore.pyqtSlot()
+    def __refitColumns(self):
+        """Apply the cached widths, widened to the visible rows."""
+        try:
+            columns = self.model().columnCount()
+
+            # columns of pivoted models change with their data
+            widths = self.__widths.get(id(self.model()))
+            if widths is None or len(widths) != columns:
+                self.__userWidths.pop(id(self.model()), None)
+                self.__fitColumns()
+                return
+
+            rows = self.__visibleRows()
+            for col in range(columns):
+                width = self.__columnWidth(col, rows)
+                widths[col] = max(widths.get(col, 0), width)
+
+            self.__applyWidths()
+        finally:
+            self.__resizing = False
+
+    @QtCore.pyqtSlot(QModelIndex, QModelIndex)
+    def __growColumns(self, topLeft: QModelIndex, bottomRight: QModelIndex):
+        """Widen columns to fit changed fields.
+
+        Parameters
+        -----------------------
+        topLeft : QModelIndex
+            Top-left changed field
+        bottomRight : QModelIndex
+            Bottom-right changed field
+        """
+        widths = self.__widths.setdefault(id(self.model()), {})
+        top = topLeft.row()
+        rows = range(top, min(bottomRight.row() + 1, top + SAMPLE_ROWS))
+
+        for col in range(topLeft.column(), bottomRight.column() + 1):
+            widths[col] = max(widths.get(col, 0), self.__columnWidth(col, rows))
+
+        self.__applyWidths()
+
+    def __sampleRows(self) -> list[int]:
+        """Return the rows measured to fit columns.
+
+        Returns
+        -----------------------
+        list[int]
+            The first and last SAMPLE_ROWS rows, and the visible
+            ones, sorted and without repetitions
+        """
+        count = self.model().rowCount()
+
+        rows = set(range(min(count, SAMPLE_ROWS)))
+        rows.update(range(max(0, count - SAMPLE_ROWS), count))
+        rows.update(self.__visibleRows())
+
+        return sorted(rows)
+
+    def __visibleRows(self) -> range:
+        """Return the rows in the viewport.
+
+        Returns
+        -----------------------
+        range
+            The visible rows, at most SAMPLE_ROWS
+        """
+        count = self.model().rowCount()
+
+        # -1 past the last row
+        first = max(self.rowAt(0), 0)
+        last = self.rowAt(self.viewport().height())
+        if last < 0:
+            last = count - 1
+
+        return range(first, min(last + 1, count, first + SAMPLE_ROWS))
+
+    def __columnWidth(self, col: int, rows: list[int] | range) -> int:
+        """Return the width fitting the given rows of a column.
+
+        Parameters
+        -----------------------
+        col : int
+            Column to measure
+        rows : list[int] | range
+            Rows to measure
+
+        Returns
+        -----------------------
+        int
+            The width fitting header and fields
+        """
+        model = self.model()
+
+        width = self.horizontalHeader().sectionSizeHint(col)
+        for row in rows:
+            hint = self.sizeHintForIndex(model.index(row, col)).width()
+            width = max(width, hint + (1 if self.showGrid() else 0))
+
+        return width
+
+    @QtCore.pyqtSlot(int, int, int)
+    def __recordWidth(self, col: int, _oldSize: int, newSize: int):
+        """Record the width of a column resized by the user.
+
+        Parameters
+        -----------------------
+        col : int
+            Resized column
+        _oldSize : int
+            Previous width
+        newSize : int
+            New width
+        """
+        if self.__resizing or self.model() is None:
+            return
+
+        # the stretched last section follows the viewport
+        header = self.horizontalHeader()
+        if header.stretchLastSection() and col == header.count() - 1:
+            return
+
+        self.__userWidths.setdefault(id(self.model()), {})[col] = newSize
+
+    def __applyWidths(self):
+        """Resize columns to the cached widths, or the user's."""
+        header = self.horizontalHeader()
+        model = id(self.model())
+        widths = self.__widths.get(model, {}) | self.__userWidths.get(model, {})
+
+        resizing, self.__resizing = self.__resizing, True
+        try:
+            for col, width in widths.items():
+                if header.sectionSize(col) != width:
+                    header.resizeSection(col, width)
+        finally:
+            self.__resizing = resizing
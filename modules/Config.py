@@ -0,0 +1,205 @@
+"""User configuration file.
+
+The file is in INI format, by default
+`$XDG_CONFIG_HOME/sem-qt6/config.ini`, or the path in the
+SEM_CONFIG environment variable. Missing files and options
+take default values, e.g.
+
+    [database]
+    profile = balanced
+
+    [analytics]
+    cache = no
+
+    [import]
+    skip_duplicates = no
+
+Functions
+-----------------------
+configFile()
+    Return the path of the configuration file.
+loadConfig()
+    Return the contents of the configuration file.
+databaseProfile()
+    Return the configured database performance profile.
+cacheDirectory()
+    Return the path of the cache directory.
+analyticsCache()
+    Return whether analytics arrays are cached on disk.
+skipDuplicates()
+    Return whether imports skip expenses already in the database.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import configparser
+import os
+
+from modules.Database import DatabaseError, DEFAULT_PROFILE, PROFILES
+
+
+# environment variable overriding the configuration file
+CONFIG_ENV = "SEM_CONFIG"
+
+
+def configFile() -> str:
+    """Return the path of the configuration file.
+
+    Returns
+    -----------------------
+    str
+        The path, which may not exist
+    """
+    if os.environ.get(CONFIG_ENV):
+        return os.environ[CONFIG_ENV]
+
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(
+        os.path.expanduser("~"), ".config"
+    )
+
+    return os.path.join(base, "sem-qt6", "config.ini")
+
+
+def loadConfig(filename: str = None) -> configparser.ConfigParser:
+    """Return the contents of the configuration file.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the file, `None` for configFile()
+
+    Returns
+    -----------------------
+    configparser.ConfigParser
+        The parsed file, empty if the file does not exist
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid file
+    """
+    config = configparser.ConfigParser()
+
+    try:
+        config.read(filename or configFile(), encoding="utf-8")
+    except (configparser.Error, UnicodeDecodeError) as err:
+        raise DatabaseError(f"Invalid configuration file :: {err}")
+
+    return config
+
+
+def databaseProfile(filename: str = None) -> str:
+    """Return the configured database performance profile.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the file, `None` for configFile()
+
+    Returns
+    -----------------------
+    str
+        [database] profile, DEFAULT_PROFILE if not set
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid file
+    - DatabaseError if unknown profile
+    """
+    profile = loadConfig(filename).get(
+        "database", "profile", fallback=DEFAULT_PROFILE
+    )
+
+    if profile not in PROFILES:
+        raise DatabaseError(f"Unknown database profile '{profile}'")
+
+    return profile
+
+
+def cacheDirectory() -> str:
+    """Return the path of the cache directory.
+
+    Returns
+    -----------------------
+    str
+        `$XDG_CACHE_HOME/sem-qt6`, which may not exist
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+
+    return os.path.join(base, "sem-qt6")
+
+
+def analyticsCache(filename: str = None) -> bool:
+    """Return whether analytics arrays are cached on disk.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the file, `None` for configFile()
+
+    Returns
+    -----------------------
+    bool
+        [analytics] cache, `False` if not set
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid file
+    - DatabaseError if invalid value
+    """
+    try:
+        return loadConfig(filename).getboolean(
+            "analytics", "cache", fallback=False
+        )
+    except ValueError as err:
+        raise DatabaseError(f"Invalid configuration file :: {err}")
+
+
+def skipDuplicates(filename: str = None) -> bool:
+    """Return whether imports skip expenses already in the database.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the file, `None` for configFile()
+
+    Returns
+    -----------------------
+    bool
+        [import] skip_duplicates, `False` if not set
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid file
+    - DatabaseError if invalid value
+    """
+    try:
+        return loadConfig(filename).getboolean(
+            "import", "skip_duplicates", fallback=False
+        )
+    except ValueError as err:
+        raise DatabaseError(f"Invalid configuration file :: {err}")
@@ -0,0 +1,251 @@
+"""Database connections.
+
+Classes
+-----------------------
+DatabaseError
+    Subclassed exception for errors in db Connection.
+
+Functions
+-----------------------
+connect()
+    Open a named connection to a SQLite database.
+applyProfile()
+    Apply the settings of a performance profile to a connection.
+settings()
+    Return the effective performance settings of a connection.
+disconnect()
+    Close and remove a named connection.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+
+# number of columns in the 'expenses' table
+EXPENSES_COLUMNS = 5
+
+# PRAGMA settings of the performance profiles, in application order
+# (cache_size < 0 is in KiB, mmap_size in bytes)
+PROFILES = {
+    # SQLite defaults: rollback journal, full sync, no mmap
+    "compat": {"journal_mode": "DELETE"},
+    "balanced": {
+        "page_size": 4096,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32768,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+    # the last transactions may be lost on power failures
+    "bulk": {
+        "page_size": 16384,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -262144,
+        "mmap_size": 1073741824,
+        "temp_store": "MEMORY",
+    },
+}
+DEFAULT_PROFILE = "balanced"
+# settings only effective before the first table is created
+NEW_DATABASE_SETTINGS = ["page_size"]
+# settings reported by settings()
+SETTINGS = [
+    "journal_mode",
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+    "page_size",
+]
+
+
+class DatabaseError(Exception):
+    """Subclassed exception for errors in db Connection."""
+
+
+def connect(
+    filename: str,
+    name: str = None,
+    profile: str = DEFAULT_PROFILE,
+    new: bool = False,
+    readOnly: bool = False,
+) -> QSqlDatabase:
+    """Open a named connection to a SQLite database.
+
+    Connections can only be used from the thread which created
+    them: worker threads must open their own. Read-only
+    connections write nothing to the database, the profile is
+    not applied (its journal mode is stored in the file).
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the database
+    name : str
+        Name of the connection, `None` for the default one
+    profile : str
+        Performance profile, a key of PROFILES
+    new : bool
+        Whether the database is being created
+    readOnly : bool
+        Whether to open the database read-only
+
+    Returns
+    -----------------------
+    QSqlDatabase
+        The opened connection
+
+    Raises
+    -----------------------
+    - DatabaseError if connection errors
+    - DatabaseError if unknown profile
+    """
+    if profile not in PROFILES:
+        raise DatabaseError(f"Unknown database profile '{profile}'")
+
+    if name is None:
+        conn = QSqlDatabase.addDatabase("QSQLITE")
+    else:
+        conn = QSqlDatabase.addDatabase("QSQLITE", name)
+    conn.setDatabaseName(filename)
+    if readOnly:
+        conn.setConnectOptions("QSQLITE_OPEN_READONLY")
+
+    # misc errors in connection opening
+    chk = conn.open()
+    if not chk:
+        raise DatabaseError(conn.lastError().text())
+
+    if not readOnly:
+        applyProfile(conn, profile, new)
+
+    return conn
+
+
+def applyProfile(
+    conn: QSqlDatabase, profile: str, new: bool = False, schema: str = None
+):
+    """Apply the settings of a performance profile to a connection.
+
+    Must be called outside transactions. The journal mode is
+    stored in the database file, the other settings only last
+    as long as the connection.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    profile : str
+        Performance profile, a key of PROFILES
+    new : bool
+        Whether the database is empty, enables the settings in
+        NEW_DATABASE_SETTINGS
+    schema : str
+        Name of an attached database, `None` for the main one
+
+    Raises
+    -----------------------
+    - DatabaseError if unknown profile
+    - DatabaseError if query errors
+    """
+    if profile not in PROFILES:
+        raise DatabaseError(f"Unknown database profile '{profile}'")
+
+    query = QSqlQuery(conn)
+    prefix = "" if schema is None else f"{schema}."
+
+    # PRAGMA values cannot be bound, they come from PROFILES
+    for key, value in PROFILES[profile].items():
+        if key in NEW_DATABASE_SETTINGS and not new:
+            continue
+
+        if not query.exec(f"PRAGMA {prefix}{key} = {value} ;"):
+            raise DatabaseError(query.lastError().text())
+
+    query.finish()
+
+
+def settings(conn: QSqlDatabase) -> dict[str, str | int]:
+    """Return the effective performance settings of a connection.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+
+    Returns
+    -----------------------
+    dict[str, str | int]
+        Values of the SETTINGS pragmas, `None` if unsupported
+
+    Raises
+    -----------------------
+    - DatabaseError if query errors
+    """
+    # numeric codes of enumerated settings
+    names = {
+        "synchronous": ["OFF", "NORMAL", "FULL", "EXTRA"],
+        "temp_store": ["DEFAULT", "FILE", "MEMORY"],
+    }
+
+    result = {}
+    query = QSqlQuery(conn)
+
+    for key in SETTINGS:
+        if not query.exec(f"PRAGMA {key} ;"):
+            raise DatabaseError(query.lastError().text())
+
+        value = query.value(0) if query.next() else None
+        if key in names and value is not None:
+            value = names[key][value]
+
+        result[key] = value
+
+    query.finish()
+
+    return result
+
+
+def disconnect(name: str):
+    """Close and remove a named connection.
+
+    All QSqlDatabase and QSqlQuery objects referring to the
+    connection must have been destroyed beforehand.
+
+    Parameters
+    -----------------------
+    name : str
+        Name of the connection
+    """
+    conn = QSqlDatabase.database(name, False)
+    if conn.isOpen():
+        conn.close()
+    del conn
+
+    QSqlDatabase.removeDatabase(name)
@@ -0,0 +1,271 @@
+"""Diagnostics window.
+
+Classes
+-----------------------
+DiagnosticsDialog
+    Dialog listing the recorded SQL statements.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from PyQt6 import QtCore
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QStandardItem, QStandardItemModel
+from PyQt6.QtWidgets import (
+    QDialog,
+    QDialogButtonBox,
+    QFileDialog,
+    QLabel,
+    QPushButton,
+    QWidget,
+)
+from PyQt6.QtWidgets import QVBoxLayout
+
+from modules import SqlTrace
+from modules.Common import ErrorMsg
+from modules.CQTableView import CQTableView
+from modules.Database import DatabaseError
+
+
+DIALOG_WIDTH = 1000
+DIALOG_HEIGHT = 500
+
+# header, record key
+FIELDS = [
+    ("operation", "operation"),
+    ("sql", "sql"),
+    ("exec [ms]", "seconds"),
+    ("fetch [ms]", "fetchSeconds"),
+    ("rows", "rows"),
+    ("thread", "thread"),
+    ("ok", "ok"),
+]
+
+
+class DiagnosticsDialog(QDialog):
+    """Dialog listing the recorded SQL statements.
+
+    Attributes
+    -----------------------
+    __stats : dict[str, int]
+        Statement cache counters, `None` if no open database
+    __settings : dict[str, str | int]
+        Performance settings, `None` if no open database
+    __labSettings : QLabel
+        Performance settings of the connection
+    __labStatus : QLabel
+        Tracing state and statement counters
+    __tabRecords : CQTableView
+        Recorded statements, most recent first
+    __model : QStandardItemModel
+        Model of the recorded statements
+    __butRefresh : QPushButton
+        Reloads the recorded statements
+    __butClear : QPushButton
+        Drops the recorded statements
+    __butSave : QPushButton
+        Saves the recorded statements to a JSON file
+
+    Public methods
+    -----------------------
+    __init__(QWidget, dict[str, int], dict[str, str | int])
+        Construct class instance.
+
+    Private methods
+    -----------------------
+    __initWidgets() -> QVBoxLayout
+        Return the initialized and arranged widgets.
+
+    Private slots
+    -----------------------
+    __refresh()
+        Reload the recorded statements.
+    __clear()
+        Drop the recorded statements.
+    __save()
+        Collect filename from user and saves the statements.
+
+    Connections
+    -----------------------
+    __butRefresh.clicked
+        -> __refresh()
+    __butClear.clicked
+        -> __clear()
+    __butSave.clicked
+        -> __save()
+    """
+
+    def __init__(
+        self,
+        parent: QWidget,
+        stats: dict[str, int] = None,
+        settings: dict[str, str | int] = None,
+    ):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        parent : QWidget
+            Parent QWidget
+        stats : dict[str, int]
+            Statement cache counters, `None` if no open database
+        settings : dict[str, str | int]
+            Performance settings, `None` if no open database
+        """
+        super().__init__(parent)
+
+        self.__stats = stats
+        self.__settings = settings
+        self.__labSettings = None
+        self.__labStatus = None
+        self.__tabRecords = None
+        self.__model = None
+        self.__butRefresh = None
+        self.__butClear = None
+        self.__butSave = None
+
+        self.resize(DIALOG_WIDTH, DIALOG_HEIGHT)
+        self.setWindowTitle("SQL diagnostics")
+
+        self.setLayout(self.__initWidgets())
+
+        self.__butRefresh.clicked.connect(self.__refresh)
+        self.__butClear.clicked.connect(self.__clear)
+        self.__butSave.clicked.connect(self.__save)
+
+        self.__refresh()
+
+    def __initWidgets(self) -> QVBoxLayout:
+        """Return the initialized and arranged widgets.
+
+        Returns
+        -----------------------
+        QVBoxLayout
+            The initialized widget layout.
+        """
+        # effective settings are fixed while the dialog is open
+        if self.__settings is None:
+            text = "No open database"
+        else:
+            text = ", ".join(f"{k} = {v}" for k, v in self.__settings.items())
+        self.__labSettings = QLabel(text, self)
+        self.__labSettings.setWordWrap(True)
+
+        self.__labStatus = QLabel(self)
+
+        # recorded statements table
+        self.__model = QStandardItemModel(0, len(FIELDS), self)
+        self.__model.setHorizontalHeaderLabels([h for h, _ in FIELDS])
+
+        self.__tabRecords = CQTableView(self)
+        self.__tabRecords.setSortingEnabled(True)
+        self.__tabRecords.setModel(self.__model)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close, self)
+        buttons.rejected.connect(self.reject)
+
+        self.__butRefresh = buttons.addButton(
+            "Refresh", QDialogButtonBox.ButtonRole.ActionRole
+        )
+        self.__butClear = buttons.addButton(
+            "Clear", QDialogButtonBox.ButtonRole.ActionRole
+        )
+        self.__butSave = buttons.addButton(
+            "Save...", QDialogButtonBox.ButtonRole.ActionRole
+        )
+
+        for but in [self.__butRefresh, self.__butClear, self.__butSave]:
+            but.setEnabled(SqlTrace.enabled())
+
+        lay = QVBoxLayout()
+        lay.addWidget(self.__labSettings)
+        lay.addWidget(self.__labStatus)
+        lay.addWidget(self.__tabRecords)
+        lay.addWidget(buttons)
+
+        return lay
+
+    @QtCore.pyqtSlot()
+    def __refresh(self):
+        """Reload the recorded statements."""
+        records = SqlTrace.records()
+
+        if SqlTrace.enabled():
+            status = f"{len(records)} statements recorded"
+        else:
+            status = (
+                "SQL tracing is disabled: set "
+                f"{SqlTrace.ENV_VARIABLE}=1 and restart to enable it"
+            )
+
+        if self.__stats is not None:
+            status += (
+                f" | prepared statements: {self.__stats['size']}"
+                f", reused {self.__stats['hits']} times"
+            )
+
+        self.__labStatus.setText(status)
+
+        self.__model.removeRows(0, self.__model.rowCount())
+
+        for record in reversed(records):
+            items = []
+            for _, key in FIELDS:
+                value = record[key]
+                if key in ("seconds", "fetchSeconds") and value is not None:
+                    value = round(value * 1000.0, 3)
+
+                item = QStandardItem()
+                # numbers sort numerically
+                item.setData(value, Qt.ItemDataRole.DisplayRole)
+                item.setEditable(False)
+                items.append(item)
+
+            self.__model.appendRow(items)
+
+    @QtCore.pyqtSlot()
+    def __clear(self):
+        """Drop the recorded statements."""
+        SqlTrace.clear()
+        self.__refresh()
+
+    @QtCore.pyqtSlot()
+    def __save(self):
+        """Collect filename from user and saves the statements."""
+        filename = QFileDialog.getSaveFileName(
+            self,
+            "Specify file for the SQL trace",
+            None,
+            "JSON files (*.json)",
+        )[0]
+
+        if filename == "":
+            return
+
+        try:
+            SqlTrace.dump(filename)
+        except DatabaseError as err:
+            ErrorMsg(err)
@@ -0,0 +1,320 @@
+"""Duplicate detection on imports.
+
+Expenses are identified by a 64-bit hash of their contents
+(date, type, amount and justification), indexed in the
+'expense_hashes' table (see Schema). SQLite has no hash
+function: triggers reset the hashes of inserted or changed
+expenses to NULL, and missing hashes are computed here, before
+the first lookup in a table. Incoming rows are then looked up
+in chunks, with one indexed query each, so that the cost per
+row does not grow with the table.
+
+Classes
+-----------------------
+DuplicateFilter
+    Skip rows matching existing expenses, during an import.
+
+Functions
+-----------------------
+contentHash()
+    Return the 64-bit hash of the contents of an expense.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from collections import Counter
+import hashlib
+import json
+
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from modules import SqlTrace
+from modules.Database import DatabaseError, EXPENSES_COLUMNS
+from modules.StatementCache import StatementCache
+
+
+# number of missing hashes computed per query
+HASH_CHUNK_SIZE = 5000
+
+
+def contentHash(
+    date: str, etype: str, amount: float, justification: str
+) -> int:
+    """Return the 64-bit hash of the contents of an expense.
+
+    Parameters
+    -----------------------
+    date : str
+        Date of the expense, 'yyyy-mm-dd'
+    etype : str
+        Type of the expense
+    amount : float
+        Amount of the expense
+    justification : str
+        Justification of the expense
+
+    Returns
+    -----------------------
+    int
+        Signed hash, fitting a SQLite INTEGER
+    """
+    text = "\x1f".join([date, etype, repr(float(amount)), justification])
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class DuplicateFilter:
+    """Skip rows matching existing expenses, during an import.
+
+    Rows match expenses with the same contents, whatever their
+    ids. Matching is one-to-one: each expense in the database
+    skips a single copy of an incoming row, so that repeated
+    expenses of a file overlapping the database are imported as
+    many times as they are missing. Expenses inserted by the
+    import are matched only after finish().
+
+    Public attributes
+    -----------------------
+    skipped: int
+        Number of skipped rows
+
+    Private attributes
+    -----------------------
+    __conn: QSqlDatabase
+        Database connection
+    __cache: StatementCache
+        Prepared lookup statements
+    __tables: set[str]
+        Tables whose missing hashes were computed
+    __matched: Counter[tuple]
+        Number of expenses matched so far, by contents
+
+    Public methods
+    -----------------------
+    __init__(QSqlDatabase)
+        Construct class instance.
+    filter(str, list[tuple[int, list]]) -> list[tuple[int, list]]
+        Return the rows of a chunk not matching existing expenses.
+    finish()
+        Compute the hashes of the expenses inserted by the import.
+
+    Private methods
+    -----------------------
+    __hashMissing(str)
+        Compute the missing hashes of a table.
+    __lookup(str, set[int]) -> Counter[tuple]
+        Return the expenses of a table with the given hashes.
+    """
+
+    def __init__(self, conn: QSqlDatabase):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        conn : QSqlDatabase
+            Database connection, within the import transaction
+        """
+        self.skipped = 0
+        self.__conn = conn
+        self.__cache = StatementCache(conn)
+        self.__tables = set()
+        self.__matched = Counter()
+
+    def filter(
+        self, table: str, chunk: list[tuple[int, list]]
+    ) -> list[tuple[int, list]]:
+        """Return the rows of a chunk not matching existing expenses.
+
+        Rows which cannot be hashed (e.g. non-numeric amounts)
+        are returned, to fail on insertion.
+
+        Parameters
+        -----------------------
+        table : str
+            Target table, "expenses" or "y{year}.expenses"
+        chunk : list[tuple[int, list]]
+            (line number, row) pairs
+
+        Returns
+        -----------------------
+        list[tuple[int, list]]
+            The (line number, row) pairs to insert
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        if table not in self.__tables:
+            self.__hashMissing(table)
+            self.__tables.add(table)
+
+        # (date, type, amount, justification) of each row
+        keys, hashes = [], set()
+        for _, row in chunk:
+            key = None
+            if len(row) == EXPENSES_COLUMNS:
+                try:
+                    key = (row[1], row[2], float(row[3]), row[4])
+                    hashes.add(contentHash(*key))
+                except (TypeError, ValueError, AttributeError):
+                    key = None
+
+            keys.append(key)
+
+        existing = self.__lookup(table, hashes)
+
+        kept = []
+        for pair, key in zip(chunk, keys):
+            if key is not None and existing[key] > self.__matched[key]:
+                self.__matched[key] += 1
+                self.skipped += 1
+            else:
+                kept.append(pair)
+
+        return kept
+
+    def finish(self):
+        """Compute the hashes of the expenses inserted by the import.
+
+        To be called before committing the import.
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        for table in self.__tables:
+            self.__hashMissing(table)
+
+        self.__cache.clear()
+
+    def __hashMissing(self, table: str):
+        """Compute the missing hashes of a table.
+
+        Expenses are read in id order from the NULL entries of
+        the hash index, HASH_CHUNK_SIZE at a time.
+
+        Parameters
+        -----------------------
+        table : str
+            Table of the expenses, "expenses" or "y{year}.expenses"
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        prefix = table[: -len("expenses")]
+
+        update = QSqlQuery(self.__conn)
+        update.prepare(
+            f"UPDATE {prefix}expense_hashes SET hash = ? WHERE id = ? ;"
+        )
+
+        # ids are signed 64-bit integers
+        last = -(1 << 63)
+        while True:
+            query = self.__cache.exec(
+                f"""
+                SELECT e.id, e.date, e.type, e.amount, e.justification
+                FROM {prefix}expense_hashes AS h
+                JOIN {prefix}expenses AS e ON e.id = h.id
+                WHERE h.hash IS NULL AND h.id > ?
+                ORDER BY h.id
+                LIMIT {HASH_CHUNK_SIZE} ;
+            """,
+                [last],
+            )
+
+            ids, hashes = [], []
+            while query.next():
+                ids.append(query.value(0))
+                hashes.append(
+                    contentHash(*(query.value(i) for i in range(1, 5)))
+                )
+            query.finish()
+            SqlTrace.fetched(len(ids))
+
+            if not ids:
+                break
+
+            update.addBindValue(hashes)
+            update.addBindValue(ids)
+            if not SqlTrace.execBatch(update, len(ids)):
+                raise DatabaseError(update.lastError().text())
+
+            last = ids[-1]
+
+        update.finish()
+
+    def __lookup(self, table: str, hashes: set[int]) -> Counter[tuple]:
+        """Return the expenses of a table with the given hashes.
+
+        Parameters
+        -----------------------
+        table : str
+            Table of the expenses, "expenses" or "y{year}.expenses"
+        hashes : set[int]
+            Hashes to look up
+
+        Returns
+        -----------------------
+        Counter[tuple]
+            Number of expenses by (date, type, amount,
+            justification), hash collisions are told apart
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        existing = Counter()
+        if not hashes:
+            return existing
+
+        prefix = table[: -len("expenses")]
+
+        # one statement for any number of hashes
+        query = self.__cache.exec(
+            f"""
+            SELECT e.date, e.type, e.amount, e.justification
+            FROM {prefix}expense_hashes AS h
+            JOIN {prefix}expenses AS e ON e.id = h.id
+            WHERE h.hash IN (SELECT value FROM json_each(?)) ;
+        """,
+            [json.dumps(list(hashes))],
+        )
+
+        while query.next():
+            key = (
+                query.value(0),
+                query.value(1),
+                float(query.value(2)),
+                query.value(3),
+            )
+            existing[key] += 1
+        query.finish()
+        SqlTrace.fetched(sum(existing.values()))
+
+        return existing
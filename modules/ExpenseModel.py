@@ -0,0 +1,803 @@
+"""Windowed expense model.
+
+Classes
+-----------------------
+ExpenseModel
+    Table model fetching expenses lazily, one page at a time.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from collections import OrderedDict
+from typing import Any
+
+from PyQt6.QtCore import (
+    Qt,
+    QAbstractTableModel,
+    QModelIndex,
+    QObject,
+    pyqtSignal,
+)
+from PyQt6.QtGui import QFont
+
+from modules import SqlTrace
+from modules.Database import DatabaseError
+from modules.Federation import Federation
+from modules.Search import searchClause
+from modules.StatementCache import StatementCache
+
+
+# column names of the 'expenses' table, in order
+COLUMNS = ["id", "date", "type", "amount", "justification"]
+# number of rows per page
+PAGE_SIZE = 256
+# maximum number of pages held in memory
+MAX_PAGES = 16
+
+
+class ExpenseModel(QAbstractTableModel):
+    """Table model fetching expenses lazily, one page at a time.
+
+    Only the most recently used pages of rows are held in
+    memory, least recently used ones are evicted. Pages are
+    fetched with keyset cursors on the (sort column, id) pair,
+    starting from the last row of the nearest known page, or
+    from the end of the table if closer. Edits are committed
+    immediately, one field at a time, or queued in batched mode
+    and shown over the fetched rows until written or discarded.
+    All statements go through
+    a cache of prepared statements. With a federation of yearly
+    databases, writes are routed to the file of each expense,
+    which cannot be moved to another year.
+
+    Private attributes
+    -----------------------
+    __statements: StatementCache
+        Prepared statements of the database connection
+    __federation: Federation
+        Yearly databases of the connection, `None` if single
+    __dates: list[str]
+        Current date filter, `None` if not filtering
+    __search: str
+        Text searched in the justifications, `None` if not searching
+    __sortColumn: int
+        Index of the column rows are sorted by
+    __sortOrder: Qt.SortOrder
+        Sorting order
+    __count: int
+        Number of rows matching the filter
+    __pages: OrderedDict[int, list[list]]
+        Cached pages, from least to most recently used
+    __anchors: dict[int, tuple]
+        (sort key, id) of the last row of each page read so far
+    __batched: bool
+        Whether edits are queued instead of committed
+    __pending: dict[int, dict[int, Any]]
+        Queued values by expense id and column
+
+    Public methods
+    -----------------------
+    __init__(StatementCache, QObject, Federation)
+        Construct class instance.
+    select()
+        Discard cached rows and recount expenses.
+    setDateFilter(list[str])
+        Filter the expenses with the specified dates.
+    firstPage() -> list[list]
+        Return the rows of the first page.
+    setFirstPage(int, list[list])
+        Show a count and a first page read elsewhere.
+    rowId(int) -> int
+        Return the id of the expense at the given row.
+    insertExpense(str, str, float, str) -> bool
+        Insert a new expense in the database.
+    setBatched(bool)
+        Queue edits instead of committing them.
+    batched() -> bool
+        Return whether edits are queued.
+    pendingCount() -> int
+        Return the number of expenses with queued edits.
+    writeEdits()
+        Execute the queued edits.
+    discardEdits(list[int])
+        Drop the queued edits of some or all expenses.
+
+    Signals
+    -----------------------
+    pendingChanged[int]
+        Broadcast the number of expenses with queued edits.
+
+    Reimplemented methods
+    -----------------------
+    rowCount(QModelIndex) -> int
+    columnCount(QModelIndex) -> int
+    data(QModelIndex, Qt.ItemDataRole) -> Any
+    headerData(int, Qt.Orientation, Qt.ItemDataRole) -> Any
+    flags(QModelIndex) -> Qt.ItemFlag
+    setData(QModelIndex, Any, Qt.ItemDataRole) -> bool
+    removeRows(int, int, QModelIndex) -> bool
+    sort(int, Qt.SortOrder)
+
+    Private methods
+    -----------------------
+    __where() -> tuple[str, list]
+        Return the filtering clause and its parameters.
+    __locate(int) -> tuple[str, int]
+        Return the table and the id in it of an expense.
+    __row(int) -> list
+        Return the cached values of the given row.
+    __fetchPage(int) -> list[list]
+        Fetch the given page from the database.
+    __invalidateFrom(int)
+        Drop cached pages and anchors from the given page on.
+    __validate(QModelIndex, Any) -> tuple[str, int]
+        Return where an edit is written, if allowed.
+    """
+
+    pendingChanged = pyqtSignal(int)
+    """Broadcast the number of expenses with queued edits.
+
+    Parameters
+    -----------------------
+    count : int
+        Number of expenses with queued edits
+    """
+
+    def __init__(
+        self,
+        statements: StatementCache,
+        parent: QObject = None,
+        federation: Federation = None,
+    ):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        statements : StatementCache
+            Prepared statements of the database connection
+        parent : QObject
+            Parent QObject
+        federation : Federation
+            Yearly databases of the connection, `None` if single
+        """
+        super().__init__(parent)
+
+        self.__statements = statements
+        self.__federation = federation
+        self.__dates = None
+        self.__search = None
+        # sorting by date (newest first)
+        self.__sortColumn = 1
+        self.__sortOrder = Qt.SortOrder.DescendingOrder
+        self.__count = 0
+        self.__pages = OrderedDict()
+        self.__anchors = {}
+        self.__batched = False
+        self.__pending = {}
+
+    @SqlTrace.traced
+    def select(self):
+        """Discard cached rows and recount expenses.
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        self.beginResetModel()
+
+        self.__pages.clear()
+        self.__anchors.clear()
+
+        clause, params = self.__where()
+
+        try:
+            query = self.__statements.exec(
+                f"SELECT COUNT(*) FROM expenses WHERE {clause} ;", params
+            )
+            query.next()
+            self.__count = query.value(0)
+            SqlTrace.fetched(1)
+            query.finish()
+        except DatabaseError:
+            self.__count = 0
+            raise
+        finally:
+            self.endResetModel()
+
+    def setDateFilter(self, dates: list[str], search: str = None):
+        """Filter the expenses with the specified dates and text.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` removes the date filter
+        search : str
+            Text searched in the justifications, `None` for all
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid date range
+        """
+        if dates is not None and len(dates) != 2:
+            raise DatabaseError("Invalid date interval")
+
+        self.__dates = dates
+        self.__search = search
+        self.select()
+
+    def firstPage(self) -> list[list]:
+        """Return the rows of the first page.
+
+        Returns
+        -----------------------
+        list[list]
+            Copies of the values of the fields of the rows
+        """
+        if self.__count == 0:
+            return []
+
+        # fetching the page, if not cached
+        self.__row(0)
+
+        return [list(row) for row in self.__pages[0]]
+
+    def setFirstPage(self, count: int, rows: list[list]):
+        """Show a count and a first page read elsewhere.
+
+        Replaces select(), e.g. with the results of a background
+        worker; count and rows must match the current filter and
+        sorting, and later pages are fetched as usual.
+
+        Parameters
+        -----------------------
+        count : int
+            Number of rows matching the filter
+        rows : list[list]
+            Rows of the first page, as returned by firstPage()
+        """
+        self.beginResetModel()
+
+        self.__pages.clear()
+        self.__anchors.clear()
+        self.__count = count
+
+        if rows:
+            self.__pages[0] = [list(row) for row in rows]
+
+            last = rows[-1]
+            if last[0] is not None:
+                self.__anchors[0] = (last[self.__sortColumn], last[0])
+
+        self.endResetModel()
+
+    def rowId(self, row: int) -> int:
+        """Return the id of the expense at the given row.
+
+        Parameters
+        -----------------------
+        row : int
+            Row of the expense
+
+        Returns
+        -----------------------
+        int
+            The id of the expense
+        """
+        return self.__row(row)[0]
+
+    @SqlTrace.traced
+    def insertExpense(
+        self, date: str, etype: str, amount: float, justification: str
+    ) -> bool:
+        """Insert a new expense in the database.
+
+        Parameters
+        -----------------------
+        date : str
+            Date of the expense, 'yyyy-mm-dd'
+        etype : str
+            Type of the expense
+        amount : float
+            Amount of the expense
+        justification : str
+            Justification of the expense
+
+        Returns
+        -----------------------
+        bool
+            Whether the insertion was successful
+        """
+        try:
+            table = "expenses"
+            if self.__federation is not None:
+                table = self.__federation.tableFor(date)
+
+            self.__statements.exec(
+                f"""
+                INSERT INTO {table} (date, type, amount, justification)
+                VALUES (?, ?, ?, ?) ;
+            """,
+                [date, etype, amount, justification],
+            )
+        except DatabaseError:
+            return False
+
+        self.select()
+        return True
+
+    def setBatched(self, batched: bool):
+        """Queue edits instead of committing them.
+
+        Queued edits are kept when leaving batched mode, and
+        have to be written or discarded by the caller.
+
+        Parameters
+        -----------------------
+        batched : bool
+            Whether edits are queued
+        """
+        self.__batched = batched
+
+    def batched(self) -> bool:
+        """Return whether edits are queued.
+
+        Returns
+        -----------------------
+        bool
+            Whether the model is in batched mode
+        """
+        return self.__batched
+
+    def pendingCount(self) -> int:
+        """Return the number of expenses with queued edits.
+
+        Returns
+        -----------------------
+        int
+            Number of edited expenses
+        """
+        return len(self.__pending)
+
+    @SqlTrace.traced
+    def writeEdits(self):
+        """Execute the queued edits.
+
+        One UPDATE is executed for each edited expense, within
+        the transaction of the caller, and the edits are kept
+        until discarded.
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors, with the id of the
+          expense
+        """
+        for rowId, edits in self.__pending.items():
+            columns = sorted(edits)
+            # column names are not user-provided
+            assignments = ", ".join(f"{COLUMNS[c]} = ?" for c in columns)
+
+            table, localId = self.__locate(rowId)
+
+            try:
+                self.__statements.exec(
+                    f"UPDATE {table} SET {assignments} WHERE id = ? ;",
+                    [edits[c] for c in columns] + [localId],
+                ).finish()
+            except DatabaseError as err:
+                raise DatabaseError(f"Invalid edit of expense {rowId} :: {err}")
+
+    def discardEdits(self, ids: list[int] = None):
+        """Drop the queued edits of some or all expenses.
+
+        Parameters
+        -----------------------
+        ids : list[int]
+            Ids of the expenses, `None` for all
+        """
+        if ids is None:
+            self.__pending.clear()
+        else:
+            for rowId in ids:
+                self.__pending.pop(rowId, None)
+
+        # cached rows hold the values in the database
+        if self.__count > 0:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(self.__count - 1, len(COLUMNS) - 1),
+            )
+            self.headerDataChanged.emit(
+                Qt.Orientation.Vertical, 0, self.__count - 1
+            )
+
+        self.pendingChanged.emit(len(self.__pending))
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of rows matching the filter."""
+        return 0 if parent.isValid() else self.__count
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of columns."""
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(
+        self,
+        index: QModelIndex,
+        role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        """Return the value of the given field, fetching its page.
+
+        Fields with queued edits show the queued value, in
+        italics.
+        """
+        if not index.isValid():
+            return None
+
+        if role == Qt.ItemDataRole.FontRole:
+            edits = self.__pending.get(self.__row(index.row())[0], {})
+            if index.column() not in edits:
+                return None
+
+            font = QFont()
+            font.setItalic(True)
+            return font
+
+        if role not in (
+            Qt.ItemDataRole.DisplayRole,
+            Qt.ItemDataRole.EditRole,
+        ):
+            return None
+
+        row = self.__row(index.row())
+        edits = self.__pending.get(row[0], {})
+
+        return edits.get(index.column(), row[index.column()])
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        """Return column names and row numbers.
+
+        Rows with queued edits are marked with an asterisk.
+        """
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+
+        if self.__pending and self.__row(section)[0] in self.__pending:
+            return f"{section + 1} *"
+
+        return section + 1
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        """Return item flags, all fields but the id are editable."""
+        flags = super().flags(index)
+        if index.isValid() and index.column() != 0:
+            flags |= Qt.ItemFlag.ItemIsEditable
+
+        return flags
+
+    @SqlTrace.traced
+    def setData(
+        self,
+        index: QModelIndex,
+        value: Any,
+        role: Qt.ItemDataRole = Qt.ItemDataRole.EditRole,
+    ) -> bool:
+        """Commit the edited field to the database immediately.
+
+        The row keeps its position until the next select(), as
+        with the OnFieldChange strategy of QSqlTableModel. In
+        batched mode the value is queued instead, and checked
+        by SQLite when written.
+        """
+        if role != Qt.ItemDataRole.EditRole:
+            return False
+
+        target = self.__validate(index, value)
+        if target is None:
+            return False
+
+        row = self.__row(index.row())
+
+        if self.__batched:
+            self.__pending.setdefault(row[0], {})[index.column()] = value
+
+            last = index.siblingAtColumn(len(COLUMNS) - 1)
+            self.dataChanged.emit(index.siblingAtColumn(0), last)
+            self.headerDataChanged.emit(
+                Qt.Orientation.Vertical, index.row(), index.row()
+            )
+            self.pendingChanged.emit(len(self.__pending))
+            return True
+
+        table, rowId = target
+
+        # column names are not user-provided
+        name = COLUMNS[index.column()]
+
+        try:
+            # SQLite performs type-checking here
+            self.__statements.exec(
+                f"UPDATE {table} SET {name} = ? WHERE id = ? ;",
+                [value, rowId],
+            )
+
+            # re-reading the value, as converted by SQLite
+            query = self.__statements.exec(
+                f"SELECT {name} FROM {table} WHERE id = ? ;", [rowId]
+            )
+            if query.next():
+                row[index.column()] = query.value(0)
+            query.finish()
+        except DatabaseError:
+            return False
+
+        # later pages are anchored on the old key
+        if index.column() == self.__sortColumn:
+            self.__invalidateFrom(index.row() // PAGE_SIZE + 1)
+
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    @SqlTrace.traced
+    def removeRows(
+        self, row: int, count: int, parent: QModelIndex = QModelIndex()
+    ) -> bool:
+        """Delete the given rows from the database immediately."""
+        if parent.isValid() or row < 0 or row + count > self.__count:
+            return False
+
+        ids = [self.__row(r)[0] for r in range(row, row + count)]
+
+        try:
+            for i in ids:
+                table, rowId = self.__locate(i)
+                self.__statements.exec(
+                    f"DELETE FROM {table} WHERE id = ? ;", [rowId]
+                )
+        except DatabaseError:
+            return False
+
+        # queued edits of deleted expenses
+        if any(i in self.__pending for i in ids):
+            for i in ids:
+                self.__pending.pop(i, None)
+            self.pendingChanged.emit(len(self.__pending))
+
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        self.__count -= count
+        self.__invalidateFrom(row // PAGE_SIZE)
+        self.endRemoveRows()
+
+        return True
+
+    def sort(
+        self,
+        column: int,
+        order: Qt.SortOrder = Qt.SortOrder.AscendingOrder,
+    ):
+        """Sort by the given column, ties broken by id."""
+        self.__sortColumn = column
+        self.__sortOrder = order
+        self.select()
+
+    def __where(self) -> tuple[str, list]:
+        """Return the filtering clause and its parameters.
+
+        Returns
+        -----------------------
+        tuple[str, list]
+            The WHERE clause and the values to bind to it
+        """
+        clause, params = searchClause(self.__search)
+        if self.__dates is None:
+            return clause, params
+
+        return f"date BETWEEN ? AND ? AND {clause}", list(self.__dates) + params
+
+    def __row(self, row: int) -> list:
+        """Return the cached values of the given row.
+
+        Parameters
+        -----------------------
+        row : int
+            Row to return
+
+        Returns
+        -----------------------
+        list
+            The values of the fields of the row
+        """
+        page = row // PAGE_SIZE
+
+        if page in self.__pages:
+            self.__pages.move_to_end(page)
+        else:
+            self.__pages[page] = self.__fetchPage(page)
+
+            # evicting least recently used pages
+            while len(self.__pages) > MAX_PAGES:
+                self.__pages.popitem(last=False)
+
+        return self.__pages[page][row % PAGE_SIZE]
+
+    def __locate(self, rowId: int) -> tuple[str, int]:
+        """Return the table and the id in it of an expense.
+
+        Parameters
+        -----------------------
+        rowId : int
+            Id of the expense in the model
+
+        Returns
+        -----------------------
+        tuple[str, int]
+            The table name and the id in the table
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid id
+        """
+        if self.__federation is None:
+            return "expenses", rowId
+
+        return self.__federation.locate(rowId)
+
+    @SqlTrace.traced
+    def __fetchPage(self, page: int) -> list[list]:
+        """Fetch the given page from the database.
+
+        Seeks from the last row of the nearest previous page
+        read so far, skipping the pages in between, or reads
+        backwards from the end of the table if fewer rows have
+        to be skipped.
+
+        Parameters
+        -----------------------
+        page : int
+            Index of the page
+
+        Returns
+        -----------------------
+        list[list]
+            The rows of the page
+        """
+        start = page * PAGE_SIZE
+        end = min(self.__count, start + PAGE_SIZE)
+
+        key = COLUMNS[self.__sortColumn]
+        desc = self.__sortOrder == Qt.SortOrder.DescendingOrder
+        clause, params = self.__where()
+
+        # nearest previous anchor
+        prev = max((p for p in self.__anchors if p < page), default=None)
+        skip = start if prev is None else start - (prev + 1) * PAGE_SIZE
+
+        # reading backwards from the end is cheaper
+        backwards = self.__count - end < skip
+        if backwards:
+            desc = not desc
+            skip = self.__count - end
+        elif prev is not None:
+            op = "<" if desc else ">"
+            clause += f" AND ({key}, id) {op} (?, ?)"
+            params += list(self.__anchors[prev])
+
+        direction = "DESC" if desc else "ASC"
+
+        rows = []
+        try:
+            query = self.__statements.exec(
+                f"""
+                SELECT id, date, type, amount, justification
+                FROM expenses
+                WHERE {clause}
+                ORDER BY {key} {direction}, id {direction}
+                LIMIT ? OFFSET ? ;
+            """,
+                params + [end - start, skip],
+            )
+
+            value = query.value
+            while query.next():
+                rows.append([value(i) for i in range(len(COLUMNS))])
+            SqlTrace.fetched(len(rows))
+            query.finish()
+        except DatabaseError:
+            # missing rows are padded below
+            pass
+
+        if backwards:
+            rows.reverse()
+
+        # rows may have been removed by other connections
+        while len(rows) < end - start:
+            rows.append([None] * len(COLUMNS))
+
+        if rows and rows[-1][0] is not None:
+            last = rows[-1]
+            self.__anchors[page] = (last[self.__sortColumn], last[0])
+
+        return rows
+
+    def __invalidateFrom(self, page: int):
+        """Drop cached pages and anchors from the given page on.
+
+        Parameters
+        -----------------------
+        page : int
+            Index of the first page to drop
+        """
+        for p in [p for p in self.__pages if p >= page]:
+            del self.__pages[p]
+
+        for p in [p for p in self.__anchors if p >= page]:
+            del self.__anchors[p]
+
+    def __validate(self, index: QModelIndex, value: Any) -> tuple[str, int]:
+        """Return where an edit is written, if allowed.
+
+        Parameters
+        -----------------------
+        index : QModelIndex
+            Edited field
+        value : Any
+            New value of the field
+
+        Returns
+        -----------------------
+        tuple[str, int]
+            The table name and the id in the table, `None` if
+            the field cannot be edited
+        """
+        if not index.isValid() or index.column() == 0:
+            return None
+
+        rowId = self.__row(index.row())[0]
+        if rowId is None:
+            return None
+
+        try:
+            table, localId = self.__locate(rowId)
+
+            # expenses stay in the file of their year
+            if (
+                self.__federation is not None
+                and index.column() == COLUMNS.index("date")
+                and self.__federation.tableFor(f"{value}") != table
+            ):
+                return None
+        except DatabaseError:
+            return None
+
+        return table, localId
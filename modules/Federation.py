@@ -0,0 +1,512 @@
+"""Per-year database federation.
+
+A set of database files, one per calendar year, is attached to
+a single in-memory connection. Temporary views named `expenses`,
+`expense_rollup` and `expense_search` concatenate the tables of
+the files, so that read queries run unchanged. Ids in the views encode the
+year of their file, as `year * ID_STRIDE + id`. The view
+`ALL_EXPENSES` always includes every file, whatever the date
+range of the other views.
+
+SQLite does not allow triggers to write to attached databases
+by name, so writes are routed by the callers: new expenses go
+to the file of their year (tableFor()), existing ones to the
+file encoded in their id (locate()).
+
+Classes
+-----------------------
+Federation
+    Set of per-year database files attached to a connection.
+
+Functions
+-----------------------
+connectFederation()
+    Validate, migrate and attach a set of per-year databases.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import re
+
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from modules import SqlTrace
+from modules.Database import (
+    DatabaseError,
+    DEFAULT_PROFILE,
+    applyProfile,
+    connect,
+    disconnect,
+)
+from modules.Schema import migrateSchema, validateSchema
+
+
+# multiplier of the year in the ids of the views
+ID_STRIDE = 10**10
+# maximum number of files, the SQLite limit of attached databases
+MAX_FILES = 10
+# default name of the federated connection
+FEDERATION_CONNECTION = "sem-federation"
+# view of the expenses of all files
+ALL_EXPENSES = "all_expenses"
+
+
+class Federation:
+    """Set of per-year database files attached to a connection.
+
+    Files are attached as schemas named after their year. The
+    views only include the files whose dates can match the
+    current date range, see setDateRange().
+
+    Private attributes
+    -----------------------
+    __conn: QSqlDatabase
+        Connection the files are attached to
+    __files: dict[int, str]
+        Path of the file of each year
+    __ranges: dict[int, tuple[str, str]]
+        First and last date each file may hold
+    __active: list[int]
+        Years of the files included in the views
+
+    Public methods
+    -----------------------
+    __init__(QSqlDatabase, dict[int, str], dict, str)
+        Construct class instance, attaching the files.
+    files() -> list[str]
+        Return the paths of the files, by year.
+    setDateRange(list[str])
+        Include in the views only the files matching a range.
+    tableFor(str) -> str
+        Return the table new expenses with the given date go to.
+    locate(int) -> tuple[str, int]
+        Return the table and the id in it of an expense.
+    localId(str | int) -> str | int
+        Return the id in its file of an id read from a data file.
+
+    Private methods
+    -----------------------
+    __createViews()
+        Create the views over the files of the active years.
+    __union(str, list[int]) -> str
+        Return the concatenation of a table over some files.
+    """
+
+    def __init__(
+        self,
+        conn: QSqlDatabase,
+        files: dict[int, str],
+        ranges: dict[int, tuple[str, str]],
+        profile: str = DEFAULT_PROFILE,
+    ):
+        """Construct class instance, attaching the files.
+
+        Parameters
+        -----------------------
+        conn : QSqlDatabase
+            Open connection, to an in-memory database
+        files : dict[int, str]
+            Path of the file of each year
+        ranges : dict[int, tuple[str, str]]
+            First and last date each file may hold
+        profile : str
+            Performance profile of the attached files
+
+        Raises
+        -----------------------
+        - DatabaseError if too many files
+        - DatabaseError if query errors
+        """
+        if len(files) > MAX_FILES:
+            raise DatabaseError(
+                f"At most {MAX_FILES} yearly databases can be opened"
+            )
+
+        self.__conn = conn
+        self.__files = dict(sorted(files.items()))
+        self.__ranges = ranges
+        self.__active = list(self.__files)
+
+        query = QSqlQuery(conn)
+        query.prepare("ATTACH DATABASE ? AS ? ;")
+        for year, filename in self.__files.items():
+            query.addBindValue(filename)
+            query.addBindValue(f"y{year}")
+            if not SqlTrace.execQuery(query):
+                raise DatabaseError(query.lastError().text())
+
+            applyProfile(conn, profile, schema=f"y{year}")
+        query.finish()
+
+        self.__createViews()
+
+        query = QSqlQuery(self.__conn)
+        if not SqlTrace.execQuery(
+            query,
+            f"""
+            CREATE TEMP VIEW {ALL_EXPENSES}
+            (id, date, type, amount, justification)
+            AS {self.__union("expenses", list(self.__files))} ;
+            """,
+        ):
+            raise DatabaseError(query.lastError().text())
+        query.finish()
+
+    def files(self) -> list[str]:
+        """Return the paths of the files, by year.
+
+        Returns
+        -----------------------
+        list[str]
+            The paths, sorted by year
+        """
+        return list(self.__files.values())
+
+    def setDateRange(self, dates: list[str]):
+        """Include in the views only the files matching a range.
+
+        Statements reading from the views must be finished.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` includes all files
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        active = [
+            year
+            for year, (first, last) in self.__ranges.items()
+            if dates is None or (first <= dates[1] and dates[0] <= last)
+        ]
+
+        if active != self.__active:
+            self.__active = active
+            self.__createViews()
+
+    def tableFor(self, date: str) -> str:
+        """Return the table new expenses with the given date go to.
+
+        Parameters
+        -----------------------
+        date : str
+            Date of the expense, 'yyyy-mm-dd'
+
+        Returns
+        -----------------------
+        str
+            The qualified table name
+
+        Raises
+        -----------------------
+        - DatabaseError if no file for the year of the date
+        """
+        year = date[:4]
+        if not year.isdigit() or int(year) not in self.__files:
+            raise DatabaseError(f"No database for the year of '{date}'")
+
+        return f"y{int(year)}.expenses"
+
+    def locate(self, rowId: int) -> tuple[str, int]:
+        """Return the table and the id in it of an expense.
+
+        Parameters
+        -----------------------
+        rowId : int
+            Id of the expense in the views
+
+        Returns
+        -----------------------
+        tuple[str, int]
+            The qualified table name and the id in the table
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid id
+        """
+        year, local = divmod(rowId, ID_STRIDE)
+        if year not in self.__files:
+            raise DatabaseError(f"Invalid expense id {rowId}")
+
+        return f"y{year}.expenses", local
+
+    def localId(self, value: str | int) -> str | int:
+        """Return the id in its file of an id read from a data file.
+
+        Parameters
+        -----------------------
+        value : str | int
+            Id from the views, or from a single file
+
+        Returns
+        -----------------------
+        str | int
+            The id in the file, "" or `None` if auto-assigned
+
+        Raises
+        -----------------------
+        - DatabaseError if not an integer
+        """
+        if value is None or value == "":
+            return value
+
+        try:
+            return type(value)(int(value) % ID_STRIDE)
+        except ValueError as err:
+            raise DatabaseError(f"Invalid expense id '{value}'") from err
+
+    def __createViews(self):
+        """Create the views over the files of the active years.
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        expenses = self.__union("expenses", self.__active)
+        rollup = self.__union("expense_rollup", self.__active)
+        search = self.__union("expense_search", self.__active)
+
+        query = QSqlQuery(self.__conn)
+        for command in [
+            "DROP VIEW IF EXISTS temp.expenses ;",
+            "DROP VIEW IF EXISTS temp.expense_rollup ;",
+            "DROP VIEW IF EXISTS temp.expense_search ;",
+            f"""
+            CREATE TEMP VIEW expenses
+            (id, date, type, amount, justification)
+            AS {expenses} ;
+            """,
+            f"""
+            CREATE TEMP VIEW expense_rollup
+            (day, type, high, low, inexact, count)
+            AS {rollup} ;
+            """,
+            # MATCH is applied to each full-text table of the union
+            f"""
+            CREATE TEMP VIEW expense_search
+            (rowid, expense_search)
+            AS {search} ;
+            """,
+        ]:
+            if not SqlTrace.execQuery(query, command):
+                raise DatabaseError(query.lastError().text())
+        query.finish()
+
+    def __union(self, table: str, years: list[int]) -> str:
+        """Return the concatenation of a table over some files.
+
+        Parameters
+        -----------------------
+        table : str
+            "expenses", "expense_rollup" or "expense_search"
+        years : list[int]
+            Years of the files, empty for an empty result
+
+        Returns
+        -----------------------
+        str
+            SELECT statement, with view ids for "expenses" and
+            "expense_search"
+        """
+        # an empty view keeps the column names
+        empty = "" if years else " WHERE FALSE"
+        years = years or [next(iter(self.__files))]
+
+        if table == "expenses":
+            return " UNION ALL ".join(
+                f"""
+                SELECT {year} * {ID_STRIDE} + id,
+                    date, type, amount, justification
+                FROM y{year}.expenses{empty}
+                """
+                for year in years
+            )
+
+        if table == "expense_search":
+            return " UNION ALL ".join(
+                f"""
+                SELECT {year} * {ID_STRIDE} + rowid, expense_search
+                FROM y{year}.expense_search{empty}
+                """
+                for year in years
+            )
+
+        return " UNION ALL ".join(
+            f"""
+            SELECT day, type, high, low, inexact, count
+            FROM y{year}.expense_rollup{empty}
+            """
+            for year in years
+        )
+
+
+def connectFederation(
+    filenames: list[str],
+    name: str = FEDERATION_CONNECTION,
+    profile: str = DEFAULT_PROFILE,
+) -> tuple[QSqlDatabase, Federation]:
+    """Validate, migrate and attach a set of per-year databases.
+
+    The year of each file is the last 4-digit number in its
+    name, or the year of its expenses if all in the same year.
+    Each file may hold the dates of its year, and any other
+    date it already contains.
+
+    Parameters
+    -----------------------
+    filenames : list[str]
+        Paths of the databases, one per year
+    name : str
+        Name of the connection
+    profile : str
+        Performance profile of the files
+
+    Returns
+    -----------------------
+    tuple[QSqlDatabase, Federation]
+        The connection, and the federation attached to it
+
+    Raises
+    -----------------------
+    - DatabaseError if database not found
+    - DatabaseError if invalid schema of any database
+    - DatabaseError if year of a database unknown or repeated
+    - DatabaseError if too many databases
+    - DatabaseError if connection errors
+    """
+    if not filenames:
+        raise DatabaseError("No database selected")
+
+    if len(filenames) > MAX_FILES:
+        raise DatabaseError(
+            f"At most {MAX_FILES} yearly databases can be opened"
+        )
+
+    files, ranges = {}, {}
+    for filename in filenames:
+        year, first, last = _inspect(filename, f"{name}-check", profile)
+
+        if year in files:
+            raise DatabaseError(f"More than one database for year {year}")
+
+        files[year] = os.path.abspath(filename)
+        ranges[year] = (
+            min(f"{year:04d}-01-01", first or "9999"),
+            max(f"{year:04d}-12-31", last or "0000"),
+        )
+
+    conn = connect(":memory:", name, profile)
+    return conn, Federation(conn, files, ranges, profile)
+
+
+def _inspect(filename: str, name: str, profile: str) -> tuple[int, str, str]:
+    """Validate and migrate a database, and return its year and dates.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the database
+    name : str
+        Name of the temporary connection
+    profile : str
+        Performance profile of the database
+
+    Returns
+    -----------------------
+    tuple[int, str, str]
+        The year of the database, and its first and last date
+        (`None` if empty)
+
+    Raises
+    -----------------------
+    - DatabaseError if database not found
+    - DatabaseError if invalid schema
+    - DatabaseError if year unknown
+    """
+    if not os.path.isfile(filename):
+        raise DatabaseError(f"Database {filename} does not exists")
+
+    try:
+        first, last = _dateRange(filename, name, profile)
+    finally:
+        disconnect(name)
+
+    years = re.findall(r"\d{4}", os.path.basename(filename))
+    if years:
+        return int(years[-1]), first, last
+
+    if first is not None and first[:4] == last[:4] and first[:4].isdigit():
+        return int(first[:4]), first, last
+
+    raise DatabaseError(f"Cannot tell the year of database {filename}")
+
+
+def _dateRange(filename: str, name: str, profile: str) -> tuple[str, str]:
+    """Validate and migrate a database, and return its dates.
+
+    Kept separate from _inspect(), so that no reference to the
+    connection survives when it is removed.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the database
+    name : str
+        Name of the temporary connection
+    profile : str
+        Performance profile of the database
+
+    Returns
+    -----------------------
+    tuple[str, str]
+        The first and last date, `None` if empty
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid schema
+    - DatabaseError if query errors
+    """
+    conn = connect(filename, name, profile)
+    validateSchema(conn)
+    migrateSchema(conn)
+
+    query = QSqlQuery(conn)
+    if (
+        not SqlTrace.execQuery(
+            query, "SELECT MIN(date), MAX(date) FROM expenses ;"
+        )
+        or not query.next()
+    ):
+        raise DatabaseError(query.lastError().text())
+
+    first, last = query.value(0) or None, query.value(1) or None
+    query.finish()
+
+    return first, last
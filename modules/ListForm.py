@@ -32,19 +32,34 @@ ListForm
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 from PyQt6 import QtCore
-from PyQt6.QtCore import Qt, pyqtSignal, QPersistentModelIndex
+from PyQt6.QtCore import Qt, pyqtSignal, QPersistentModelIndex, QTimer
 from PyQt6.QtWidgets import (
+    QAbstractItemView,
     QWidget,
     QLabel,
     QPushButton,
     QCalendarWidget,
+    QComboBox,
     QGroupBox,
+    QLineEdit,
+    QTabWidget,
 )
 from PyQt6.QtWidgets import QVBoxLayout, QHBoxLayout
-from PyQt6.QtSql import QSqlTableModel, QSqlQueryModel
 
+from modules.Analytics import STATISTICS
 from modules.Common import lockSize
 from modules.CQTableView import CQTableView
+from modules.ExpenseModel import ExpenseModel
+from modules.PeriodSummaryModel import PeriodSummaryModel
+from modules.StatisticsModel import StatisticsModel
+from modules.Summary import PERIODS
+from modules.TypeSummaryModel import TypeSummaryModel
+
+
+# delay after the last calendar or search change before filtering, in ms
+FILTER_DELAY = 300
+# index of the statistics tab
+STATISTICS_TAB = 1
 
 
 class ListForm(QWidget):
@@ -58,21 +73,52 @@ class ListForm(QWidget):
     __tabSum : CQTableView
         Contains the sum of the expenses with dates between the
         two selected dates, grouped by category
+    __tabPeriod : CQTableView
+        Contains the sum of the expenses with dates between the
+        two selected dates, by period and category
+    __cmbPeriod : QComboBox
+        Selects the period of __tabPeriod
+    __butExportSummary : QPushButton
+        Requests the export of __tabPeriod
+    __tabStats : CQTableView
+        Contains a statistic of the expenses with dates between
+        the two selected dates
+    __cmbStatistic : QComboBox
+        Selects the statistic of __tabStats
+    __tbwSummary : QTabWidget
+        Holds the period summary and the statistics
     __calStart : QCalendarWidget
         QCalendarWidget used to select start date in queries
     __calEnd : QCalendarWidget
         QCalendarWidget used to select end date in queries
+    __butUpdate : QPushButton
+        Applies the selected dates immediately
     __butClear : QPushButton
         Clears all data filters
+    __timFilter : QTimer
+        Debounces calendar changes before filtering
+    __lastDates : list[str]
+        Last requested date filter, `None` if cleared
+    __ledSearch : QLineEdit
+        Text searched in the justifications
+    __timSearch : QTimer
+        Debounces typing before searching
+    __lastSearch : str
+        Last requested search text
 
     Public methods
     -----------------------
     __init__(QWidget)
         Construct class instance.
-    setModels(QSqlTableModel)
+    setModels(ExpenseModel, TypeSummaryModel, PeriodSummaryModel,
+              StatisticsModel)
         Set models for the CQTableView objects.
     selection() -> list[QPersistentModelIndex]
         Return the list of the indices of the selected rows.
+    searchText() -> str
+        Return the text typed in the search box.
+    isEditing() -> bool
+        Return whether a field of the list is being edited.
 
     Private methods
     -----------------------
@@ -80,6 +126,8 @@ class ListForm(QWidget):
         Return the initialized and arranged widgets.
     __initConnections()
         Init connections.
+    __selectedDates() -> list[str]
+        Return the dates selected in the calendars.
 
     Signals
     -----------------------
@@ -87,19 +135,65 @@ class ListForm(QWidget):
         Broadcast request to update date filter.
     clearingRequested[]
         Broadcast request to clear date filter.
+    periodRequested[str]
+        Broadcast request to change the summary period.
+    summaryExportRequested[]
+        Broadcast request to export the period summary.
+    statisticRequested[str]
+        Broadcast request to show a statistic.
+    searchRequested[str]
+        Broadcast request to search the justifications.
 
     Private slots
     -----------------------
+    __scheduleFilter()
+        Restart the filtering delay.
+    __requestLiveFilter()
+        Request data filtering, unless dates are unchanged.
     __requestFilter()
         Request data filtering.
     __requestClearing()
         Request table clearing.
+    __requestStatistic()
+        Request the selected statistic, if shown.
+    __scheduleSearch()
+        Restart the searching delay.
+    __requestSearch()
+        Request searching, unless the text is unchanged.
 
     Connections
     -----------------------
+    __calStart.selectionChanged
+        -> __scheduleFilter()
+    __calEnd.selectionChanged
+        -> __scheduleFilter()
+    __timFilter.timeout
+        -> __requestLiveFilter()
+        -> filterRequested(dates)
+    __butUpdate.clicked
+        -> __requestFilter()
+        -> filterRequested(dates)
     __butClear.clicked
         -> __requestClearing()
         -> clearingRequested()
+    __cmbPeriod.currentTextChanged
+        -> periodRequested(period)
+    __butExportSummary.clicked
+        -> summaryExportRequested()
+    __tbwSummary.currentChanged
+        -> __requestStatistic()
+        -> statisticRequested(statistic)
+    __cmbStatistic.currentTextChanged
+        -> __requestStatistic()
+        -> statisticRequested(statistic)
+    __ledSearch.textChanged
+        -> __scheduleSearch()
+    __ledSearch.returnPressed
+        -> __requestSearch()
+        -> searchRequested(text)
+    __timSearch.timeout
+        -> __requestSearch()
+        -> searchRequested(text)
     """
 
     def __init__(self, parent: QWidget):
@@ -114,9 +208,21 @@ class ListForm(QWidget):
 
         self.__tabList = None
         self.__tabSum = None
+        self.__tabPeriod = None
+        self.__cmbPeriod = None
+        self.__butExportSummary = None
+        self.__tabStats = None
+        self.__cmbStatistic = None
+        self.__tbwSummary = None
         self.__calStart = None
         self.__calEnd = None
+        self.__butUpdate = None
         self.__butClear = None
+        self.__timFilter = None
+        self.__lastDates = None
+        self.__ledSearch = None
+        self.__timSearch = None
+        self.__lastSearch = ""
 
         lay = self.__initWidgets()
         self.setLayout(lay)
@@ -125,20 +231,44 @@ class ListForm(QWidget):
 
     def setModels(
         self,
-        listModel: QSqlTableModel,
-        sumModel: QSqlQueryModel,
+        listModel: ExpenseModel,
+        sumModel: TypeSummaryModel,
+        periodModel: PeriodSummaryModel,
+        statsModel: StatisticsModel,
     ):
         """Set models for the CQTableView objects.
 
         Parameters
         -----------------------
-        listModel: QSqlTableModel
+        listModel: ExpenseModel
             Model for the list CQTableView
-        sumModel: QSqQueryModel
+        sumModel: TypeSummaryModel
             Model for the sum CQTableView
+        periodModel: PeriodSummaryModel
+            Model for the period CQTableView
+        statsModel: StatisticsModel
+            Model for the statistics CQTableView
         """
         self.__tabList.setModel(listModel)
         self.__tabSum.setModel(sumModel)
+        self.__tabPeriod.setModel(periodModel)
+        self.__tabStats.setModel(statsModel)
+
+        # showing the period of the model, without requesting it
+        self.__cmbPeriod.blockSignals(True)
+        self.__cmbPeriod.setCurrentText(periodModel.period())
+        self.__cmbPeriod.blockSignals(False)
+
+        # new models are unfiltered
+        self.__lastDates = None
+        self.__timSearch.stop()
+        self.__ledSearch.blockSignals(True)
+        self.__ledSearch.clear()
+        self.__ledSearch.blockSignals(False)
+        self.__lastSearch = ""
+
+        # statistics are computed when shown
+        self.__requestStatistic()
 
     def selection(self) -> list[QPersistentModelIndex]:
         """Return the list of selected indices.
@@ -153,6 +283,26 @@ class ListForm(QWidget):
             for model_idx in self.__tabList.selectionModel().selectedRows()
         ]
 
+    def searchText(self) -> str:
+        """Return the text typed in the search box.
+
+        Returns
+        -----------------------
+        str
+            The searched text, empty if not searching
+        """
+        return self.__ledSearch.text()
+
+    def isEditing(self) -> bool:
+        """Return whether a field of the list is being edited.
+
+        Returns
+        -----------------------
+        bool
+            Whether an editor of the list is open
+        """
+        return self.__tabList.state() == QAbstractItemView.State.EditingState
+
     def __initWidgets(self) -> QHBoxLayout:
         """Return the initialized and arranged widgets.
 
@@ -176,6 +326,55 @@ class ListForm(QWidget):
         gbxSum = QGroupBox("Expense summary")
         gbxSum.setLayout(laySum)
 
+        # period summary table
+        self.__tabPeriod = CQTableView(self)
+
+        # period selector
+        self.__cmbPeriod = QComboBox(self)
+        self.__cmbPeriod.addItems(list(PERIODS))
+
+        # period summary export button
+        self.__butExportSummary = QPushButton("Export...", self)
+
+        layPeriodControls = QHBoxLayout()
+        layPeriodControls.addWidget(QLabel("Totals by", self))
+        layPeriodControls.addWidget(self.__cmbPeriod)
+        layPeriodControls.addStretch()
+        layPeriodControls.addWidget(self.__butExportSummary)
+
+        layPeriod = QVBoxLayout()
+        layPeriod.addLayout(layPeriodControls)
+        layPeriod.addWidget(self.__tabPeriod)
+
+        # period summary page
+        wdgPeriod = QWidget(self)
+        wdgPeriod.setLayout(layPeriod)
+
+        # statistics table
+        self.__tabStats = CQTableView(self)
+
+        # statistic selector
+        self.__cmbStatistic = QComboBox(self)
+        self.__cmbStatistic.addItems(list(STATISTICS))
+
+        layStatsControls = QHBoxLayout()
+        layStatsControls.addWidget(QLabel("Statistic", self))
+        layStatsControls.addWidget(self.__cmbStatistic)
+        layStatsControls.addStretch()
+
+        layStats = QVBoxLayout()
+        layStats.addLayout(layStatsControls)
+        layStats.addWidget(self.__tabStats)
+
+        # statistics page
+        wdgStats = QWidget(self)
+        wdgStats.setLayout(layStats)
+
+        # period summary and statistics tabs
+        self.__tbwSummary = QTabWidget(self)
+        self.__tbwSummary.addTab(wdgPeriod, "Expense summary by period")
+        self.__tbwSummary.addTab(wdgStats, "Statistics")
+
         # start date label
         labStart = QLabel("Start date [included]", self)
         labStart.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -198,6 +397,11 @@ class ListForm(QWidget):
         # clear button (graphical setup)
         self.__butClear = QPushButton("Clear", self)
 
+        # coalescing rapid calendar changes
+        self.__timFilter = QTimer(self)
+        self.__timFilter.setSingleShot(True)
+        self.__timFilter.setInterval(FILTER_DELAY)
+
         # button layout
         layButtons = QHBoxLayout()
         layButtons.addWidget(self.__butUpdate)
@@ -215,24 +419,63 @@ class ListForm(QWidget):
         gbxControl = QGroupBox("Filter by date")
         gbxControl.setLayout(layControls)
 
+        # search box
+        self.__ledSearch = QLineEdit(self)
+        self.__ledSearch.setPlaceholderText("Words in the justification")
+        self.__ledSearch.setClearButtonEnabled(True)
+
+        # coalescing typing
+        self.__timSearch = QTimer(self)
+        self.__timSearch.setSingleShot(True)
+        self.__timSearch.setInterval(FILTER_DELAY)
+
+        laySearch = QVBoxLayout()
+        laySearch.addWidget(self.__ledSearch)
+
+        # search group box
+        gbxSearch = QGroupBox("Search")
+        gbxSearch.setLayout(laySearch)
+
         # control-sum layout
         layControlSum = QVBoxLayout()
         layControlSum.addWidget(gbxSum)
+        layControlSum.addWidget(gbxSearch)
         layControlSum.addWidget(gbxControl)
 
+        # list-period layout
+        layListPeriod = QVBoxLayout()
+        layListPeriod.addWidget(self.__tabList, 3)
+        layListPeriod.addWidget(self.__tbwSummary, 2)
+
         # overall layout
         lay = QHBoxLayout()
-        lay.addWidget(self.__tabList)
+        lay.addLayout(layListPeriod)
         lay.addLayout(layControlSum)
 
         return lay
 
     def __initConnections(self):
         """Init connections."""
+        self.__calStart.selectionChanged.connect(self.__scheduleFilter)
+        self.__calEnd.selectionChanged.connect(self.__scheduleFilter)
+
+        self.__timFilter.timeout.connect(self.__requestLiveFilter)
+
         self.__butUpdate.clicked.connect(self.__requestFilter)
 
         self.__butClear.clicked.connect(self.__requestClearing)
 
+        self.__cmbPeriod.currentTextChanged.connect(self.periodRequested)
+
+        self.__butExportSummary.clicked.connect(self.summaryExportRequested)
+
+        self.__tbwSummary.currentChanged.connect(self.__requestStatistic)
+        self.__cmbStatistic.currentTextChanged.connect(self.__requestStatistic)
+
+        self.__ledSearch.textChanged.connect(self.__scheduleSearch)
+        self.__ledSearch.returnPressed.connect(self.__requestSearch)
+        self.__timSearch.timeout.connect(self.__requestSearch)
+
     filterRequested = pyqtSignal(list)
     """Broadcast request to update date filter.
 
@@ -246,6 +489,54 @@ class ListForm(QWidget):
     clearingRequested = pyqtSignal()
     """Broadcast request to clear date filter."""
 
+    periodRequested = pyqtSignal(str)
+    """Broadcast request to change the summary period.
+
+    Parameters
+    -----------------------
+    period : str
+        A key of Summary.PERIODS
+    """
+
+    summaryExportRequested = pyqtSignal()
+    """Broadcast request to export the period summary."""
+
+    statisticRequested = pyqtSignal(str)
+    """Broadcast request to show a statistic.
+
+    Parameters
+    -----------------------
+    statistic : str
+        A key of Analytics.STATISTICS
+    """
+
+    searchRequested = pyqtSignal(str)
+    """Broadcast request to search the justifications.
+
+    Parameters
+    -----------------------
+    text : str
+        Searched words, empty to show all expenses
+    """
+
+    @QtCore.pyqtSlot()
+    def __scheduleFilter(self):
+        """Restart the filtering delay.
+
+        Each calendar change supersedes the pending one, so that
+        only the latest range is queried.
+        """
+        self.__timFilter.start()
+
+    @QtCore.pyqtSlot()
+    def __requestLiveFilter(self):
+        """Request data filtering, unless dates are unchanged."""
+        if self.__tabList.model() is None:
+            return
+
+        if self.__selectedDates() != self.__lastDates:
+            self.__requestFilter()
+
     @QtCore.pyqtSlot()
     def __requestFilter(self):
         """Request data filtering.
@@ -254,11 +545,28 @@ class ListForm(QWidget):
         and emits 'filterRequested' signal
         with start and end date as arguments
         """
+        # superseding pending calendar changes
+        self.__timFilter.stop()
+
+        if self.__tabList.model() is None:
+            return
+
+        self.__lastDates = self.__selectedDates()
+        self.filterRequested.emit(self.__lastDates)
+
+    def __selectedDates(self) -> list[str]:
+        """Return the dates selected in the calendars.
+
+        Returns
+        -----------------------
+        list[str]
+            [startDate, endDate], 'yyyy-mm-dd'
+        """
         fmt = Qt.DateFormat.ISODate
         startDate = self.__calStart.selectedDate().toString(fmt)
         endDate = self.__calEnd.selectedDate().toString(fmt)
 
-        self.filterRequested.emit([startDate, endDate])
+        return [startDate, endDate]
 
     @QtCore.pyqtSlot()
     def __requestClearing(self):
@@ -267,4 +575,48 @@ class ListForm(QWidget):
         Emits 'filterRequested' signal with `None` argument,
         requesting clearing of date filters
         """
+        # dropping pending calendar changes
+        self.__timFilter.stop()
+
+        if self.__tabList.model() is None:
+            return
+
+        self.__lastDates = None
         self.clearingRequested.emit()
+
+    @QtCore.pyqtSlot()
+    def __requestStatistic(self):
+        """Request the selected statistic, if shown.
+
+        Statistics load all the expenses on first use, and are
+        not requested while the period summary is shown.
+        """
+        if self.__tbwSummary.currentIndex() != STATISTICS_TAB:
+            return
+
+        if self.__tabStats.model() is None:
+            return
+
+        self.statisticRequested.emit(self.__cmbStatistic.currentText())
+
+    @QtCore.pyqtSlot()
+    def __scheduleSearch(self):
+        """Restart the searching delay.
+
+        Each keystroke supersedes the pending one, so that only
+        the latest text is searched.
+        """
+        self.__timSearch.start()
+
+    @QtCore.pyqtSlot()
+    def __requestSearch(self):
+        """Request searching, unless the text is unchanged."""
+        self.__timSearch.stop()
+
+        if self.__tabList.model() is None:
+            return
+
+        text = self.__ledSearch.text()
+        if text != self.__lastSearch:
+            self.__lastSearch = text
+            self.searchRequested.emit(text)
@@ -31,19 +31,42 @@ MainWindow
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import os
+
 from PyQt6 import QtCore
-from PyQt6.QtCore import QSize
-from PyQt6.QtGui import QAction, QIcon
-from PyQt6.QtWidgets import QToolBar, QFileDialog, QMainWindow
+from PyQt6.QtCore import Qt, QSize, QThread, QTimer
+from PyQt6.QtGui import QAction, QCloseEvent, QIcon, QKeySequence
+from PyQt6.QtWidgets import (
+    QToolBar,
+    QFileDialog,
+    QMainWindow,
+    QMessageBox,
+    QProgressDialog,
+)
 
 from modules.Common import ErrorMsg
+from modules.DiagnosticsDialog import DiagnosticsDialog
 from modules.ModelWrapper import DatabaseError, ModelWrapper
+from modules.TransferWorker import (
+    BackupWorker,
+    OpenWorker,
+    RestoreWorker,
+    TransferWorker,
+)
 
 from modules.ListForm import ListForm
 
 
 MAIN_WINDOW_WIDTH = 1200
-MAIN_WINDOW_HEIGHT = 400
+MAIN_WINDOW_HEIGHT = 600
+# delay between the first queued edit and its saving, in ms
+SAVE_DELAY = 5000
+# file dialog filters of data files, with their extensions
+DATA_FILE_FILTERS = {
+    "CSV files (*.csv)": ".csv",
+    "Arrow IPC files (*.arrow)": ".arrow",
+    "Parquet files (*.parquet)": ".parquet",
+}
 
 
 class MainWindow(QMainWindow):
@@ -59,14 +82,44 @@ class MainWindow(QMainWindow):
         The action of creating a new database
     __actOpen : QAction
         The action of logging in to a new database
+    __actOpenSet : QAction
+        The action of logging in to a set of yearly databases
     __actAdd : QAction
         The action of manually adding expenses to the database
     __actRemove : QAction
         The action of removing the selected row
+    __actBatch : QAction
+        The action of toggling batched editing
+    __actSave : QAction
+        The action of saving the queued edits
+    __actRevert : QAction
+        The action of discarding the queued edits
+    __timSave : QTimer
+        Saves the queued edits some time after the first one
     __actImport : QAction
         The action of importing an external CSV file
     __actExport : QAction
         The action of saving the database to an external file
+    __actBackup : QAction
+        The action of copying the database to a backup file
+    __actRestore : QAction
+        The action of replacing the database with a backup file
+    __actDiagnostics : QAction
+        The action of showing the recorded SQL statements
+    __thread : QThread
+        Thread of the running background worker, if any
+    __worker : TransferWorker
+        Running background worker, if any
+    __dlgProgress : QProgressDialog
+        Progress dialog of the running background worker
+    __rejected : tuple[int, str]
+        Number of rows skipped by the running import, and the
+        file they were written to, if any
+    __skipped : int
+        Number of rows of the running import already in the
+        database
+    __restored : bool
+        Whether the running restore copied the backup
 
     Public methods
     -----------------------
@@ -83,40 +136,143 @@ class MainWindow(QMainWindow):
         Init form and dialog connections.
     __initTbConnections()
         Init connections of toolbar actions.
+    __setBusy(bool)
+        Toggle database-related widgets during background work.
+    __startWorker(TransferWorker)
+        Run a transfer worker in a background thread.
+    __startOpening(str | list[str])
+        Open a database, reading it in a background thread.
+    __setModels()
+        Show the models of the wrapper in the list form.
+    __savePending() -> bool
+        Save the queued edits, or discard them if confirmed.
+
+    Reimplemented methods
+    -----------------------
+    closeEvent(QCloseEvent)
 
     Private slots
     -----------------------
     __requestCreate()
         Attempt creation of database.
     __requestOpen()
-        Attempt to open existing database.
+        Attempt to open existing database in the background.
+    __requestOpenSet()
+        Attempt to open a set of yearly databases as one, in the
+        background.
     __requestAdd()
         Manually add expenses to the database.
     __requestRemove()
         Attempt to remove the selected row in the view.
+    __requestBatching(bool)
+        Toggle batched editing.
+    __requestSave()
+        Save the queued edits.
+    __requestAutoSave()
+        Save the queued edits, unless a field is being edited.
+    __requestRevert()
+        Discard the queued edits.
+    __showPending(int)
+        Update the edit actions with the number of queued edits.
     __requestImport()
         Collect filename from user and loads CSV data.
     __requestExport()
         Collect filename from user and dumps database.
+    __requestBackup()
+        Collect filename from user and copies database to it.
+    __requestRestore()
+        Collect filename from user and restores database from it.
+    __requestFilter(list)
+        Filter the expenses by date.
+    __requestClearing()
+        Remove the date filter, keeping the current search.
+    __requestPeriod(str)
+        Change the period of the period summary.
+    __requestSummaryExport()
+        Collect filename from user and saves the period summary.
+    __requestStatistic(str)
+        Show a statistic of the expenses.
+    __requestSearch(str)
+        Search the justifications of the expenses.
+    __requestDiagnostics()
+        Show the recorded SQL statements.
+    __reportProgress(int, int, float)
+        Update progress dialog during transfers.
+    __recordRejects(int, str)
+        Record the rows skipped by the running import.
+    __recordSkipped(int)
+        Record the duplicate rows of the running import.
+    __recordRestored(int)
+        Record that the running restore copied the backup.
+    __showFirstPage(int, list)
+        Switch to the database being opened, with its first page.
+    __showSummary(list, list, list)
+        Show the totals of the database being opened.
+    __finishWorker()
+        Clean up after background transfers and refresh models.
 
     Connections
     -----------------------
     __formLst.filterRequested(dates)
-        -> __models.applyDateFilter(dates)
+        -> __requestFilter(dates)
     __formLst.clearingRequested()
-        -> __models.applyDateFilter(None)
+        -> __requestClearing()
+    __formLst.periodRequested(period)
+        -> __requestPeriod(period)
+    __formLst.summaryExportRequested()
+        -> __requestSummaryExport()
+    __formLst.statisticRequested(statistic)
+        -> __requestStatistic(statistic)
+    __formLst.searchRequested(text)
+        -> __requestSearch(text)
     __actCreate.triggered
         -> __requestCreate()
     __actOpen.triggered
         -> __requestOpen()
+    __actOpenSet.triggered
+        -> __requestOpenSet()
     __actAdd.triggered
         -> __requestAdd()
     __actRemove.triggered
         -> __requestRemove()
+    __actBatch.toggled
+        -> __requestBatching(checked)
+    __actSave.triggered
+        -> __requestSave()
+    __actRevert.triggered
+        -> __requestRevert()
+    __timSave.timeout
+        -> __requestAutoSave()
+    __models.listModel.pendingChanged
+        -> __showPending(count)
     __actImport.triggered
         -> __requestImport()
     __actExport.triggered
         -> __requestExport()
+    __actBackup.triggered
+        -> __requestBackup()
+    __actRestore.triggered
+        -> __requestRestore()
+    __actDiagnostics.triggered
+        -> __requestDiagnostics()
+    __worker.progress(rows, done, rate)
+        -> __reportProgress(rows, done, rate)
+    __worker.failed(message)
+        -> ErrorMsg(message)
+    __worker.finished
+        -> __finishWorker()
+    __worker.pageLoaded(count, rows)
+        -> __showFirstPage(count, rows)
+    __worker.summaryLoaded(typeRows, types, periodRows)
+        -> __showSummary(typeRows, types, periodRows)
+    __worker.rejected(rows, rejects)
+        -> __recordRejects(rows, rejects)
+    __worker.skipped(rows)
+        -> __recordSkipped(rows)
+    __worker.succeeded(pages)
+        -> __recordRestored(pages)
+    __dlgProgress.canceled
+        -> __worker.cancel()
     """
 
     def __init__(self):
@@ -127,10 +283,24 @@ class MainWindow(QMainWindow):
         self.__formLst = None
         self.__actCreate = None
         self.__actOpen = None
+        self.__actOpenSet = None
         self.__actAdd = None
         self.__actRemove = None
+        self.__actBatch = None
+        self.__actSave = None
+        self.__actRevert = None
+        self.__timSave = None
         self.__actImport = None
         self.__actExport = None
+        self.__actBackup = None
+        self.__actRestore = None
+        self.__actDiagnostics = None
+        self.__thread = None
+        self.__worker = None
+        self.__dlgProgress = None
+        self.__rejected = None
+        self.__skipped = 0
+        self.__restored = False
 
         # set to narrow size by default
         self.resize(MAIN_WINDOW_WIDTH, MAIN_WINDOW_HEIGHT)
@@ -162,6 +332,11 @@ class MainWindow(QMainWindow):
         self.__actOpen = QAction(QIcon("resources/open.png"), "Open", self)
         self.__actOpen.setToolTip("Open existing database")
 
+        self.__actOpenSet = QAction(
+            QIcon("resources/openset.png"), "Open set", self
+        )
+        self.__actOpenSet.setToolTip("Open one database per year as one")
+
         self.__actAdd = QAction(QIcon("resources/add.png"), "Add", self)
         self.__actAdd.setToolTip("Add expenses manually")
 
@@ -170,6 +345,28 @@ class MainWindow(QMainWindow):
         )
         self.__actRemove.setToolTip("Remove selected expense")
 
+        self.__actBatch = QAction(
+            QIcon("resources/batch.png"), "Batch edits", self
+        )
+        self.__actBatch.setToolTip("Queue edits and save them together")
+        self.__actBatch.setCheckable(True)
+
+        self.__actSave = QAction(QIcon("resources/save.png"), "Save", self)
+        self.__actSave.setToolTip("Save the queued edits")
+        self.__actSave.setShortcut(QKeySequence.StandardKey.Save)
+        self.__actSave.setEnabled(False)
+
+        self.__actRevert = QAction(
+            QIcon("resources/revert.png"), "Revert", self
+        )
+        self.__actRevert.setToolTip("Discard the queued edits")
+        self.__actRevert.setEnabled(False)
+
+        # write-behind of queued edits
+        self.__timSave = QTimer(self)
+        self.__timSave.setSingleShot(True)
+        self.__timSave.setInterval(SAVE_DELAY)
+
         self.__actImport = QAction(
             QIcon("resources/import.png"), "Import", self
         )
@@ -180,27 +377,58 @@ class MainWindow(QMainWindow):
         )
         self.__actExport.setToolTip("Export database to CSV file")
 
+        self.__actBackup = QAction(
+            QIcon("resources/backup.png"), "Backup", self
+        )
+        self.__actBackup.setToolTip("Copy database to a backup file")
+
+        self.__actRestore = QAction(
+            QIcon("resources/restore.png"), "Restore", self
+        )
+        self.__actRestore.setToolTip("Replace database with a backup file")
+
+        self.__actDiagnostics = QAction(
+            QIcon("resources/diagnostics.png"), "Diagnostics", self
+        )
+        self.__actDiagnostics.setToolTip("Show executed SQL statements")
+        self.__actDiagnostics.setShortcut("F12")
+
         tb.addAction(self.__actCreate)
         tb.addAction(self.__actOpen)
+        tb.addAction(self.__actOpenSet)
         tb.addSeparator()
         tb.addAction(self.__actAdd)
         tb.addAction(self.__actRemove)
         tb.addSeparator()
+        tb.addAction(self.__actBatch)
+        tb.addAction(self.__actSave)
+        tb.addAction(self.__actRevert)
+        tb.addSeparator()
         tb.addAction(self.__actImport)
         tb.addAction(self.__actExport)
+        tb.addAction(self.__actBackup)
+        tb.addAction(self.__actRestore)
+        tb.addSeparator()
+        tb.addAction(self.__actDiagnostics)
 
         self.addToolBar(tb)
 
     def __initConnections(self):
         """Init form and dialog connections."""
-        self.__formLst.filterRequested.connect(
-            lambda dates: self.__models.applyDateFilter(dates)
-        )
+        self.__formLst.filterRequested.connect(self.__requestFilter)
 
-        self.__formLst.clearingRequested.connect(
-            lambda: self.__models.applyDateFilter(None)
+        self.__formLst.clearingRequested.connect(self.__requestClearing)
+
+        self.__formLst.periodRequested.connect(self.__requestPeriod)
+
+        self.__formLst.summaryExportRequested.connect(
+            self.__requestSummaryExport
         )
 
+        self.__formLst.statisticRequested.connect(self.__requestStatistic)
+
+        self.__formLst.searchRequested.connect(self.__requestSearch)
+
     def __initTbConnections(self):
         """Init connections of toolbar actions."""
         # create action
@@ -209,18 +437,34 @@ class MainWindow(QMainWindow):
         # open action
         self.__actOpen.triggered.connect(self.__requestOpen)
 
+        # open yearly databases action
+        self.__actOpenSet.triggered.connect(self.__requestOpenSet)
+
         # add action
         self.__actAdd.triggered.connect(self.__requestAdd)
 
         # add action
         self.__actRemove.triggered.connect(self.__requestRemove)
 
+        # batched editing actions
+        self.__actBatch.toggled.connect(self.__requestBatching)
+        self.__actSave.triggered.connect(self.__requestSave)
+        self.__actRevert.triggered.connect(self.__requestRevert)
+        self.__timSave.timeout.connect(self.__requestAutoSave)
+
         # request importing from CSV
         self.__actImport.triggered.connect(self.__requestImport)
 
         # request exporting to CSV
         self.__actExport.triggered.connect(self.__requestExport)
 
+        # request backup and restore
+        self.__actBackup.triggered.connect(self.__requestBackup)
+        self.__actRestore.triggered.connect(self.__requestRestore)
+
+        # show SQL diagnostics
+        self.__actDiagnostics.triggered.connect(self.__requestDiagnostics)
+
     @QtCore.pyqtSlot()
     def __requestCreate(self):
         """Attempt creation of database."""
@@ -232,16 +476,17 @@ class MainWindow(QMainWindow):
         if filename == "":
             return
 
+        # queued edits belong to the current database
+        if not self.__savePending():
+            return
+
         try:
             self.__models.createDB(filename)
+            self.__models.initModels()
         except DatabaseError as err:
             ErrorMsg(err)
             return
-
-        self.__models.initModels()
-        self.__formLst.setModels(
-            self.__models.listModel, self.__models.sumModel
-        )
+        self.__setModels()
 
     @QtCore.pyqtSlot()
     def __requestOpen(self):
@@ -253,50 +498,442 @@ class MainWindow(QMainWindow):
         if filename == "":
             return
 
-        try:
-            self.__models.openDB(filename)
-        except DatabaseError as err:
-            ErrorMsg(err)
+        self.__startOpening(filename)
+
+    @QtCore.pyqtSlot()
+    def __requestOpenSet(self):
+        """Attempt to open a set of yearly databases as one."""
+        filenames = QFileDialog.getOpenFileNames(
+            self, "Select databases to access, one per year"
+        )[0]
+
+        if not filenames:
             return
 
-        self.__models.initModels()
-        self.__formLst.setModels(
-            self.__models.listModel, self.__models.sumModel
-        )
+        self.__startOpening(filenames)
 
     @QtCore.pyqtSlot()
     def __requestAdd(self):
         """Manually add expenses to the database."""
-        self.__models.addDefaultRecord()
+        try:
+            self.__models.addDefaultRecord()
+        except DatabaseError as err:
+            ErrorMsg(err)
 
     @QtCore.pyqtSlot()
     def __requestRemove(self):
         """Attempt to remove the selected row in the view."""
-        self.__models.removeRecords(self.__formLst.selection())
+        try:
+            self.__models.removeRecords(self.__formLst.selection())
+        except DatabaseError as err:
+            ErrorMsg(err)
+
+    @QtCore.pyqtSlot(bool)
+    def __requestBatching(self, checked: bool):
+        """Toggle batched editing.
+
+        Leaving batched mode saves the queued edits.
+
+        Parameters
+        -----------------------
+        checked : bool
+            Whether edits are queued
+        """
+        try:
+            self.__models.setBatchEditing(checked)
+        except DatabaseError as err:
+            ErrorMsg(err)
+
+            # still batched, the edits are kept
+            self.__actBatch.blockSignals(True)
+            self.__actBatch.setChecked(True)
+            self.__actBatch.blockSignals(False)
+
+    @QtCore.pyqtSlot()
+    def __requestSave(self):
+        """Save the queued edits."""
+        self.__timSave.stop()
+
+        try:
+            self.__models.saveEdits()
+        except DatabaseError as err:
+            ErrorMsg(err)
+
+    @QtCore.pyqtSlot()
+    def __requestAutoSave(self):
+        """Save the queued edits, unless a field is being edited.
+
+        Saving refreshes the list, which would close the editor.
+        """
+        if self.__formLst.isEditing():
+            self.__timSave.start()
+            return
+
+        self.__requestSave()
+
+    @QtCore.pyqtSlot()
+    def __requestRevert(self):
+        """Discard the queued edits."""
+        self.__timSave.stop()
+
+        try:
+            self.__models.revertEdits()
+        except DatabaseError as err:
+            ErrorMsg(err)
+
+    @QtCore.pyqtSlot(int)
+    def __showPending(self, count: int):
+        """Update the edit actions with the number of queued edits.
+
+        The first queued edit starts the saving delay, which
+        later ones do not restart.
+
+        Parameters
+        -----------------------
+        count : int
+            Number of expenses with queued edits
+        """
+        self.__actSave.setEnabled(count > 0)
+        self.__actRevert.setEnabled(count > 0)
+        self.__actSave.setText(f"Save ({count})" if count > 0 else "Save")
+
+        if count == 0:
+            self.__timSave.stop()
+        elif not self.__timSave.isActive():
+            self.__timSave.start()
+
+    def __setBusy(self, busy: bool):
+        """Toggle database-related widgets during background work.
+
+        Parameters
+        -----------------------
+        busy : bool
+            Whether a background worker is running
+        """
+        for act in [
+            self.__actCreate,
+            self.__actOpen,
+            self.__actOpenSet,
+            self.__actAdd,
+            self.__actRemove,
+            self.__actBatch,
+            self.__actImport,
+            self.__actExport,
+            self.__actBackup,
+            self.__actRestore,
+        ]:
+            act.setEnabled(not busy)
+
+        self.__formLst.setEnabled(not busy)
+
+        # queued edits wait for the worker
+        if busy:
+            self.__timSave.stop()
+            self.__actSave.setEnabled(False)
+            self.__actRevert.setEnabled(False)
+        elif self.__models.listModel is not None:
+            self.__showPending(self.__models.listModel.pendingCount())
+
+    def __startOpening(self, database: str | list[str]):
+        """Open a database, reading it in a background thread.
+
+        The current database stays shown, behind the progress
+        dialog, until the first page of the new one is read.
+
+        Parameters
+        -----------------------
+        database : str | list[str]
+            Path of the database, or paths of the yearly databases
+        """
+        # queued edits belong to the current database
+        if not self.__savePending():
+            return
+
+        try:
+            worker = self.__models.openWorker(database)
+        except DatabaseError as err:
+            ErrorMsg(err)
+            return
+
+        worker.pageLoaded.connect(self.__showFirstPage)
+        worker.summaryLoaded.connect(self.__showSummary)
+
+        self.__startWorker(worker)
+
+    def __setModels(self):
+        """Show the models of the wrapper in the list form."""
+        self.__formLst.setModels(
+            self.__models.listModel,
+            self.__models.sumModel,
+            self.__models.periodModel,
+            self.__models.statsModel,
+        )
+
+        self.__models.listModel.pendingChanged.connect(self.__showPending)
+        self.__showPending(0)
+
+    def __savePending(self) -> bool:
+        """Save the queued edits, or discard them if confirmed.
+
+        Returns
+        -----------------------
+        bool
+            Whether no queued edits are left
+        """
+        listModel = self.__models.listModel
+        if listModel is None or listModel.pendingCount() == 0:
+            return True
+
+        try:
+            self.__models.saveEdits()
+        except DatabaseError as err:
+            answer = QMessageBox.question(
+                self,
+                "Unsaved edits",
+                f"{err}\n\nDiscard the unsaved edits?",
+            )
+            if answer != QMessageBox.StandardButton.Yes:
+                return False
+
+            listModel.discardEdits()
+
+        return True
+
+    def closeEvent(self, event: QCloseEvent):
+        """Save the queued edits before closing."""
+        if not self.__savePending():
+            event.ignore()
+            return
+
+        super().closeEvent(event)
+
+    def __startWorker(self, worker: TransferWorker):
+        """Run a transfer worker in a background thread.
+
+        The transfer can be cancelled from the progress dialog.
+
+        Parameters
+        -----------------------
+        worker : TransferWorker
+            Worker to run
+        """
+        self.__worker = worker
+        self.__thread = QThread(self)
+        self.__worker.moveToThread(self.__thread)
+
+        self.__dlgProgress = QProgressDialog(
+            "Starting...", "Cancel", 0, 100, self
+        )
+        self.__dlgProgress.setWindowTitle(self.__worker.title)
+        self.__dlgProgress.setAutoClose(False)
+        self.__dlgProgress.setAutoReset(False)
+
+        # the worker thread is busy, cancel() is called directly
+        self.__dlgProgress.canceled.connect(
+            self.__worker.cancel, Qt.ConnectionType.DirectConnection
+        )
+
+        self.__thread.started.connect(self.__worker.run)
+        self.__worker.progress.connect(self.__reportProgress)
+        self.__worker.failed.connect(lambda msg: ErrorMsg(msg))
+        self.__worker.finished.connect(self.__finishWorker)
+
+        self.__setBusy(True)
+        self.__dlgProgress.show()
+        self.__thread.start()
 
     @QtCore.pyqtSlot()
     def __requestImport(self):
-        """Collect filename from user and loads CSV data."""
-        filename = QFileDialog.getOpenFileName(self, "Specify file to import")[
-            0
-        ]
+        """Collect filename from user and loads CSV data.
+
+        Arrow IPC and Parquet files are recognized by their
+        extension. The import runs in a background thread, with
+        its own connection. Invalid rows of CSV files are skipped,
+        and written to a '.rejects.csv' file next to the input.
+        """
+        filename = QFileDialog.getOpenFileName(
+            self,
+            "Specify file to import",
+            None,
+            ";;".join(list(DATA_FILE_FILTERS) + ["All files (*)"]),
+        )[0]
 
         if filename == "":
             return
 
+        rejects = f"{os.path.splitext(filename)[0]}.rejects.csv"
+
         try:
-            self.__models.importCSV(filename)
+            worker = self.__models.importWorker(filename, rejects)
         except DatabaseError as err:
             ErrorMsg(err)
             return
 
+        worker.rejected.connect(self.__recordRejects)
+        worker.skipped.connect(self.__recordSkipped)
+
+        self.__startWorker(worker)
+
     @QtCore.pyqtSlot()
     def __requestExport(self):
-        """Collect filename from user and dumps database."""
-        filename = QFileDialog.getSaveFileName(
+        """Collect filename from user and dumps database.
+
+        The format follows the selected filter, or the extension
+        of the file. If a date filter is active, the user can
+        choose to export only the matching expenses. The export
+        runs in a background thread, with its own connection.
+        """
+        filename, selected = QFileDialog.getSaveFileName(
             self,
             "Specify file for exporting",
             None,
+            ";;".join(DATA_FILE_FILTERS),
+        )
+
+        if filename == "":
+            return
+
+        if os.path.splitext(filename)[1] == "":
+            filename += DATA_FILE_FILTERS.get(selected, ".csv")
+
+        # the exported file includes the queued edits
+        if not self.__savePending():
+            return
+
+        filtered = False
+        if self.__models.dateFilter() is not None:
+            answer = QMessageBox.question(
+                self,
+                "Export",
+                "Export only the expenses in the selected date range?",
+            )
+            filtered = answer == QMessageBox.StandardButton.Yes
+
+        try:
+            worker = self.__models.exportWorker(filename, filtered)
+        except DatabaseError as err:
+            ErrorMsg(err)
+            return
+
+        self.__startWorker(worker)
+
+    @QtCore.pyqtSlot()
+    def __requestBackup(self):
+        """Collect filename from user and copies database to it.
+
+        The copy runs in a background thread, a few pages at a
+        time, while the database stays usable.
+        """
+        filename = QFileDialog.getSaveFileName(
+            self,
+            "Specify file for the backup",
+            None,
+            "Database files (*.db);;All files (*)",
+        )[0]
+
+        if filename == "":
+            return
+
+        # the backup includes the queued edits
+        if not self.__savePending():
+            return
+
+        try:
+            worker = self.__models.backupWorker(filename)
+        except DatabaseError as err:
+            ErrorMsg(err)
+            return
+
+        self.__startWorker(worker)
+
+    @QtCore.pyqtSlot()
+    def __requestRestore(self):
+        """Collect filename from user and restores database from it.
+
+        The backup is copied in a background thread, and replaces
+        the database once the copy is complete.
+        """
+        filename = QFileDialog.getOpenFileName(
+            self,
+            "Select backup to restore",
+            None,
+            "Database files (*.db);;All files (*)",
+        )[0]
+
+        if filename == "":
+            return
+
+        answer = QMessageBox.question(
+            self,
+            "Restore",
+            "The current database will be replaced by the backup. Continue?",
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+
+        # queued edits would be lost anyway, but saved in case
+        # the restore fails
+        if not self.__savePending():
+            return
+
+        try:
+            worker = self.__models.restoreWorker(filename)
+        except DatabaseError as err:
+            ErrorMsg(err)
+            return
+
+        worker.succeeded.connect(self.__recordRestored)
+
+        self.__startWorker(worker)
+
+    @QtCore.pyqtSlot(list)
+    def __requestFilter(self, dates: list[str]):
+        """Filter the expenses by date.
+
+        The current search is kept.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            [startDate, endDate], both included
+        """
+        try:
+            self.__models.applyDateFilter(dates, self.__formLst.searchText())
+        except DatabaseError as err:
+            ErrorMsg(err)
+
+    @QtCore.pyqtSlot()
+    def __requestClearing(self):
+        """Remove the date filter, keeping the current search."""
+        try:
+            self.__models.applyDateFilter(None, self.__formLst.searchText())
+        except DatabaseError as err:
+            ErrorMsg(err)
+
+    @QtCore.pyqtSlot(str)
+    def __requestPeriod(self, period: str):
+        """Change the period of the period summary.
+
+        Parameters
+        -----------------------
+        period : str
+            A key of Summary.PERIODS
+        """
+        try:
+            self.__models.setSummaryPeriod(period)
+        except DatabaseError as err:
+            ErrorMsg(err)
+
+    @QtCore.pyqtSlot()
+    def __requestSummaryExport(self):
+        """Collect filename from user and saves the period summary.
+
+        The summary covers the selected date range, if any.
+        """
+        filename = QFileDialog.getSaveFileName(
+            self,
+            "Specify file for the summary",
+            None,
             "CSV files (*.csv)",
         )[0]
 
@@ -304,7 +941,201 @@ class MainWindow(QMainWindow):
             return
 
         try:
-            self.__models.saveCSV(filename)
+            self.__models.saveSummaryCSV(filename)
         except DatabaseError as err:
             ErrorMsg(err)
+
+    @QtCore.pyqtSlot(str)
+    def __requestStatistic(self, statistic: str):
+        """Show a statistic of the expenses.
+
+        Parameters
+        -----------------------
+        statistic : str
+            A key of Analytics.STATISTICS
+        """
+        try:
+            self.__models.setStatistic(statistic)
+        except DatabaseError as err:
+            ErrorMsg(err)
+
+    @QtCore.pyqtSlot(str)
+    def __requestSearch(self, text: str):
+        """Search the justifications of the expenses.
+
+        The current date filter is kept.
+
+        Parameters
+        -----------------------
+        text : str
+            Searched words, empty to show all expenses
+        """
+        try:
+            self.__models.applyDateFilter(self.__models.dateFilter(), text)
+        except DatabaseError as err:
+            ErrorMsg(err)
+
+    @QtCore.pyqtSlot()
+    def __requestDiagnostics(self):
+        """Show the recorded SQL statements."""
+        try:
+            stats = self.__models.statementStats()
+            settings = self.__models.databaseSettings()
+        except DatabaseError:
+            # no open database
+            stats, settings = None, None
+
+        DiagnosticsDialog(self, stats, settings).exec()
+
+    @QtCore.pyqtSlot(int, int, float)
+    def __reportProgress(self, rows: int, done: int, rate: float):
+        """Update progress dialog during transfers.
+
+        Parameters
+        -----------------------
+        rows : int
+            Number of rows processed
+        done : int
+            Work done, out of the worker total
+        rate : float
+            Processed units per second
+        """
+        total = max(self.__worker.total, 1)
+        unit = self.__worker.unit
+        self.__dlgProgress.setValue(min(100, 100 * done // total))
+        self.__dlgProgress.setLabelText(f"{rows} {unit} ({rate:.0f} {unit}/s)")
+
+    @QtCore.pyqtSlot(int, str)
+    def __recordRejects(self, rows: int, rejects: str):
+        """Record the rows skipped by the running import.
+
+        They are reported when the import finishes.
+
+        Parameters
+        -----------------------
+        rows : int
+            Number of rejected rows
+        rejects : str
+            Path of the CSV file of rejected rows
+        """
+        self.__rejected = (rows, rejects)
+
+    @QtCore.pyqtSlot(int)
+    def __recordSkipped(self, rows: int):
+        """Record the duplicate rows of the running import.
+
+        They are reported when the import finishes.
+
+        Parameters
+        -----------------------
+        rows : int
+            Number of rows already in the database
+        """
+        self.__skipped = rows
+
+    @QtCore.pyqtSlot(int)
+    def __recordRestored(self, pages: int):
+        """Record that the running restore copied the backup.
+
+        The database is replaced when the restore finishes.
+
+        Parameters
+        -----------------------
+        pages : int
+            Number of copied pages
+        """
+        self.__restored = True
+
+    @QtCore.pyqtSlot(int, list)
+    def __showFirstPage(self, count: int, rows: list):
+        """Switch to the database being opened, with its first page.
+
+        Parameters
+        -----------------------
+        count : int
+            Number of expenses
+        rows : list[list]
+            Rows of the first page
+        """
+        try:
+            self.__models.openLoaded(count, rows)
+        except DatabaseError as err:
+            # the totals are not needed anymore
+            self.__worker.cancel()
+            ErrorMsg(err)
             return
+
+        self.__setModels()
+
+    @QtCore.pyqtSlot(list, list, list)
+    def __showSummary(self, typeRows: list, types: list, periodRows: list):
+        """Show the totals of the database being opened.
+
+        Parameters
+        -----------------------
+        typeRows : list[tuple[str, float]]
+            (type, total) pairs, sorted by type
+        types : list[str]
+            Types of the totals by period, in column order
+        periodRows : list[tuple[str, list[float]]]
+            (period, totals by type) pairs, in row order
+        """
+        self.__models.fillSummary(typeRows, types, periodRows)
+
+    @QtCore.pyqtSlot()
+    def __finishWorker(self):
+        """Clean up after background transfers and refresh models."""
+        self.__thread.quit()
+        self.__thread.wait()
+
+        self.__dlgProgress.close()
+
+        self.__worker.deleteLater()
+        self.__thread.deleteLater()
+        self.__dlgProgress.deleteLater()
+        opening = isinstance(self.__worker, OpenWorker)
+        # a backup leaves the database unchanged
+        copying = isinstance(self.__worker, BackupWorker)
+        restoring = isinstance(self.__worker, RestoreWorker)
+        restored, self.__restored = self.__restored, False
+        self.__worker = None
+        self.__thread = None
+        self.__dlgProgress = None
+
+        # single refresh, whatever the outcome
+        try:
+            if opening:
+                self.__models.finishOpening()
+            elif restored:
+                try:
+                    self.__models.swapRestored()
+                finally:
+                    # the connection is opened again, either way
+                    self.__models.initModels()
+                    self.__setModels()
+            elif restoring:
+                # failed or cancelled, the database is unchanged
+                self.__models.discardRestored()
+            elif not copying:
+                self.__models.refreshModels()
+        except DatabaseError as err:
+            ErrorMsg(err)
+
+        self.__setBusy(False)
+
+        if self.__rejected is not None:
+            rows, rejects = self.__rejected
+            self.__rejected = None
+            QMessageBox.warning(
+                self,
+                "Import",
+                f"{rows} invalid rows were skipped, see '{rejects}'",
+            )
+
+        if self.__skipped:
+            rows, self.__skipped = self.__skipped, 0
+            QMessageBox.information(
+                self,
+                "Import",
+                f"{rows} rows already in the database were skipped",
+            )
@@ -2,8 +2,6 @@
 
 Classes
 -----------------------
-DatabaseError
-    Subclassed exception for errors in db Connection.
 ModelWrapper
     Wrapper for list and sum models.
 """
@@ -33,23 +31,45 @@ ModelWrapper
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from string import Template
-import csv
 import os
 import datetime
+import json
 
-from PyQt6.QtCore import Qt, QPersistentModelIndex
+from PyQt6.QtCore import QPersistentModelIndex
+from PyQt6.QtSql import QSqlDatabase
 from PyQt6.QtWidgets import QWidget
-from PyQt6.QtSql import (
-    QSqlDatabase,
-    QSqlQuery,
-    QSqlTableModel,
-    QSqlQueryModel,
+
+from modules import SqlTrace, Transfer
+from modules.Analytics import STATISTICS, Analytics, fingerprint, loadAnalytics
+from modules.Config import (
+    analyticsCache,
+    cacheDirectory,
+    databaseProfile,
+    skipDuplicates,
+)
+from modules.Database import DatabaseError, connect, disconnect, settings
+from modules.Duplicates import DuplicateFilter
+from modules.ExpenseModel import ExpenseModel
+from modules.Federation import ALL_EXPENSES, connectFederation
+from modules.PeriodSummaryModel import DEFAULT_PERIOD, PeriodSummaryModel
+from modules.Schema import createSchema, migrateSchema, validateSchema
+from modules.StatementCache import StatementCache
+from modules.StatisticsModel import StatisticsModel
+from modules.Summary import PERIODS
+from modules.TransferWorker import (
+    BackupWorker,
+    ExportWorker,
+    ImportWorker,
+    OpenWorker,
+    RestoreWorker,
 )
+from modules.TypeSummaryModel import TypeSummaryModel
 
 
-class DatabaseError(Exception):
-    """Subclassed exception for errors in db Connection."""
+# number of ids deleted per statement
+DELETE_CHUNK_SIZE = 10000
+# connection switching the journal of a database to restore
+RESTORE_CONNECTION = "sem-restore"
 
 
 class ModelWrapper:
@@ -57,10 +77,14 @@ class ModelWrapper:
 
     Public attributes
     -----------------------
-    listModel: QSqlTableModel
+    listModel: ExpenseModel
         Model for general expense data
-    sumModel: QSqlQueryModel
+    sumModel: TypeSummaryModel
         Model for expense amounts aggregated by type
+    periodModel: PeriodSummaryModel
+        Model for expense amounts aggregated by period and type
+    statsModel: StatisticsModel
+        Model for statistics of the expense amounts
 
     Private attributes
     -----------------------
@@ -68,6 +92,32 @@ class ModelWrapper:
         Parent QWidget
     __conn: QSqlDatabase
         Database connection
+    __federation: Federation
+        Yearly databases of the connection, `None` if single
+    __statements: StatementCache
+        Prepared statements of the connection
+    __dates: list[str]
+        Current date filter, `None` if not filtering
+    __search: str
+        Text searched in the justifications, `None` if not searching
+    __period: str
+        Current period of the period model
+    __profile: str
+        Requested performance profile, `None` for the configured one
+    __openProfile: str
+        Performance profile of the open connection
+    __analytics: tuple[list, Analytics]
+        Fingerprint of the databases and arrays loaded from
+        them, `None` if not loaded
+    __batched: bool
+        Whether edits of the list model are queued
+    __opening: str | list[str]
+        Database read by an OpenWorker, `None` if not opening
+    __summaryPending: bool
+        Whether the totals of the opened database are awaited
+    __restoring: str
+        Database to be replaced by the copy of a RestoreWorker,
+        `None` if not restoring
 
     Public methods
     -----------------------
@@ -77,39 +127,119 @@ class ModelWrapper:
         Create and init connection to new DB.
     openDB(str)
         Create and init connection to existing DB.
-    initModels()
-        Initialize list and sum models.
-    applyDateFilter(list[str])
-        Apply filter to models with the specified dates.
+    openFederation(list[str])
+        Create and init connection to a set of yearly DBs.
+    openWorker(str | list[str]) -> OpenWorker
+        Return a worker reading a database to open in the background.
+    openLoaded(int, list[list])
+        Open the database read by the worker, showing its first page.
+    fillSummary(list, list[str], list)
+        Show the totals read by the worker.
+    finishOpening()
+        Compute the totals the worker did not read.
+    initModels(tuple[int, list[list]])
+        Initialize list and summary models.
+    applyDateFilter(list[str], str)
+        Apply filter to models with the specified dates and text.
+    dateFilter() -> list[str]
+        Return the current date filter.
+    searchFilter() -> str
+        Return the text currently searched.
+    statementStats() -> dict[str, int]
+        Return hit and miss counters of the statement cache.
+    databaseSettings() -> dict[str, str | int]
+        Return the performance settings of the connection.
+    setBatchEditing(bool)
+        Queue edits of the list model, or commit them at once.
+    batchEditing() -> bool
+        Return whether edits of the list model are queued.
+    saveEdits()
+        Write the queued edits in a single transaction.
+    revertEdits()
+        Discard the queued edits.
     addDefaultRecord()
         Add a default record to the end of the DB.
     removeRecords(list[QPersistentModelIndex])
         Remove the records with the given indices from the model.
+    refreshModels()
+        Re-run the queries of list and summary models.
+    setSummaryPeriod(str)
+        Group the totals of the period model by the given period.
+    setStatistic(str)
+        Show the given statistic in the statistics model.
+    analytics() -> Analytics
+        Return the expense arrays, reloaded if the DB changed.
     importCSV(str)
         Append the contents of a CSV file to the database.
-    saveCSV(str)
+    importWorker(str, str) -> ImportWorker
+        Return a worker importing a data file in the background.
+    saveCSV(str, bool)
         Dump the database to a CSV file.
+    exportWorker(str, bool) -> ExportWorker
+        Return a worker dumping the database in the background.
+    saveSummaryCSV(str)
+        Write the totals of the period model to a CSV file.
+    backupWorker(str) -> BackupWorker
+        Return a worker copying the database to a backup file.
+    restoreWorker(str) -> RestoreWorker
+        Return a worker copying a backup to restore.
+    swapRestored()
+        Replace the database with the backup copied by the worker.
+    discardRestored(str)
+        Drop the backup copied by a worker, if any.
     closeDB()
         Close connection with DB.
+
+    Private methods
+    -----------------------
+    __resolveProfile() -> str
+        Return the performance profile for new connections.
+    __database() -> str | list[str]
+        Return the path of the database, or of the yearly ones.
+    __partitionIds(list[int]) -> dict[str, list[int]]
+        Group expense ids by the table holding them.
+    __closeConnection()
+        Drop prepared statements and close the connection.
+    __dropJournal(str) -> str
+        Switch a closed database to a rollback journal.
     """
 
-    def __init__(self, parent: QWidget):
+    def __init__(self, parent: QWidget, profile: str = None):
         """Construct class instance.
 
         Parameters
         -----------------------
         parent : QWidget
             Parent QWidget
+        profile : str
+            Performance profile of the connections, `None` to
+            read it from the configuration file at each opening
         """
         super().__init__()
 
         self.listModel = None
         self.sumModel = None
+        self.periodModel = None
+        self.statsModel = None
         self.__parent = None
         self.__conn = None
+        self.__federation = None
+        self.__statements = None
+        self.__dates = None
+        self.__search = None
+        self.__period = DEFAULT_PERIOD
+        self.__profile = None
+        self.__openProfile = None
+        self.__analytics = None
+        self.__batched = False
+        self.__opening = None
+        self.__summaryPending = False
+        self.__restoring = None
 
         self.__parent = parent
+        self.__profile = profile
 
+    @SqlTrace.traced
     def createDB(self, filename: str):
         """Create and init connection to new DB.
 
@@ -121,49 +251,27 @@ class ModelWrapper:
         Raises
         -----------------------
         - DatabaseError if database exists
+        - DatabaseError if invalid configuration file
         - DatabaseError if other connection errors
+        - DatabaseError if schema creation errors
         """
         # checking if db already exists
         if os.path.isfile(filename):
             raise DatabaseError("Database already exists")
 
-        # Closing connection if currently active
-        if self.__conn is not None:
-            if self.__conn.isOpen():
-                self.__conn.close()
+        profile = self.__resolveProfile()
 
-        # opening default connection
-        self.__conn = QSqlDatabase.addDatabase("QSQLITE")
-        self.__conn.setDatabaseName(filename)
+        # Closing connection if currently active
+        self.__closeConnection()
 
-        # misc errors in connection opening
-        chk = self.__conn.open()
-        if not chk:
-            raise DatabaseError(self.__conn.lastError().text())
+        # opening default connection, page size still settable
+        self.__conn = connect(filename, profile=profile, new=True)
+        self.__openProfile = profile
 
-        query = QSqlQuery()
-
-        # creating and indexing 'expenses' table
-        # checks here because SQLite is "dynamically" typed
-        command = """
-            CREATE TABLE expenses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT
-                    CHECK (TYPEOF(id) == ('integer')),
-                date DATE NOT NULL
-                    CHECK (DATE(date) IS date),
-                type CHAR(1) NOT NULL
-                    CHECK (LENGTH(type) == 1),
-                amount DOUBLE PRECISION NOT NULL
-                    CHECK (TYPEOF(amount) IN ('integer', 'real')),
-                justification VARCHAR(100) NOT NULL
-                    CHECK (LENGTH(justification) <= 100)
-            ) ;
-        """
-        query.exec(command)
-        query.exec("CREATE INDEX date_index ON expenses(date) ;")
-
-        query.finish()
+        # creating 'expenses' table and derived objects
+        createSchema(self.__conn)
 
+    @SqlTrace.traced
     def openDB(self, filename: str):
         """Create and init connection to existing DB.
 
@@ -175,121 +283,230 @@ class ModelWrapper:
         Raises
         -----------------------
         - DatabaseError if database not found
+        - DatabaseError if invalid configuration file
         - DatabaseError if other connection errors
         - DatabaseError if 'expenses' table not found
         - DatabaseError if schema of 'expenses' is not valid
+        - DatabaseError if schema version is not supported
+        - DatabaseError if schema migration errors
         """
         # checking if db already exists
         if not os.path.isfile(filename):
             raise DatabaseError("Database does not exists")
 
+        profile = self.__resolveProfile()
+
         # Closing connection if currently active
-        if self.__conn is not None:
-            if self.__conn.isOpen():
-                self.__conn.close()
+        self.__closeConnection()
 
         # opening default connection
-        self.__conn = QSqlDatabase.addDatabase("QSQLITE")
-        self.__conn.setDatabaseName(filename)
+        self.__conn = connect(filename, profile=profile)
+        self.__openProfile = profile
 
-        # misc errors in connection opening
-        chk = self.__conn.open()
-        if not chk:
-            raise DatabaseError(self.__conn.lastError().text())
+        # diagnosing corrupted databases
+        validateSchema(self.__conn)
 
-        query = QSqlQuery()
-
-        # checking for existence of 'expenses' table
-        if "expenses" not in self.__conn.tables():
-            raise DatabaseError("Invalid database schema")
-
-        # checking for validity of schema of 'expense' table
-        query.exec("PRAGMA TABLE_INFO('expenses') ;")
-
-        names, types, notnulls = [], [], []
-        nm, tp, nn = 1, 2, 3
-
-        # fetching table information based on index
-        while query.next():
-            names.append(query.value(nm))
-            types.append(query.value(tp))
-            notnulls.append(query.value(nn))
-
-        # checking against expected output
-        # (apparently for SQLite3 primary keys are not not-null...)
-        if (
-            names
-            != [
-                "id",
-                "date",
-                "type",
-                "amount",
-                "justification",
-            ]
-            or types
-            != [
-                "INTEGER",
-                "DATE",
-                "CHAR(1)",
-                "DOUBLE PRECISION",
-                "VARCHAR(100)",
-            ]
-            or notnulls != [0, 1, 1, 1, 1]
-        ):
-            raise DatabaseError("Corrupted table")
-
-        query.finish()
-
-    def initModels(self):
-        """Initialize list and sum models.
+        # upgrading older databases
+        migrateSchema(self.__conn)
+
+    @SqlTrace.traced
+    def openFederation(self, filenames: list[str]):
+        """Create and init connection to a set of yearly DBs.
+
+        The databases are seen as a single one, see the
+        Federation module.
+
+        Parameters
+        -----------------------
+        filenames : list[str]
+            Paths of the databases, one per year
 
         Raises
         -----------------------
-        - DatabaseError if invalid Connection
+        - DatabaseError if database not found
+        - DatabaseError if invalid configuration file
+        - DatabaseError if invalid schema of any database
+        - DatabaseError if year of a database unknown or repeated
+        - DatabaseError if too many databases
+        - DatabaseError if other connection errors
         """
-        if self.__conn is None:
-            raise DatabaseError("Uninitialized connection")
+        profile = self.__resolveProfile()
 
-        # using default connection
-        self.listModel = QSqlTableModel(self.__parent)
-        self.listModel.setTable("expenses")
-        # sorting by date (newest first)
-        self.listModel.setSort(0, Qt.SortOrder.DescendingOrder)
+        # Closing connection if currently active
+        self.__closeConnection()
 
-        # setting edit strategy
-        self.listModel.setEditStrategy(
-            QSqlTableModel.EditStrategy.OnFieldChange
+        # validated and migrated one by one, then attached
+        self.__conn, self.__federation = connectFederation(
+            filenames, profile=profile
         )
+        self.__openProfile = profile
 
-        self.listModel.select()
+    def openWorker(self, database: str | list[str]) -> OpenWorker:
+        """Return a worker reading a database to open in the background.
+
+        The current connection stays open until openLoaded() is
+        called with the results of the worker.
+
+        Parameters
+        -----------------------
+        database : str | list[str]
+            Path of the database, or paths of the yearly databases
 
-        # sum model
-        self.sumModel = QSqlQueryModel()
+        Returns
+        -----------------------
+        OpenWorker
+            The worker, to be moved to a QThread
 
-        # setting basic query
-        self.sumModel.setQuery(
-            """
-            SELECT type, SUM(amount)
-            FROM expenses
-            GROUP BY type
-            ORDER BY type ;
+        Raises
+        -----------------------
+        - DatabaseError if database not found
+        - DatabaseError if invalid configuration file
         """
+        if isinstance(database, str) and not os.path.isfile(database):
+            raise DatabaseError("Database does not exists")
+
+        worker = OpenWorker(database, self.__period, self.__resolveProfile())
+        self.__opening = database
+
+        return worker
+
+    def openLoaded(self, count: int, rows: list[list]):
+        """Open the database read by the worker, showing its first page.
+
+        The schema has been migrated by the worker, so that
+        opening is quick; the totals are shown by fillSummary().
+
+        Parameters
+        -----------------------
+        count : int
+            Number of expenses
+        rows : list[list]
+            Rows of the first page
+
+        Raises
+        -----------------------
+        - DatabaseError if no database being opened
+        - DatabaseError if connection errors, see openDB()
+        """
+        if self.__opening is None:
+            raise DatabaseError("No database being opened")
+
+        database, self.__opening = self.__opening, None
+
+        if isinstance(database, list):
+            self.openFederation(database)
+        else:
+            self.openDB(database)
+
+        self.initModels((count, rows))
+        self.__summaryPending = True
+
+    def fillSummary(
+        self,
+        typeRows: list[tuple[str, float]],
+        types: list[str],
+        periodRows: list[tuple[str, list[float]]],
+    ):
+        """Show the totals read by the worker.
+
+        Ignored if the database was not opened by openLoaded().
+
+        Parameters
+        -----------------------
+        typeRows : list[tuple[str, float]]
+            (type, total) pairs, sorted by type
+        types : list[str]
+            Types of the totals by period, in column order
+        periodRows : list[tuple[str, list[float]]]
+            (period, totals by type) pairs, in row order
+        """
+        if not self.__summaryPending:
+            return
+
+        self.__summaryPending = False
+        self.sumModel.setRows(typeRows)
+        self.periodModel.setRows(self.__period, types, periodRows)
+
+    @SqlTrace.traced
+    def finishOpening(self):
+        """Compute the totals the worker did not read.
+
+        To be called when the worker finishes, whatever the
+        outcome.
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        self.__opening = None
+
+        if not self.__summaryPending:
+            return
+
+        self.__summaryPending = False
+        self.sumModel.select()
+        self.periodModel.setPeriod(self.__period)
+
+    @SqlTrace.traced
+    def initModels(self, page: tuple[int, list[list]] = None):
+        """Initialize list and summary models.
+
+        Parameters
+        -----------------------
+        page : tuple[int, list[list]]
+            Number of expenses and first page of the list, read
+            in the background; `None` to query them, and the
+            totals, at once
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        # prepared statements of the connection
+        self.__statements = StatementCache(self.__conn)
+
+        # windowed model, edits committed on field change or queued
+        self.listModel = ExpenseModel(
+            self.__statements, self.__parent, self.__federation
         )
+        self.listModel.setBatched(self.__batched)
+
+        self.__dates = None
+        self.__search = None
 
-        # has to be done after setting up the query
-        # or names will be overridden by the query fields
-        colnames = ["type", "sum"]
-        for i, c in enumerate(colnames):
-            self.sumModel.setHeaderData(i, Qt.Orientation.Horizontal, c)
+        # totals by type, and pivoted totals
+        self.sumModel = TypeSummaryModel(self.__statements, self.__parent)
+        self.periodModel = PeriodSummaryModel(self.__statements, self.__parent)
 
-    def applyDateFilter(self, dates: list[str]):
+        if page is None:
+            self.listModel.select()
+            self.sumModel.select()
+            self.periodModel.setPeriod(self.__period)
+        else:
+            # totals are filled when read
+            self.listModel.setFirstPage(*page)
+            self.periodModel.setRows(self.__period, [], [])
+
+        # statistics, computed once selected
+        self.statsModel = StatisticsModel(self.analytics, self.__parent)
+
+    @SqlTrace.traced
+    def applyDateFilter(self, dates: list[str], search: str = None):
         """Apply data filter to the model.
 
+        The searched text restricts the list, sum and period
+        models; statistics and exports only follow the dates.
+
         Parameters
         -----------------------
         dates : list[str]
             - [startDate, endDate], both included
-            - `None` removes all filters
+            - `None` removes the date filter
+        search : str
+            Text searched in the justifications, `None` for all
 
         Raises
         -----------------------
@@ -299,133 +516,471 @@ class ModelWrapper:
         if self.__conn is None:
             raise DatabaseError("Uninitialized connection")
 
-        # string template for the sum model
-        queryTemplate = Template(
-            """
-            SELECT type, SUM(amount)
-            FROM expenses
-            WHERE $flt
-            GROUP BY type
-            ORDER BY type ;
+        if dates is not None and len(dates) != 2:
+            raise DatabaseError("Invalid date interval")
+
+        self.__dates = dates
+        self.__search = search
+
+        if self.__federation is not None:
+            # views are rebuilt, models hold no pending reads
+            self.__federation.setDateRange(dates)
+
+        self.listModel.setDateFilter(dates, search)
+        self.sumModel.setDateFilter(dates, search)
+        self.periodModel.setDateFilter(dates, search)
+        self.statsModel.setDateFilter(dates)
+
+    def dateFilter(self) -> list[str]:
+        """Return the current date filter.
+
+        Returns
+        -----------------------
+        list[str]
+            [startDate, endDate], `None` if not filtering
         """
-        )
+        return self.__dates
 
-        # setting query filter
-        flt = "TRUE"
-        if dates is not None:
-            if len(dates) != 2:
-                raise DatabaseError("Invalid date interval")
+    def searchFilter(self) -> str:
+        """Return the text currently searched.
 
-            flt = f"date BETWEEN '{dates[0]}' AND '{dates[1]}'"
+        Returns
+        -----------------------
+        str
+            Text searched in the justifications, `None` if not
+            searching
+        """
+        return self.__search
+
+    def statementStats(self) -> dict[str, int]:
+        """Return hit and miss counters of the statement cache.
+
+        Returns
+        -----------------------
+        dict[str, int]
+            Number of hits, misses and cached statements
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        """
+        if self.__statements is None:
+            raise DatabaseError("Uninitialized connection")
+
+        return self.__statements.stats()
+
+    def databaseSettings(self) -> dict[str, str | int]:
+        """Return the performance settings of the connection.
+
+        Returns
+        -----------------------
+        dict[str, str | int]
+            Name of the profile, effective values of the tuned
+            pragmas, and paths of the yearly databases if any
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        result = {"profile": self.__openProfile} | settings(self.__conn)
+        if self.__federation is not None:
+            result["files"] = ", ".join(self.__federation.files())
 
-        # applying filters, setQuery() requires WHERE
-        self.listModel.setFilter(flt)
-        self.sumModel.setQuery(queryTemplate.substitute(flt=flt))
+        return result
+
+    @SqlTrace.traced
+    def refreshModels(self):
+        """Re-run the queries of list and summary models.
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
 
         self.listModel.select()
+        self.sumModel.select()
+        self.periodModel.select()
+        self.statsModel.select()
+
+    @SqlTrace.traced
+    def setSummaryPeriod(self, period: str):
+        """Group the totals of the period model by the given period.
+
+        The period is kept for the databases opened later.
+
+        Parameters
+        -----------------------
+        period : str
+            A key of Summary.PERIODS
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid period
+        - DatabaseError if query errors
+        """
+        if period not in PERIODS:
+            raise DatabaseError(f"Invalid summary period '{period}'")
+
+        self.__period = period
+
+        if self.periodModel is not None and self.__conn is not None:
+            self.periodModel.setPeriod(period)
+
+    @SqlTrace.traced
+    def setStatistic(self, statistic: str):
+        """Show the given statistic in the statistics model.
+
+        Parameters
+        -----------------------
+        statistic : str
+            A key of Analytics.STATISTICS
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        - DatabaseError if unknown statistic
+        - DatabaseError if numpy is not installed
+        - DatabaseError if query errors
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        if statistic not in STATISTICS:
+            raise DatabaseError(f"Unknown statistic '{statistic}'")
+
+        self.statsModel.setStatistic(statistic)
+
+    def analytics(self) -> Analytics:
+        """Return the expense arrays, reloaded if the DB changed.
+
+        Changes are detected from the database files, without
+        queries. Arrays are cached on disk if enabled in the
+        configuration file.
+
+        Returns
+        -----------------------
+        Analytics
+            Arrays of all the expenses
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        - DatabaseError if invalid configuration file
+        - DatabaseError if numpy is not installed
+        - DatabaseError if query errors
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        # the views of a federation follow the date filter
+        if self.__federation is not None:
+            filenames, table = self.__federation.files(), ALL_EXPENSES
+        else:
+            filenames, table = [self.__conn.databaseName()], "expenses"
+
+        key = fingerprint(filenames)
+        if self.__analytics is None or self.__analytics[0] != key:
+            cache = cacheDirectory() if analyticsCache() else None
+            self.__analytics = (
+                key,
+                loadAnalytics(self.__conn, filenames, cache, table),
+            )
+
+        return self.__analytics[1]
+
+    @SqlTrace.traced
+    def setBatchEditing(self, batched: bool):
+        """Queue edits of the list model, or commit them at once.
+
+        Queued edits are saved when leaving batched mode.
+
+        Parameters
+        -----------------------
+        batched : bool
+            Whether edits are queued
+
+        Raises
+        -----------------------
+        - DatabaseError if queued edits cannot be saved
+        """
+        if not batched and self.__conn is not None:
+            self.saveEdits()
+
+        self.__batched = batched
+        if self.listModel is not None:
+            self.listModel.setBatched(batched)
+
+    def batchEditing(self) -> bool:
+        """Return whether edits of the list model are queued.
+
+        Returns
+        -----------------------
+        bool
+            Whether batched mode is active
+        """
+        return self.__batched
+
+    @SqlTrace.traced
+    def saveEdits(self):
+        """Write the queued edits in a single transaction.
+
+        Nothing is written if any edit fails, and the edits
+        stay queued.
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        - DatabaseError if unsuccessful update
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        if self.listModel.pendingCount() == 0:
+            return
+
+        if not self.__conn.transaction():
+            raise DatabaseError(self.__conn.lastError().text())
+
+        try:
+            self.listModel.writeEdits()
+        except DatabaseError as err:
+            self.__conn.rollback()
+            raise DatabaseError(f"Error in saving edits :: {err}")
+
+        if not self.__conn.commit():
+            raise DatabaseError(self.__conn.lastError().text())
+
+        # updating changes
+        self.listModel.discardEdits()
+        self.refreshModels()
+
+    def revertEdits(self):
+        """Discard the queued edits.
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        self.listModel.discardEdits()
 
     def addDefaultRecord(self):
         """Add a default record to the end of the DB.
 
         Raises
         -----------------------
+        - DatabaseError if no yearly database for today
         - DatabaseError if unsuccessful addition
         """
-        # empty reference record
-        record = self.listModel.record()
+        today = datetime.date.today().strftime("%Y-%m-%d")
 
-        # allowing to auto-set primary key
-        record.remove(0)
+        # reporting why the record cannot be routed
+        if self.__federation is not None:
+            self.__federation.tableFor(today)
 
-        # setting default values for other fields
-        # notice the realigned indices
-        record.setValue(0, datetime.date.today().strftime("%Y-%m-%d"))
-        record.setValue(1, "-")
-        record.setValue(2, 0.0)
-        record.setValue(3, "-")
-
-        # inserting in last position
-        chk = self.listModel.insertRecord(-1, record)
+        # primary key is auto-set
+        chk = self.listModel.insertExpense(today, "-", 0.0, "-")
         if not chk:
             raise DatabaseError("Error in inserting record")
 
+    @SqlTrace.traced
     def removeRecords(self, indices: list[QPersistentModelIndex]):
         """Remove the records with the given indices from the model.
 
+        The ids of the records are collected first, and deleted
+        in a single transaction, DELETE_CHUNK_SIZE at a time,
+        from the file of their year if federated.
+
         Raises
         -----------------------
         - DatabaseError if unsuccessful removal
         """
-        for i, index in enumerate(indices):
-            chk = self.listModel.removeRow(index.row())
-            if not chk:
-                raise DatabaseError(f"Error in deleting record {i}")
+        ids = [
+            self.listModel.rowId(index.row())
+            for index in indices
+            if index.isValid()
+        ]
+
+        if not self.__conn.transaction():
+            raise DatabaseError(self.__conn.lastError().text())
+
+        # a single statement shape per table, ids bound as a JSON array
+        try:
+            for table, tableIds in self.__partitionIds(ids).items():
+                for start in range(0, len(tableIds), DELETE_CHUNK_SIZE):
+                    chunk = tableIds[start : start + DELETE_CHUNK_SIZE]
+                    self.__statements.exec(
+                        f"""
+                        DELETE FROM {table}
+                        WHERE id IN (SELECT value FROM json_each(?)) ;
+                    """,
+                        [json.dumps(chunk)],
+                    ).finish()
+        except DatabaseError as err:
+            self.__conn.rollback()
+            raise DatabaseError(f"Error in deleting records :: {err}")
+
+        if not self.__conn.commit():
+            raise DatabaseError(self.__conn.lastError().text())
 
         # updating changes
-        self.listModel.select()
+        self.listModel.discardEdits(ids)
+        self.refreshModels()
 
-    def importCSV(self, filename: str):
+    @SqlTrace.traced
+    def importCSV(self, filename: str) -> int:
         """Append the contents of a CSV file to the database.
 
+        Arrow IPC and Parquet files are recognized by their
+        extension, see Transfer.fileFormat(). Runs in the
+        calling thread, see importWorker() for background
+        imports. Rows already in the database are skipped if so
+        configured, see Config.skipDuplicates().
+
         Parameters
         -----------------------
         filename : str
-            Filename of the output CSV file
+            Filename of the input file
+
+        Returns
+        -----------------------
+        int
+            The number of skipped duplicate rows
 
         Raises
         -----------------------
         - DatabaseError if invalid Connection
         - DatabaseError if file does not exist
         - DatabaseError if invalid file content
+        - DatabaseError if pyarrow required and not installed
+        - DatabaseError if invalid configuration file
         """
         if self.__conn is None:
             raise DatabaseError("Uninitialized connection")
 
-        # handreading of csv file required
-        # (QSqlQuery cannot pass .mode commands,
-        # and record() is not iterable)
-        with open(filename, "r", newline="", encoding="utf-8") as csvfile:
-            reader = csv.reader(csvfile, quotechar='"')
+        dedup = DuplicateFilter(self.__conn) if skipDuplicates() else None
 
-            try:
-                for ir, row in enumerate(reader):
-                    # empty record will contain info on the table schema
-                    record = self.listModel.record()
-
-                    # if 1st field is left unspecified, auto-assign
-                    # (id, primary key, autoincrement integer)
-                    # setting NULL does not work, found this solution
-                    if row[0] == "":
-                        record.remove(0)
-                    else:
-                        record.setValue(0, row[0])
-
-                    # setting other fields
-                    for ic, col in enumerate(row[1:]):
-                        record.setValue(ic, col)
-
-                    # inserting at last position
-                    chk = self.listModel.insertRecord(-1, record)
-                    if not chk:
-                        raise DatabaseError(
-                            f"Error in inserting record {ir + 1}"
-                        )
-
-                    # SQLite performs type-checking here
-                    # inserting line-by-line to check lines
-                    chk = self.listModel.submitAll()
-                    if not chk:
-                        raise DatabaseError(f"Error in inserting row {ir + 1}")
-            except csv.Error as err:
-                raise DatabaseError(
-                    f"CSV file error :: line {reader.line_num} :: {err}"
-                )
+        Transfer.importFile(
+            self.__conn, filename, federation=self.__federation, dedup=dedup
+        )
 
-            self.listModel.select()
+        self.refreshModels()
+
+        return 0 if dedup is None else dedup.skipped
+
+    def importWorker(self, filename: str, rejects: str = None) -> ImportWorker:
+        """Return a worker importing a data file in the background.
+
+        Models should be refreshed with refreshModels() when the
+        worker finishes. Rows already in the database are
+        skipped if so configured, see Config.skipDuplicates().
 
-    def saveCSV(self, filename: str):
+        Parameters
+        -----------------------
+        filename : str
+            Filename of the input file
+        rejects : str
+            Filename of the CSV file of rejected rows, for CSV
+            imports skipping invalid rows; `None` aborts on
+            invalid rows
+
+        Returns
+        -----------------------
+        ImportWorker
+            The worker, to be moved to a QThread
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        - DatabaseError if file does not exist
+        - DatabaseError if invalid configuration file
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        return ImportWorker(
+            self.__database(),
+            filename,
+            self.__openProfile,
+            rejects,
+            skipDuplicates(),
+        )
+
+    @SqlTrace.traced
+    def saveCSV(self, filename: str, filtered: bool = False):
         """Dump the database to a CSV file.
 
+        Arrow IPC and Parquet files are recognized by their
+        extension, see Transfer.fileFormat(). Runs in the
+        calling thread, see exportWorker() for background
+        exports.
+
+        Parameters
+        -----------------------
+        filename : str
+            Filename of the output file
+        filtered : bool
+            Whether to dump only the expenses matching the
+            current date filter
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        - DatabaseError if file errors
+        - DatabaseError if pyarrow required and not installed
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        Transfer.exportFile(
+            self.__conn, filename, self.__dates if filtered else None
+        )
+
+    def exportWorker(
+        self, filename: str, filtered: bool = False
+    ) -> ExportWorker:
+        """Return a worker dumping the database in the background.
+
+        Parameters
+        -----------------------
+        filename : str
+            Filename of the output file
+        filtered : bool
+            Whether to dump only the expenses matching the
+            current date filter
+
+        Returns
+        -----------------------
+        ExportWorker
+            The worker, to be moved to a QThread
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        return ExportWorker(
+            self.__database(),
+            filename,
+            self.__dates if filtered else None,
+            self.__openProfile,
+        )
+
+    @SqlTrace.traced
+    def saveSummaryCSV(self, filename: str):
+        """Write the totals of the period model to a CSV file.
+
+        Uses the period and the date filter of the model.
+
         Parameters
         -----------------------
         filename : str
@@ -434,36 +989,265 @@ class ModelWrapper:
         Raises
         -----------------------
         - DatabaseError if invalid Connection
+        - DatabaseError if file errors
         """
         if self.__conn is None:
             raise DatabaseError("Uninitialized connection")
 
-        query = QSqlQuery()
+        Transfer.exportSummaryCSV(
+            self.__conn, filename, self.__period, self.__dates
+        )
 
-        # extracting data from database
-        query.exec("SELECT * FROM expenses ;")
+    def backupWorker(self, filename: str) -> BackupWorker:
+        """Return a worker copying the database to a backup file.
 
-        # number of fields
-        COLS = query.record().count()
+        The database stays usable while the worker runs.
 
-        # handwriting of csv file required
-        # (QSqlQuery cannot pass .mode commands,
-        # and record() is not iterable)
-        with open(filename, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(
-                csvfile,
-                quotechar='"',
-                quoting=csv.QUOTE_NONNUMERIC,
-            )
+        Parameters
+        -----------------------
+        filename : str
+            Filename of the backup, replaced if it exists
 
-            while query.next():
-                writer.writerow([query.value(i) for i in range(COLS)])
+        Returns
+        -----------------------
+        BackupWorker
+            The worker, to be moved to a QThread
 
-        query.finish()
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        - DatabaseError if yearly databases are open
+        - DatabaseError if backup is the database itself
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        if self.__federation is not None:
+            raise DatabaseError("Backup of yearly databases not supported")
+
+        database = self.__conn.databaseName()
+        if os.path.abspath(filename) == os.path.abspath(database):
+            raise DatabaseError("Backup file is the open database")
+
+        return BackupWorker(database, filename, self.__openProfile)
+
+    def restoreWorker(self, filename: str) -> RestoreWorker:
+        """Return a worker copying a backup to restore.
+
+        The backup is copied next to the database, which stays
+        usable until swapRestored() is called, when the worker
+        succeeds.
+
+        Parameters
+        -----------------------
+        filename : str
+            Filename of the backup
+
+        Returns
+        -----------------------
+        RestoreWorker
+            The worker, to be moved to a QThread
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid Connection
+        - DatabaseError if yearly databases are open
+        - DatabaseError if backup is the database itself
+        - DatabaseError if backup does not exist
+        """
+        if self.__conn is None:
+            raise DatabaseError("Uninitialized connection")
+
+        if self.__federation is not None:
+            raise DatabaseError("Restore of yearly databases not supported")
+
+        database = self.__conn.databaseName()
+        if os.path.abspath(filename) == os.path.abspath(database):
+            raise DatabaseError("Backup file is the open database")
+
+        worker = RestoreWorker(filename, f"{database}.restore")
+        self.__restoring = database
+
+        return worker
+
+    @SqlTrace.traced
+    def swapRestored(self):
+        """Replace the database with the backup copied by the worker.
+
+        The connection is closed, and the database switched to a
+        rollback journal by SQLite, so that it is a single file,
+        with no journal to be replayed on the backup. The copy is
+        then renamed over the database, and the connection opened
+        again on it. Models should be initialized with
+        initModels() afterwards.
+
+        Raises
+        -----------------------
+        - DatabaseError if no backup being restored
+        - DatabaseError if the database is open elsewhere, or the
+          copy cannot be renamed; the copy is then removed, and
+          the database opened again unchanged
+        - DatabaseError if connection errors, see openDB()
+        """
+        if self.__restoring is None:
+            raise DatabaseError("No backup being restored")
+
+        database, self.__restoring = self.__restoring, None
+        restored = f"{database}.restore"
+
+        # other connections of this process, e.g. of workers
+        main = self.__conn.connectionName()
+        target = os.path.abspath(database)
+        for name in QSqlDatabase.connectionNames():
+            conn = QSqlDatabase.database(name, False)
+            used = conn.isOpen()
+            used = used and os.path.abspath(conn.databaseName()) == target
+            del conn
+
+            if name != main and used:
+                self.discardRestored(restored)
+                raise DatabaseError("Database in use by another connection")
+
+        self.__closeConnection()
+
+        try:
+            if self.__dropJournal(database) != "delete":
+                raise DatabaseError("Database in use by another process")
+
+            os.replace(restored, database)
+        except (DatabaseError, OSError) as err:
+            self.discardRestored(restored)
+            self.openDB(database)
+            raise DatabaseError(f"{err}")
+
+        self.openDB(database)
+
+    def discardRestored(self, filename: str = None):
+        """Drop the backup copied by a worker, if any.
+
+        Called when the worker fails or is cancelled.
+
+        Parameters
+        -----------------------
+        filename : str
+            Path of the copy, `None` for the one of the backup
+            being restored
+        """
+        if filename is None and self.__restoring is not None:
+            filename = f"{self.__restoring}.restore"
+        self.__restoring = None
+
+        if filename is not None and os.path.exists(filename):
+            try:
+                os.remove(filename)
+            except OSError:
+                # left next to the database, replaced by the
+                # next restore
+                pass
 
     def closeDB(self):
         """Close connection with DB."""
         if self.__conn is None:
             raise DatabaseError("Uninitialized connection")
 
-        self.__conn.close()
+        self.__closeConnection()
+
+    def __resolveProfile(self) -> str:
+        """Return the performance profile for new connections.
+
+        Returns
+        -----------------------
+        str
+            The requested profile, or the configured one
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid configuration file
+        - DatabaseError if unknown profile
+        """
+        if self.__profile is not None:
+            return self.__profile
+
+        return databaseProfile()
+
+    def __database(self) -> str | list[str]:
+        """Return the path of the database, or of the yearly ones.
+
+        Returns
+        -----------------------
+        str | list[str]
+            Path for worker connections
+        """
+        if self.__federation is not None:
+            return self.__federation.files()
+
+        return self.__conn.databaseName()
+
+    def __partitionIds(self, ids: list[int]) -> dict[str, list[int]]:
+        """Group expense ids by the table holding them.
+
+        Parameters
+        -----------------------
+        ids : list[int]
+            Ids of the expenses in the list model
+
+        Returns
+        -----------------------
+        dict[str, list[int]]
+            Ids in each table
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid id
+        """
+        if self.__federation is None:
+            return {"expenses": ids}
+
+        result = {}
+        for i in ids:
+            table, rowId = self.__federation.locate(i)
+            result.setdefault(table, []).append(rowId)
+
+        return result
+
+    def __closeConnection(self):
+        """Drop prepared statements and close the connection."""
+        if self.__statements is not None:
+            self.__statements.clear()
+
+        self.__federation = None
+        self.__analytics = None
+        self.__summaryPending = False
+
+        if self.__conn is not None:
+            if self.__conn.isOpen():
+                self.__conn.close()
+
+    def __dropJournal(self, database: str) -> str:
+        """Switch a closed database to a rollback journal.
+
+        The write-ahead log, if any, is checkpointed and removed
+        by SQLite, unless other processes use the database.
+
+        Parameters
+        -----------------------
+        database : str
+            Path of the database
+
+        Returns
+        -----------------------
+        str
+            The journal mode of the database afterwards, "delete"
+            on success
+
+        Raises
+        -----------------------
+        - DatabaseError if connection errors
+        """
+        conn = None
+        try:
+            conn = connect(database, RESTORE_CONNECTION, "compat")
+            return settings(conn)["journal_mode"]
+        finally:
+            del conn
+            disconnect(RESTORE_CONNECTION)
@@ -0,0 +1,254 @@
+"""Pivoted expense summary model.
+
+Classes
+-----------------------
+PeriodSummaryModel
+    Table model of the expense totals by period and type.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from typing import Any
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject
+
+from modules.Database import DatabaseError
+from modules.StatementCache import StatementCache
+from modules.Summary import PERIODS, periodSummary
+
+
+# default summary period
+DEFAULT_PERIOD = "month"
+
+
+class PeriodSummaryModel(QAbstractTableModel):
+    """Table model of the expense totals by period and type.
+
+    Rows are periods, columns are types, plus the total of each
+    period. The whole table is computed in a single query over
+    the per-(day, type) aggregates.
+
+    Private attributes
+    -----------------------
+    __statements: StatementCache
+        Prepared statements of the database connection
+    __period: str
+        Current period, a key of PERIODS
+    __dates: list[str]
+        Current date filter, `None` if not filtering
+    __search: str
+        Text searched in the justifications, `None` if not searching
+    __types: list[str]
+        Types, in column order
+    __rows: list[tuple[str, list[float]]]
+        (period, totals by type) pairs, in row order
+
+    Public methods
+    -----------------------
+    __init__(StatementCache, QObject)
+        Construct class instance.
+    select()
+        Recompute the totals.
+    setPeriod(str)
+        Group the totals by the given period.
+    setRows(str, list[str], list[tuple[str, list[float]]])
+        Show totals computed elsewhere.
+    period() -> str
+        Return the current period.
+    setDateFilter(list[str])
+        Filter the expenses with the specified dates.
+
+    Reimplemented methods
+    -----------------------
+    rowCount(QModelIndex) -> int
+    columnCount(QModelIndex) -> int
+    data(QModelIndex, Qt.ItemDataRole) -> Any
+    headerData(int, Qt.Orientation, Qt.ItemDataRole) -> Any
+    """
+
+    def __init__(self, statements: StatementCache, parent: QObject = None):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        statements : StatementCache
+            Prepared statements of the database connection
+        parent : QObject
+            Parent QObject
+        """
+        super().__init__(parent)
+
+        self.__statements = statements
+        self.__period = DEFAULT_PERIOD
+        self.__dates = None
+        self.__search = None
+        self.__types = []
+        self.__rows = []
+
+    def select(self):
+        """Recompute the totals.
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        self.beginResetModel()
+
+        try:
+            self.__types, self.__rows = periodSummary(
+                self.__statements, self.__period, self.__dates, self.__search
+            )
+        except DatabaseError:
+            self.__types, self.__rows = [], []
+            raise
+        finally:
+            self.endResetModel()
+
+    def setPeriod(self, period: str):
+        """Group the totals by the given period.
+
+        Parameters
+        -----------------------
+        period : str
+            A key of PERIODS
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid period
+        - DatabaseError if query errors
+        """
+        if period not in PERIODS:
+            raise DatabaseError(f"Invalid summary period '{period}'")
+
+        self.__period = period
+        self.select()
+
+    def setRows(
+        self,
+        period: str,
+        types: list[str],
+        rows: list[tuple[str, list[float]]],
+    ):
+        """Show totals computed elsewhere.
+
+        The totals must match the current filter, e.g. computed
+        by a background worker.
+
+        Parameters
+        -----------------------
+        period : str
+            A key of PERIODS
+        types : list[str]
+            Types, in column order
+        rows : list[tuple[str, list[float]]]
+            (period, totals by type) pairs, in row order
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid period
+        """
+        if period not in PERIODS:
+            raise DatabaseError(f"Invalid summary period '{period}'")
+
+        self.beginResetModel()
+        self.__period = period
+        self.__types = list(types)
+        self.__rows = [(label, list(totals)) for label, totals in rows]
+        self.endResetModel()
+
+    def period(self) -> str:
+        """Return the current period.
+
+        Returns
+        -----------------------
+        str
+            A key of PERIODS
+        """
+        return self.__period
+
+    def setDateFilter(self, dates: list[str], search: str = None):
+        """Filter the expenses with the specified dates and text.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` removes the date filter
+        search : str
+            Text searched in the justifications, `None` for all
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        self.__dates = dates
+        self.__search = search
+        self.select()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of periods."""
+        return 0 if parent.isValid() else len(self.__rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of types, plus the total column."""
+        if parent.isValid() or not self.__rows:
+            return 0
+
+        return len(self.__types) + 1
+
+    def data(
+        self,
+        index: QModelIndex,
+        role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        """Return the total of the given period and type."""
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        totals = self.__rows[index.row()][1]
+
+        if index.column() == len(self.__types):
+            return sum(totals)
+
+        return totals[index.column()]
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        """Return types and period labels."""
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        if orientation == Qt.Orientation.Vertical:
+            return self.__rows[section][0]
+
+        if section == len(self.__types):
+            return "total"
+
+        return self.__types[section]
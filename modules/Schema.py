@@ -0,0 +1,540 @@
+"""Database schema.
+
+Functions
+-----------------------
+createSchema()
+    Create the tables of a new database, at the latest version.
+validateSchema()
+    Check that the 'expenses' table exists and is valid.
+schemaVersion()
+    Return the schema version of the database.
+migrateSchema()
+    Bring the schema of the database to the latest version.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from modules import SqlTrace
+from modules.Database import DatabaseError
+
+
+# original (version 0) schema
+# checks here because SQLite is "dynamically" typed
+BASE_STATEMENTS = [
+    """
+    CREATE TABLE expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT
+            CHECK (TYPEOF(id) == ('integer')),
+        date DATE NOT NULL
+            CHECK (DATE(date) IS date),
+        type CHAR(1) NOT NULL
+            CHECK (LENGTH(type) == 1),
+        amount DOUBLE PRECISION NOT NULL
+            CHECK (TYPEOF(amount) IN ('integer', 'real')),
+        justification VARCHAR(100) NOT NULL
+            CHECK (LENGTH(justification) <= 100)
+    ) ;
+    """,
+    "CREATE INDEX date_index ON expenses(date) ;",
+]
+
+# (name, type, notnull) of the original columns of 'expenses'
+# (apparently for SQLite3 primary keys are not not-null...)
+BASE_COLUMNS = [
+    ("id", "INTEGER", 0),
+    ("date", "DATE", 1),
+    ("type", "CHAR(1)", 1),
+    ("amount", "DOUBLE PRECISION", 1),
+    ("justification", "VARCHAR(100)", 1),
+]
+
+# amounts are kept in the rollup as high / ROLLUP_HIGH +
+# low / ROLLUP_LOW, exactly for amounts of magnitude in
+# [2^-10, ROLLUP_LIMIT) and some others; bucket totals carry
+# the multiples of ROLLUP_CARRY of 'low' to 'high'
+ROLLUP_HIGH = 2**20
+ROLLUP_LOW = 2**62
+ROLLUP_CARRY = ROLLUP_LOW // ROLLUP_HIGH
+ROLLUP_LIMIT = 2**33
+
+
+def _parts(rows: str) -> str:
+    """Return a subquery splitting amounts into exact parts.
+
+    'high' is the amount truncated to a multiple of
+    1 / ROLLUP_HIGH, and 'low' the rest in units of
+    1 / ROLLUP_LOW; both are 0 for the amounts they cannot
+    represent, flagged by 'inexact' (1, else 0).
+
+    Parameters
+    -----------------------
+    rows : str
+        SELECT statement with an 'amount' column
+
+    Returns
+    -----------------------
+    str
+        Parenthesized subquery, with the columns of `rows` and
+        'high', 'low' and 'inexact'
+    """
+    # power-of-two scaling is exact, and so is the rest for
+    # amounts below ROLLUP_LIMIT; the check rejects the rests
+    # with bits below 1 / ROLLUP_LOW
+    return f"""(
+        SELECT *, IIF(inexact, 0, whole) AS high, IIF(inexact, 0, part) AS low
+        FROM (
+            SELECT *, NOT (
+                ABS(amount) < {ROLLUP_LIMIT} AND rest * {ROLLUP_LOW}.0 = part
+            ) AS inexact
+            FROM (
+                SELECT *, CAST(rest * {ROLLUP_LOW}.0 AS INTEGER) AS part
+                FROM (
+                    SELECT *, amount - whole / {ROLLUP_HIGH}.0 AS rest
+                    FROM (
+                        SELECT *,
+                            CAST(amount * {ROLLUP_HIGH} AS INTEGER) AS whole
+                        FROM ({rows})
+                    )
+                )
+            )
+        )
+    )"""
+
+
+def _addToRollup(row: str) -> str:
+    """Return the trigger statement adding an expense to the rollup.
+
+    Parameters
+    -----------------------
+    row : str
+        "NEW" or "OLD"
+
+    Returns
+    -----------------------
+    str
+        The statement
+    """
+    # SELECT needs a WHERE before ON CONFLICT, not to be parsed
+    # as a join
+    return f"""
+        INSERT INTO expense_rollup (day, type, high, low, inexact, count)
+        SELECT {row}.date, {row}.type, high, low, inexact, 1
+        FROM {_parts(f"SELECT {row}.amount AS amount")}
+        WHERE TRUE
+        ON CONFLICT (day, type) DO UPDATE
+        SET high = high + excluded.high + (low + excluded.low) / {ROLLUP_CARRY},
+            low = (low + excluded.low) % {ROLLUP_CARRY},
+            inexact = inexact + excluded.inexact,
+            count = count + 1 ;
+    """
+
+
+def _removeFromRollup(row: str) -> str:
+    """Return the trigger statements removing an expense from the rollup.
+
+    Emptied buckets are deleted.
+
+    Parameters
+    -----------------------
+    row : str
+        "NEW" or "OLD"
+
+    Returns
+    -----------------------
+    str
+        The statements
+    """
+    return f"""
+        UPDATE expense_rollup
+        SET high = expense_rollup.high - parts.high
+                + (expense_rollup.low - parts.low) / {ROLLUP_CARRY},
+            low = (expense_rollup.low - parts.low) % {ROLLUP_CARRY},
+            inexact = expense_rollup.inexact - parts.inexact,
+            count = count - 1
+        FROM {_parts(f"SELECT {row}.amount AS amount")} AS parts
+        WHERE day = {row}.date AND type = {row}.type ;
+
+        DELETE FROM expense_rollup
+        WHERE day = {row}.date AND type = {row}.type AND count = 0 ;
+    """
+
+
+# migration i brings the schema from version i to version i + 1
+# steps must be idempotent: earlier releases created some
+# objects without recording a version
+MIGRATIONS = [
+    # 1: covering index, serving date-filtered counts and sums
+    # from the index alone; supersedes the date index
+    [
+        """
+        CREATE INDEX IF NOT EXISTS date_type_amount_index
+        ON expenses(date, type, amount) ;
+        """,
+        "DROP INDEX IF EXISTS date_index ;",
+    ],
+    # 2: per-(day, type) totals and counts of 'expenses', kept
+    # by triggers; totals are exact, in the integer parts of the
+    # amounts (see _parts()), with the number of amounts the
+    # parts cannot represent; rebuilt from the expenses, over
+    # any earlier layout of the table
+    [
+        "DROP TRIGGER IF EXISTS expense_rollup_insert ;",
+        "DROP TRIGGER IF EXISTS expense_rollup_delete ;",
+        "DROP TRIGGER IF EXISTS expense_rollup_update ;",
+        "DROP TABLE IF EXISTS expense_rollup ;",
+        """
+        CREATE TABLE expense_rollup (
+            day DATE NOT NULL,
+            type CHAR(1) NOT NULL,
+            high INTEGER NOT NULL,
+            low INTEGER NOT NULL,
+            inexact INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, type)
+        ) WITHOUT ROWID ;
+        """,
+        f"""
+        CREATE TRIGGER expense_rollup_insert
+        AFTER INSERT ON expenses
+        BEGIN
+            {_addToRollup("NEW")}
+        END ;
+        """,
+        f"""
+        CREATE TRIGGER expense_rollup_delete
+        AFTER DELETE ON expenses
+        BEGIN
+            {_removeFromRollup("OLD")}
+        END ;
+        """,
+        f"""
+        CREATE TRIGGER expense_rollup_update
+        AFTER UPDATE OF date, type, amount ON expenses
+        BEGIN
+            {_removeFromRollup("OLD")}
+            {_addToRollup("NEW")}
+        END ;
+        """,
+        f"""
+        INSERT INTO expense_rollup (day, type, high, low, inexact, count)
+        SELECT date, type,
+            SUM(high) + SUM(low) / {ROLLUP_CARRY}, SUM(low) % {ROLLUP_CARRY},
+            SUM(inexact), COUNT(*)
+        FROM {_parts("SELECT date, type, amount FROM expenses")}
+        GROUP BY date, type ;
+        """,
+    ],
+    # 3: full-text index of the justifications, over the
+    # contents of 'expenses' (rowid = id); backfilled here, kept
+    # in sync by triggers
+    [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS expense_search USING fts5(
+            justification,
+            content = 'expenses',
+            content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        ) ;
+        """,
+        "DROP TRIGGER IF EXISTS expense_search_insert ;",
+        """
+        CREATE TRIGGER expense_search_insert
+        AFTER INSERT ON expenses
+        BEGIN
+            INSERT INTO expense_search (rowid, justification)
+            VALUES (NEW.id, NEW.justification) ;
+        END ;
+        """,
+        "DROP TRIGGER IF EXISTS expense_search_delete ;",
+        """
+        CREATE TRIGGER expense_search_delete
+        AFTER DELETE ON expenses
+        BEGIN
+            INSERT INTO expense_search (expense_search, rowid, justification)
+            VALUES ('delete', OLD.id, OLD.justification) ;
+        END ;
+        """,
+        "DROP TRIGGER IF EXISTS expense_search_update ;",
+        """
+        CREATE TRIGGER expense_search_update
+        AFTER UPDATE OF id, justification ON expenses
+        BEGIN
+            INSERT INTO expense_search (expense_search, rowid, justification)
+            VALUES ('delete', OLD.id, OLD.justification) ;
+
+            INSERT INTO expense_search (rowid, justification)
+            VALUES (NEW.id, NEW.justification) ;
+        END ;
+        """,
+        "INSERT INTO expense_search (expense_search) VALUES ('rebuild') ;",
+    ],
+    # 4: indexed content hashes of 'expenses', for duplicate
+    # detection on imports; computed by Duplicates (SQLite has
+    # no hash function), triggers reset them to NULL when
+    # expenses are inserted or changed
+    [
+        """
+        CREATE TABLE IF NOT EXISTS expense_hashes (
+            id INTEGER PRIMARY KEY,
+            hash INTEGER
+        ) ;
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS expense_hashes_index
+        ON expense_hashes(hash) ;
+        """,
+        "DROP TRIGGER IF EXISTS expense_hashes_insert ;",
+        """
+        CREATE TRIGGER expense_hashes_insert
+        AFTER INSERT ON expenses
+        BEGIN
+            INSERT OR REPLACE INTO expense_hashes (id, hash)
+            VALUES (NEW.id, NULL) ;
+        END ;
+        """,
+        "DROP TRIGGER IF EXISTS expense_hashes_delete ;",
+        """
+        CREATE TRIGGER expense_hashes_delete
+        AFTER DELETE ON expenses
+        BEGIN
+            DELETE FROM expense_hashes WHERE id = OLD.id ;
+        END ;
+        """,
+        "DROP TRIGGER IF EXISTS expense_hashes_update ;",
+        """
+        CREATE TRIGGER expense_hashes_update
+        AFTER UPDATE OF id, date, type, amount, justification ON expenses
+        BEGIN
+            DELETE FROM expense_hashes WHERE id = OLD.id ;
+
+            INSERT OR REPLACE INTO expense_hashes (id, hash)
+            VALUES (NEW.id, NULL) ;
+        END ;
+        """,
+        """
+        INSERT OR IGNORE INTO expense_hashes (id, hash)
+        SELECT id, NULL FROM expenses ;
+        """,
+    ],
+    # 5: log of the changes of 'expenses', for incremental
+    # exports; the sequence number of the last change exported
+    # to each destination is its watermark, changes are logged
+    # only while some destination exists
+    [
+        """
+        CREATE TABLE IF NOT EXISTS expense_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER NOT NULL,
+            op CHAR(1) NOT NULL CHECK (op IN ('I', 'U', 'D'))
+        ) ;
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS expense_watermarks (
+            name TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        ) ;
+        """,
+        "DROP TRIGGER IF EXISTS expense_changes_insert ;",
+        """
+        CREATE TRIGGER expense_changes_insert
+        AFTER INSERT ON expenses
+        WHEN EXISTS (SELECT 1 FROM expense_watermarks)
+        BEGIN
+            INSERT INTO expense_changes (id, op) VALUES (NEW.id, 'I') ;
+        END ;
+        """,
+        "DROP TRIGGER IF EXISTS expense_changes_delete ;",
+        """
+        CREATE TRIGGER expense_changes_delete
+        AFTER DELETE ON expenses
+        WHEN EXISTS (SELECT 1 FROM expense_watermarks)
+        BEGIN
+            INSERT INTO expense_changes (id, op) VALUES (OLD.id, 'D') ;
+        END ;
+        """,
+        "DROP TRIGGER IF EXISTS expense_changes_update ;",
+        """
+        CREATE TRIGGER expense_changes_update
+        AFTER UPDATE ON expenses
+        WHEN EXISTS (SELECT 1 FROM expense_watermarks)
+        BEGIN
+            INSERT INTO expense_changes (id, op)
+            SELECT OLD.id, 'D' WHERE OLD.id IS NOT NEW.id ;
+
+            INSERT INTO expense_changes (id, op) VALUES (NEW.id, 'U') ;
+        END ;
+        """,
+    ],
+]
+
+# latest schema version
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def createSchema(conn: QSqlDatabase):
+    """Create the tables of a new database, at the latest version.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open connection to an empty database
+
+    Raises
+    -----------------------
+    - DatabaseError if query errors
+    """
+    _execute(conn, BASE_STATEMENTS + sum(MIGRATIONS, []), SCHEMA_VERSION)
+
+
+def validateSchema(conn: QSqlDatabase):
+    """Check that the 'expenses' table exists and is valid.
+
+    Columns added by migrations after the original ones are
+    allowed.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+
+    Raises
+    -----------------------
+    - DatabaseError if 'expenses' table not found
+    - DatabaseError if schema of 'expenses' is not valid
+    """
+    # checking for existence of 'expenses' table
+    if "expenses" not in conn.tables():
+        raise DatabaseError("Invalid database schema")
+
+    query = QSqlQuery(conn)
+
+    # checking for validity of schema of 'expense' table
+    SqlTrace.execQuery(query, "PRAGMA TABLE_INFO('expenses') ;")
+
+    columns = []
+    nm, tp, nn = 1, 2, 3
+
+    # fetching table information based on index
+    while query.next():
+        columns.append((query.value(nm), query.value(tp), query.value(nn)))
+
+    SqlTrace.fetched(len(columns))
+    query.finish()
+
+    # checking against expected output
+    if columns[: len(BASE_COLUMNS)] != BASE_COLUMNS:
+        raise DatabaseError("Corrupted table")
+
+
+def schemaVersion(conn: QSqlDatabase) -> int:
+    """Return the schema version of the database.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+
+    Returns
+    -----------------------
+    int
+        The version, stored in PRAGMA user_version
+
+    Raises
+    -----------------------
+    - DatabaseError if query errors
+    """
+    query = QSqlQuery(conn)
+    if not SqlTrace.execQuery(query, "PRAGMA user_version ;"):
+        raise DatabaseError(query.lastError().text())
+    if not query.next():
+        raise DatabaseError(query.lastError().text())
+
+    version = query.value(0)
+    query.finish()
+
+    return version
+
+
+def migrateSchema(conn: QSqlDatabase):
+    """Bring the schema of the database to the latest version.
+
+    Pending migrations are applied in a single transaction.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open connection to a database with a valid schema
+
+    Raises
+    -----------------------
+    - DatabaseError if database is newer than the program
+    - DatabaseError if query errors
+    """
+    version = schemaVersion(conn)
+
+    if version > SCHEMA_VERSION:
+        raise DatabaseError(
+            f"Database schema version {version} is not supported"
+        )
+
+    if version < SCHEMA_VERSION:
+        _execute(conn, sum(MIGRATIONS[version:], []), SCHEMA_VERSION)
+
+
+def _execute(conn: QSqlDatabase, commands: list[str], version: int):
+    """Run statements and set the version in a transaction.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    commands : list[str]
+        Statements to run, in order
+    version : int
+        Schema version after the statements
+
+    Raises
+    -----------------------
+    - DatabaseError if query errors, after rollback
+    """
+    if not conn.transaction():
+        raise DatabaseError(conn.lastError().text())
+
+    query = QSqlQuery(conn)
+
+    # PRAGMA values cannot be bound, the version is an int
+    for command in commands + [f"PRAGMA user_version = {int(version)} ;"]:
+        if not SqlTrace.execQuery(query, command):
+            err = query.lastError().text()
+            query.finish()
+            conn.rollback()
+            raise DatabaseError(err)
+
+    query.finish()
+    if not conn.commit():
+        raise DatabaseError(conn.lastError().text())
@@ -0,0 +1,97 @@
+"""Full-text search of the expenses.
+
+Justifications are indexed by the FTS5 table `expense_search`,
+whose rowids are the ids of the expenses (see Schema). Search
+texts are split into words, each matching the words of the
+justifications starting with it, regardless of case and
+accents.
+
+Functions
+-----------------------
+matchExpression()
+    Return the FTS5 query matching all the words of a text.
+searchClause()
+    Return the clause selecting the expenses matching a text.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# expenses whose justification matches the bound FTS5 query
+SEARCH_CLAUSE = """
+    id IN (
+        SELECT rowid FROM expense_search WHERE expense_search MATCH ?
+    )
+"""
+
+
+def matchExpression(text: str) -> str:
+    """Return the FTS5 query matching all the words of a text.
+
+    Words are quoted, so that FTS5 operators and punctuation in
+    the text are searched literally, and matched as prefixes.
+
+    Parameters
+    -----------------------
+    text : str
+        Search text, `None` for no search
+
+    Returns
+    -----------------------
+    str
+        The query, `None` if the text has no words
+    """
+    if text is None:
+        return None
+
+    words = [
+        '"' + word.replace('"', '""') + '"*'
+        for word in text.split()
+        if any(c.isalnum() for c in word)
+    ]
+
+    return " ".join(words) or None
+
+
+def searchClause(text: str) -> tuple[str, list]:
+    """Return the clause selecting the expenses matching a text.
+
+    Parameters
+    -----------------------
+    text : str
+        Search text, `None` for no search
+
+    Returns
+    -----------------------
+    tuple[str, list]
+        The condition on the `id` column of 'expenses' and the
+        values to bind to it, "TRUE" if the text has no words
+    """
+    expression = matchExpression(text)
+    if expression is None:
+        return "TRUE", []
+
+    return SEARCH_CLAUSE, [expression]
@@ -0,0 +1,278 @@
+"""Timing of the executed SQL statements.
+
+Tracing is enabled by setting the SEM_SQL_TRACE environment
+variable to a value other than "0" before starting the program.
+When enabled, each statement is recorded with its SQL text, wall
+time, number of rows and calling operation, in a ring buffer of
+the last BUFFER_SIZE statements. When disabled, traced() leaves
+functions untouched and statements are executed directly.
+
+Functions
+-----------------------
+enabled()
+    Return whether tracing is enabled.
+traced()
+    Decorate a function, naming the operation of its statements.
+execQuery()
+    Execute a query, recording it if tracing.
+execBatch()
+    Execute a batch-bound query, recording it if tracing.
+fetched()
+    Record the number of rows read from the last query.
+records()
+    Return the recorded statements.
+clear()
+    Drop the recorded statements.
+dump()
+    Write the recorded statements to a JSON file.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from collections import deque
+from collections.abc import Callable
+import functools
+import json
+import os
+import threading
+import time
+
+from PyQt6.QtSql import QSqlQuery
+
+from modules.Database import DatabaseError
+
+
+# environment variable enabling tracing
+ENV_VARIABLE = "SEM_SQL_TRACE"
+# number of statements kept
+BUFFER_SIZE = 2000
+
+# ring buffer of records, `None` when tracing is disabled
+_records = (
+    deque(maxlen=BUFFER_SIZE)
+    if os.environ.get(ENV_VARIABLE, "0") not in ("", "0")
+    else None
+)
+
+# per-thread current operation and last record
+_local = threading.local()
+
+
+def enabled() -> bool:
+    """Return whether tracing is enabled.
+
+    Returns
+    -----------------------
+    bool
+        Whether statements are recorded
+    """
+    return _records is not None
+
+
+def traced(function: Callable) -> Callable:
+    """Decorate a function, naming the operation of its statements.
+
+    Statements executed by the function, and by the functions it
+    calls, are recorded with its qualified name, unless a nested
+    traced function is running.
+
+    Parameters
+    -----------------------
+    function : Callable
+        Function to decorate
+
+    Returns
+    -----------------------
+    Callable
+        The decorated function, `function` itself if tracing
+        is disabled
+    """
+    if _records is None:
+        return function
+
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        outer = getattr(_local, "operation", None)
+        _local.operation = name
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _local.operation = outer
+
+    return wrapper
+
+
+def execQuery(query: QSqlQuery, sql: str = None) -> bool:
+    """Execute a query, recording it if tracing.
+
+    The number of rows of a SELECT query is unknown until the
+    query is read, see fetched().
+
+    Parameters
+    -----------------------
+    query : QSqlQuery
+        Query to execute, prepared and bound if `sql` is `None`
+    sql : str
+        SQL text to execute, `None` for the prepared one
+
+    Returns
+    -----------------------
+    bool
+        Whether the query was successful
+    """
+    if _records is None:
+        return query.exec() if sql is None else query.exec(sql)
+
+    start = time.perf_counter()
+    chk = query.exec() if sql is None else query.exec(sql)
+    seconds = time.perf_counter() - start
+
+    rows = None if query.isSelect() else query.numRowsAffected()
+    _record(query.lastQuery(), seconds, rows, chk)
+
+    return chk
+
+
+def execBatch(query: QSqlQuery, rows: int) -> bool:
+    """Execute a batch-bound query, recording it if tracing.
+
+    Parameters
+    -----------------------
+    query : QSqlQuery
+        Prepared query, with bound value lists
+    rows : int
+        Number of bound rows
+
+    Returns
+    -----------------------
+    bool
+        Whether the query was successful
+    """
+    if _records is None:
+        return query.execBatch()
+
+    start = time.perf_counter()
+    chk = query.execBatch()
+    seconds = time.perf_counter() - start
+
+    _record(query.lastQuery(), seconds, rows, chk)
+
+    return chk
+
+
+def fetched(rows: int, seconds: float = None):
+    """Record the number of rows read from the last query.
+
+    Applies to the last query executed by the calling thread.
+
+    Parameters
+    -----------------------
+    rows : int
+        Number of rows read
+    seconds : float
+        Wall time spent reading them, `None` if not measured
+    """
+    if _records is None:
+        return
+
+    record = getattr(_local, "last", None)
+    if record is not None:
+        record["rows"] = rows
+        record["fetchSeconds"] = seconds
+
+
+def records() -> list[dict]:
+    """Return the recorded statements.
+
+    Returns
+    -----------------------
+    list[dict]
+        Records from the oldest, with the start time (seconds
+        since the epoch), thread, operation, SQL text, wall
+        times of execution and reading in seconds, number of
+        rows (`None` if unknown) and success of each statement
+    """
+    if _records is None:
+        return []
+
+    return list(_records)
+
+
+def clear():
+    """Drop the recorded statements."""
+    if _records is not None:
+        _records.clear()
+
+
+def dump(filename: str):
+    """Write the recorded statements to a JSON file.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the output file
+
+    Raises
+    -----------------------
+    - DatabaseError if file errors
+    """
+    try:
+        with open(filename, "w", encoding="utf-8") as file:
+            json.dump(records(), file, indent=2)
+    except OSError as err:
+        raise DatabaseError(f"{err}")
+
+
+def _record(sql: str, seconds: float, rows: int, chk: bool):
+    """Append a statement to the ring buffer.
+
+    Parameters
+    -----------------------
+    sql : str
+        SQL text
+    seconds : float
+        Wall time of the execution
+    rows : int
+        Number of rows, `None` if unknown
+    chk : bool
+        Whether the statement was successful
+    """
+    record = {
+        "start": time.time() - seconds,
+        "thread": threading.current_thread().name,
+        "operation": getattr(_local, "operation", None),
+        "sql": " ".join(sql.split()),
+        "seconds": seconds,
+        "fetchSeconds": None,
+        "rows": rows,
+        "ok": chk,
+    }
+
+    # deque appends are atomic, workers record concurrently
+    _records.append(record)
+    _local.last = record
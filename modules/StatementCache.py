@@ -0,0 +1,197 @@
+"""Prepared statement cache.
+
+Classes
+-----------------------
+StatementCache
+    Cache of prepared statements, keyed by SQL text.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from collections import OrderedDict
+
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from modules import SqlTrace
+from modules.Database import DatabaseError
+
+
+# maximum number of prepared statements held by a cache
+MAX_STATEMENTS = 64
+
+
+class StatementCache:
+    """Cache of prepared statements, keyed by SQL text.
+
+    Statements are prepared once per query shape (the SQL text
+    with placeholders), and values are bound at every
+    execution, so that SQLite does not parse and plan them
+    again. Least recently used statements are evicted.
+
+    Public attributes
+    -----------------------
+    hits: int
+        Number of executions of already prepared statements
+    misses: int
+        Number of statements prepared
+
+    Private attributes
+    -----------------------
+    __conn: QSqlDatabase
+        Database connection
+    __statements: OrderedDict[tuple[str, bool], QSqlQuery]
+        Prepared statements, from least to most recently used
+
+    Public methods
+    -----------------------
+    __init__(QSqlDatabase)
+        Construct class instance.
+    exec(str, list, bool) -> QSqlQuery
+        Execute a statement with the given parameters.
+    stats() -> dict[str, int]
+        Return hit, miss and size counters.
+    clear()
+        Drop all prepared statements.
+
+    Private methods
+    -----------------------
+    __prepare(str, bool) -> QSqlQuery
+        Return the prepared statement for the given SQL text.
+    """
+
+    def __init__(self, conn: QSqlDatabase):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        conn : QSqlDatabase
+            Database connection
+        """
+        self.hits = 0
+        self.misses = 0
+        self.__conn = conn
+        self.__statements = OrderedDict()
+
+    def exec(
+        self, sql: str, params: list = None, forwardOnly: bool = True
+    ) -> QSqlQuery:
+        """Execute a statement with the given parameters.
+
+        The returned query is shared with the cache: it must be
+        read before the same statement is executed again, and
+        finished when done with.
+
+        Parameters
+        -----------------------
+        sql : str
+            SQL text, with positional placeholders
+        params : list
+            Values bound to the placeholders
+        forwardOnly : bool
+            Whether the result is read sequentially only
+            (QSqlQueryModel requires random access)
+
+        Returns
+        -----------------------
+        QSqlQuery
+            The executed query
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        query = self.__prepare(sql, forwardOnly)
+
+        for i, p in enumerate(params or []):
+            query.bindValue(i, p)
+
+        if not SqlTrace.execQuery(query):
+            raise DatabaseError(query.lastError().text())
+
+        return query
+
+    def stats(self) -> dict[str, int]:
+        """Return hit, miss and size counters.
+
+        Returns
+        -----------------------
+        dict[str, int]
+            Number of hits, misses and cached statements
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.__statements),
+        }
+
+    def clear(self):
+        """Drop all prepared statements."""
+        for query in self.__statements.values():
+            query.finish()
+
+        self.__statements.clear()
+
+    def __prepare(self, sql: str, forwardOnly: bool) -> QSqlQuery:
+        """Return the prepared statement for the given SQL text.
+
+        Parameters
+        -----------------------
+        sql : str
+            SQL text, with positional placeholders
+        forwardOnly : bool
+            Whether the result is read sequentially only
+
+        Returns
+        -----------------------
+        QSqlQuery
+            The prepared statement
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        key = (sql, forwardOnly)
+
+        if key in self.__statements:
+            self.hits += 1
+            self.__statements.move_to_end(key)
+            return self.__statements[key]
+
+        self.misses += 1
+
+        query = QSqlQuery(self.__conn)
+        query.setForwardOnly(forwardOnly)
+        if not query.prepare(sql):
+            raise DatabaseError(query.lastError().text())
+
+        self.__statements[key] = query
+
+        # evicting least recently used statements
+        while len(self.__statements) > MAX_STATEMENTS:
+            _, old = self.__statements.popitem(last=False)
+            old.finish()
+
+        return query
@@ -0,0 +1,208 @@
+"""Expense statistics model.
+
+Classes
+-----------------------
+StatisticsModel
+    Table model of a statistic of the expenses.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+from collections.abc import Callable
+from typing import Any
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject
+
+from modules.Analytics import STATISTICS, Analytics
+from modules.Database import DatabaseError
+
+
+class StatisticsModel(QAbstractTableModel):
+    """Table model of a statistic of the expenses.
+
+    Statistics are computed on the arrays returned by a loader,
+    which may reuse them between calls. The model stays empty
+    until a statistic is selected.
+
+    Private attributes
+    -----------------------
+    __source: Callable[[], Analytics]
+        Returns the expense arrays
+    __statistic: str
+        Current statistic, `None` if not selected
+    __dates: list[str]
+        Current date filter, `None` if not filtering
+    __columns: list[str]
+        Column names of the statistic
+    __rows: list[list]
+        Rows of the statistic
+
+    Public methods
+    -----------------------
+    __init__(Callable[[], Analytics], QObject)
+        Construct class instance.
+    select()
+        Recompute the statistic.
+    setStatistic(str)
+        Show the given statistic.
+    statistic() -> str
+        Return the current statistic.
+    setDateFilter(list[str])
+        Filter the expenses with the specified dates.
+
+    Reimplemented methods
+    -----------------------
+    rowCount(QModelIndex) -> int
+    columnCount(QModelIndex) -> int
+    data(QModelIndex, Qt.ItemDataRole) -> Any
+    headerData(int, Qt.Orientation, Qt.ItemDataRole) -> Any
+    """
+
+    def __init__(self, source: Callable[[], Analytics], parent: QObject = None):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        source : Callable[[], Analytics]
+            Returns the expense arrays, may raise DatabaseError
+        parent : QObject
+            Parent QObject
+        """
+        super().__init__(parent)
+
+        self.__source = source
+        self.__statistic = None
+        self.__dates = None
+        self.__columns = []
+        self.__rows = []
+
+    def select(self):
+        """Recompute the statistic.
+
+        Raises
+        -----------------------
+        - DatabaseError if loading errors
+        """
+        self.beginResetModel()
+
+        try:
+            if self.__statistic is None:
+                self.__columns, self.__rows = [], []
+            else:
+                self.__columns, self.__rows = self.__source().table(
+                    self.__statistic, self.__dates
+                )
+        except DatabaseError:
+            self.__columns, self.__rows = [], []
+            raise
+        finally:
+            self.endResetModel()
+
+    def setStatistic(self, statistic: str):
+        """Show the given statistic.
+
+        Parameters
+        -----------------------
+        statistic : str
+            A key of Analytics.STATISTICS
+
+        Raises
+        -----------------------
+        - DatabaseError if unknown statistic
+        - DatabaseError if loading errors
+        """
+        if statistic not in STATISTICS:
+            raise DatabaseError(f"Unknown statistic '{statistic}'")
+
+        self.__statistic = statistic
+
+        try:
+            self.select()
+        except DatabaseError:
+            # not retried on later filters
+            self.__statistic = None
+            raise
+
+    def statistic(self) -> str:
+        """Return the current statistic.
+
+        Returns
+        -----------------------
+        str
+            A key of Analytics.STATISTICS, `None` if not selected
+        """
+        return self.__statistic
+
+    def setDateFilter(self, dates: list[str]):
+        """Filter the expenses with the specified dates.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` removes all filters
+
+        Raises
+        -----------------------
+        - DatabaseError if loading errors
+        """
+        self.__dates = dates
+        self.select()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of rows of the statistic."""
+        return 0 if parent.isValid() else len(self.__rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of columns of the statistic."""
+        return 0 if parent.isValid() else len(self.__columns)
+
+    def data(
+        self,
+        index: QModelIndex,
+        role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        """Return the value of the given row and column."""
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        return self.__rows[index.row()][index.column()]
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        """Return column names and row numbers."""
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        if orientation == Qt.Orientation.Vertical:
+            return section + 1
+
+        return self.__columns[section]
@@ -0,0 +1,350 @@
+"""Expense summaries.
+
+Functions
+-----------------------
+typeSummaryQuery()
+    Return the query totalling expenses by type.
+typeSummary()
+    Return the totals of the expenses by type.
+periodSummaryQuery()
+    Return the query totalling expenses by period and type.
+periodSummary()
+    Return the totals of the expenses by period and type.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from fractions import Fraction
+
+from modules import SqlTrace
+from modules.Database import DatabaseError
+from modules.Schema import ROLLUP_HIGH, ROLLUP_LOW
+from modules.Search import searchClause
+from modules.StatementCache import StatementCache
+
+
+# period -> label of the period of a day, as SQL expression
+# (weeks start on Monday, the first one on the first Monday)
+PERIODS = {
+    "week": "strftime('%Y-W%W', day)",
+    "month": "strftime('%Y-%m', day)",
+    "year": "strftime('%Y', day)",
+}
+
+# aggregates of the rows to total: (total, high, low, inexact),
+# the total of the expenses or the exact parts of the total of
+# the rollup, and the number of amounts the parts miss
+ROLLUP_AGGREGATES = "NULL, SUM(high), SUM(low), SUM(inexact)"
+EXPENSE_AGGREGATES = "SUM(amount), NULL, NULL, 0"
+
+
+def typeSummaryQuery(
+    dates: list[str] = None, search: str = None, rollup: bool = True
+) -> tuple[str, list]:
+    """Return the query totalling expenses by type.
+
+    The query is answered from the per-(day, type) aggregates,
+    or from the matching expenses when searching or without
+    `rollup`, with one row per type, sorted by type: the type
+    and the aggregates of EXPENSE_AGGREGATES or
+    ROLLUP_AGGREGATES.
+
+    Parameters
+    -----------------------
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` totals all expenses
+    search : str
+        Text searched in the justifications, `None` for all
+    rollup : bool
+        Whether to total the aggregates, if not searching
+
+    Returns
+    -----------------------
+    tuple[str, list]
+        The SQL text and the values to bind to it
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid date range
+    """
+    source, aggregates, flt, params = _source(dates, search, rollup)
+
+    sql = f"""
+        SELECT type, {aggregates}
+        FROM {source}
+        WHERE {flt}
+        GROUP BY type
+        ORDER BY type ;
+    """
+
+    return sql, params
+
+
+@SqlTrace.traced
+def typeSummary(
+    statements: StatementCache, dates: list[str] = None, search: str = None
+) -> list[tuple[str, float]]:
+    """Return the totals of the expenses by type.
+
+    Totals are those of SUM() over the expenses: the exact sums
+    of the amounts, rounded once. They are read from the
+    aggregates, unless some amount of the dates cannot be kept
+    exactly there.
+
+    Parameters
+    -----------------------
+    statements : StatementCache
+        Prepared statements of the database connection
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` totals all expenses
+    search : str
+        Text searched in the justifications, `None` for all
+
+    Returns
+    -----------------------
+    list[tuple[str, float]]
+        (type, total) pairs, sorted by type
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid date range
+    - DatabaseError if query errors
+    """
+    rows = _totals(statements, typeSummaryQuery(dates, search), 1)
+    if rows is None:
+        rows = _totals(
+            statements, typeSummaryQuery(dates, search, rollup=False), 1
+        )
+
+    return rows
+
+
+def periodSummaryQuery(
+    period: str,
+    dates: list[str] = None,
+    search: str = None,
+    rollup: bool = True,
+) -> tuple[str, list]:
+    """Return the query totalling expenses by period and type.
+
+    The query is answered from the per-(day, type) aggregates,
+    or from the matching expenses when searching or without
+    `rollup`, in a single pass, with one row per (period, type)
+    pair, sorted by period and type: the period, the type and
+    the aggregates, as in typeSummaryQuery().
+
+    Parameters
+    -----------------------
+    period : str
+        A key of PERIODS
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` totals all expenses
+    search : str
+        Text searched in the justifications, `None` for all
+    rollup : bool
+        Whether to total the aggregates, if not searching
+
+    Returns
+    -----------------------
+    tuple[str, list]
+        The SQL text and the values to bind to it
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid period
+    - DatabaseError if invalid date range
+    """
+    if period not in PERIODS:
+        raise DatabaseError(f"Invalid summary period '{period}'")
+
+    source, aggregates, flt, params = _source(dates, search, rollup)
+
+    sql = f"""
+        SELECT {PERIODS[period]} AS period, type, {aggregates}
+        FROM {source}
+        WHERE {flt}
+        GROUP BY period, type
+        ORDER BY period, type ;
+    """
+
+    return sql, params
+
+
+@SqlTrace.traced
+def periodSummary(
+    statements: StatementCache,
+    period: str,
+    dates: list[str] = None,
+    search: str = None,
+) -> tuple[list[str], list[tuple[str, list[float]]]]:
+    """Return the totals of the expenses by period and type.
+
+    The totals are pivoted, with one row per period and one
+    column per type, and computed as in typeSummary().
+
+    Parameters
+    -----------------------
+    statements : StatementCache
+        Prepared statements of the database connection
+    period : str
+        A key of PERIODS
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` totals all expenses
+    search : str
+        Text searched in the justifications, `None` for all
+
+    Returns
+    -----------------------
+    tuple[list[str], list[tuple[str, list[float]]]]
+        - The sorted types
+        - (period, totals) pairs, sorted by period, with the
+          totals in the order of the types (0.0 if none)
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid period
+    - DatabaseError if invalid date range
+    - DatabaseError if query errors
+    """
+    totals = _totals(statements, periodSummaryQuery(period, dates, search), 2)
+    if totals is None:
+        totals = _totals(
+            statements,
+            periodSummaryQuery(period, dates, search, rollup=False),
+            2,
+        )
+
+    # period -> {type: total}, periods arrive in order
+    cells = {}
+    for label, etype, total in totals:
+        cells.setdefault(label, {})[etype] = total
+
+    types = sorted({t for totals in cells.values() for t in totals})
+    rows = [
+        (label, [totals.get(t, 0.0) for t in types])
+        for label, totals in cells.items()
+    ]
+
+    return types, rows
+
+
+def _totals(
+    statements: StatementCache, query: tuple[str, list], keys: int
+) -> list[tuple] | None:
+    """Run a summary query and return its totals.
+
+    Parameters
+    -----------------------
+    statements : StatementCache
+        Prepared statements of the database connection
+    query : tuple[str, list]
+        The SQL text and the values to bind to it
+    keys : int
+        Number of columns before the aggregates
+
+    Returns
+    -----------------------
+    list[tuple] | None
+        - The keys and the total of each row, in order
+        - `None` if some total of the aggregates is not exact
+
+    Raises
+    -----------------------
+    - DatabaseError if query errors
+    """
+    query = statements.exec(*query)
+
+    rows = []
+    exact = True
+    while query.next():
+        total, high, low, inexact = (query.value(keys + i) for i in range(4))
+        if inexact:
+            exact = False
+        elif query.isNull(keys):
+            # converting the exact fraction rounds once, as SUM()
+            total = float(
+                Fraction(high, ROLLUP_HIGH) + Fraction(low, ROLLUP_LOW)
+            )
+
+        rows.append((*(query.value(i) for i in range(keys)), total))
+    SqlTrace.fetched(len(rows))
+    query.finish()
+
+    return rows if exact else None
+
+
+def _source(
+    dates: list[str], search: str, rollup: bool
+) -> tuple[str, str, str, list]:
+    """Return the rows to total, and the filter on them.
+
+    Parameters
+    -----------------------
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` totals all expenses
+    search : str
+        Text searched in the justifications, `None` for all
+    rollup : bool
+        Whether to total the aggregates, if not searching
+
+    Returns
+    -----------------------
+    tuple[str, str, str, list]
+        - Table or subquery with rows by day and type
+        - Their aggregates, ROLLUP_AGGREGATES or
+          EXPENSE_AGGREGATES
+        - WHERE clause on the rows
+        - Values to bind, to the subquery first
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid date range
+    """
+    # dates are bound, the filter only selects the shape
+    flt, params = "TRUE", []
+    if dates is not None:
+        if len(dates) != 2:
+            raise DatabaseError("Invalid date interval")
+
+        flt, params = "day BETWEEN ? AND ?", list(dates)
+
+    clause, searchParams = searchClause(search)
+    if rollup and not searchParams:
+        return "expense_rollup", ROLLUP_AGGREGATES, flt, params
+
+    # aggregates cannot be searched, matching expenses are read
+    source = f"""(
+        SELECT date AS day, type, amount
+        FROM expenses
+        WHERE {clause}
+    )"""
+
+    return source, EXPENSE_AGGREGATES, flt, searchParams + params
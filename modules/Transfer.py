@@ -0,0 +1,1593 @@
+"""Bulk data transfer.
+
+Classes
+-----------------------
+TransferCancelled
+    Raised by progress callbacks to abort a transfer.
+
+Arrow IPC and Parquet files require the optional `pyarrow`
+package; CSV files are always supported.
+
+Functions
+-----------------------
+fileFormat()
+    Return the format of a data file, from its extension.
+importFile()
+    Append the contents of a data file to the database.
+exportFile()
+    Dump the expenses in a date range to a data file.
+importCSV()
+    Append the contents of a CSV file to the database.
+importCSVParallel()
+    Append the valid rows of a CSV file, rejecting the others.
+importArrow()
+    Append the contents of an Arrow IPC or Parquet file.
+countRows()
+    Return the number of expenses in a date range.
+exportCSV()
+    Dump the expenses in a date range to a CSV file.
+exportArrow()
+    Dump the expenses in a date range to an Arrow IPC or Parquet file.
+exportSummaryCSV()
+    Write the expense totals by period and type to a CSV file.
+exportChanges()
+    Write the changes since the last export to a destination.
+importChanges()
+    Apply a change file written by exportChanges().
+copyDatabase()
+    Copy a database file with the SQLite online backup API.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from collections.abc import Callable
+from concurrent.futures.process import BrokenProcessPool
+import csv
+import os
+import sqlite3
+import time
+from urllib.request import pathname2url
+
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from modules import SqlTrace
+from modules.Database import DatabaseError, EXPENSES_COLUMNS
+from modules.Duplicates import DuplicateFilter
+from modules.Federation import Federation
+from modules.StatementCache import StatementCache
+from modules.Summary import periodSummary
+from modules import Validation
+
+
+# number of CSV rows bound per batch during imports
+IMPORT_CHUNK_SIZE = 5000
+# number of rows buffered before each write during exports
+EXPORT_CHUNK_SIZE = 5000
+# size in bytes of the output buffer during exports
+EXPORT_BUFFER_SIZE = 1 << 20
+# header of the CSV file of rejected rows
+REJECTS_HEADER = [
+    "line",
+    "error",
+    "id",
+    "date",
+    "type",
+    "amount",
+    "justification",
+]
+
+# number of pages copied per step of database copies
+BACKUP_PAGES = 256
+
+# header of change files
+CHANGES_HEADER = ["op", "id", "date", "type", "amount", "justification"]
+# destination of change exports, if not named
+DEFAULT_DESTINATION = "default"
+
+# format of data files by extension, CSV otherwise
+FILE_FORMATS = {
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".parquet": "parquet",
+}
+# displayed names of the formats
+FORMAT_NAMES = {"csv": "CSV", "arrow": "Arrow", "parquet": "Parquet"}
+
+
+class TransferCancelled(Exception):
+    """Raised by progress callbacks to abort a transfer."""
+
+
+def _arrowSchema():
+    """Return the Arrow schema of exported expenses.
+
+    Returns
+    -----------------------
+    pyarrow.Schema
+        Typed columns of the `expenses` table
+
+    Raises
+    -----------------------
+    - DatabaseError if pyarrow is not installed
+    """
+    if pyarrow is None:
+        raise DatabaseError(
+            "Arrow and Parquet files require the 'pyarrow' package"
+        )
+
+    return pyarrow.schema(
+        [
+            ("id", pyarrow.int64()),
+            ("date", pyarrow.date32()),
+            ("type", pyarrow.string()),
+            ("amount", pyarrow.float64()),
+            ("justification", pyarrow.string()),
+        ]
+    )
+
+
+def fileFormat(filename: str) -> str:
+    """Return the format of a data file, from its extension.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the file
+
+    Returns
+    -----------------------
+    str
+        "arrow", "parquet", or "csv" for any other extension
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return FILE_FORMATS.get(extension, "csv")
+
+
+def importFile(
+    conn: QSqlDatabase,
+    filename: str,
+    progress: Callable[[int, int], None] = None,
+    federation: Federation = None,
+    dedup: DuplicateFilter = None,
+) -> int:
+    """Append the contents of a data file to the database.
+
+    Dispatches to importCSV() or importArrow(), depending on
+    the extension of the file.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    filename : str
+        Filename of the input file
+    progress : Callable[[int, int], None]
+        Called after each chunk with the number of rows and
+        bytes read so far, may raise TransferCancelled
+    federation : Federation
+        Yearly databases of the connection, `None` if single
+    dedup : DuplicateFilter
+        Filter skipping rows already in the database, `None`
+        imports all rows
+
+    Returns
+    -----------------------
+    int
+        The number of imported rows
+
+    Raises
+    -----------------------
+    - DatabaseError if file does not exist
+    - DatabaseError if invalid file content
+    - DatabaseError if pyarrow required and not installed
+    - TransferCancelled if cancelled by `progress`
+    """
+    if fileFormat(filename) == "csv":
+        return importCSV(conn, filename, progress, federation, dedup)
+
+    return importArrow(conn, filename, progress, federation, dedup)
+
+
+def exportFile(
+    conn: QSqlDatabase,
+    filename: str,
+    dates: list[str] = None,
+    progress: Callable[[int, int], None] = None,
+) -> int:
+    """Dump the expenses in a date range to a data file.
+
+    Dispatches to exportCSV() or exportArrow(), depending on
+    the extension of the file.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    filename : str
+        Filename of the output file
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` exports all expenses
+    progress : Callable[[int, int], None]
+        Called after each chunk with the number of rows
+        written so far (twice), may raise TransferCancelled
+
+    Returns
+    -----------------------
+    int
+        The number of exported rows
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid date range
+    - DatabaseError if query or file errors
+    - DatabaseError if pyarrow required and not installed
+    - TransferCancelled if cancelled by `progress`
+    """
+    if fileFormat(filename) == "csv":
+        return exportCSV(conn, filename, dates, progress)
+
+    return exportArrow(conn, filename, dates, progress)
+
+
+@SqlTrace.traced
+def importCSV(
+    conn: QSqlDatabase,
+    filename: str,
+    progress: Callable[[int, int], None] = None,
+    federation: Federation = None,
+    dedup: DuplicateFilter = None,
+) -> int:
+    """Append the contents of a CSV file to the database.
+
+    Rows are inserted through a single prepared statement,
+    bound in chunks of IMPORT_CHUNK_SIZE rows, within one
+    transaction: a single invalid row, or an exception raised
+    by `progress`, rolls back the whole import. With a
+    federation, each row goes to the file of its year, through
+    one statement per file. With `dedup`, rows matching
+    expenses already in the database are skipped.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    filename : str
+        Filename of the input CSV file
+    progress : Callable[[int, int], None]
+        Called after each chunk with the number of rows and
+        bytes read so far, may raise TransferCancelled
+    federation : Federation
+        Yearly databases of the connection, `None` if single
+    dedup : DuplicateFilter
+        Filter skipping rows already in the database, `None`
+        imports all rows
+
+    Returns
+    -----------------------
+    int
+        The number of imported rows
+
+    Raises
+    -----------------------
+    - DatabaseError if file does not exist
+    - DatabaseError if invalid file content
+    - TransferCancelled if cancelled by `progress`
+    """
+    # prepared INSERT statement of each target table
+    queries = {}
+
+    if not conn.transaction():
+        raise DatabaseError(conn.lastError().text())
+
+    rows = 0
+
+    # handreading of csv file required
+    # (QSqlQuery cannot pass .mode commands)
+    try:
+        with open(filename, "r", newline="", encoding="utf-8") as csvfile:
+            reader = csv.reader(csvfile, quotechar='"')
+
+            # list of (line number, row) pairs
+            chunk = []
+
+            try:
+                for row in reader:
+                    chunk.append((reader.line_num, row))
+
+                    if len(chunk) == IMPORT_CHUNK_SIZE:
+                        rows += _insertRouted(
+                            conn, queries, chunk, federation, dedup=dedup
+                        )
+                        chunk = []
+
+                        # buffered position, read-ahead granularity
+                        if progress is not None:
+                            progress(rows, csvfile.buffer.tell())
+
+                rows += _insertRouted(
+                    conn, queries, chunk, federation, dedup=dedup
+                )
+            except csv.Error as err:
+                raise DatabaseError(
+                    f"CSV file error :: line {reader.line_num} :: {err}"
+                )
+
+        if dedup is not None:
+            dedup.finish()
+    except OSError as err:
+        _finishAll(queries)
+        conn.rollback()
+        raise DatabaseError(f"{err}")
+    except ValueError as err:
+        # undecodable bytes included
+        _finishAll(queries)
+        conn.rollback()
+        raise DatabaseError(f"Invalid file content :: {err}")
+    except BaseException:
+        # the transaction is never left open
+        _finishAll(queries)
+        conn.rollback()
+        raise
+
+    _finishAll(queries)
+    if not conn.commit():
+        raise DatabaseError(conn.lastError().text())
+
+    return rows
+
+
+@SqlTrace.traced
+def importCSVParallel(
+    conn: QSqlDatabase,
+    filename: str,
+    rejects: str,
+    progress: Callable[[int, int], None] = None,
+    federation: Federation = None,
+    jobs: int = None,
+    dedup: DuplicateFilter = None,
+) -> tuple[int, int]:
+    """Append the valid rows of a CSV file, rejecting the others.
+
+    The file is parsed and validated by Validation.parseFile(),
+    in worker processes for large files, while this thread
+    inserts the validated rows as in importCSV(), within one
+    transaction. Rows failing validation or insertion are
+    skipped, and written with their line number and the reason
+    to the `rejects` CSV file, created only if rows are
+    rejected. The rows are written to a partial file, renamed
+    once the import is committed, and removed if the import
+    fails or is cancelled.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    filename : str
+        Filename of the input CSV file
+    rejects : str
+        Filename of the output CSV file of rejected rows
+    progress : Callable[[int, int], None]
+        Called after each range with the number of rows and
+        bytes read so far, may raise TransferCancelled
+    federation : Federation
+        Yearly databases of the connection, `None` if single
+    jobs : int
+        Number of worker processes, `None` for one per CPU
+    dedup : DuplicateFilter
+        Filter skipping rows already in the database, `None`
+        imports all rows
+
+    Returns
+    -----------------------
+    tuple[int, int]
+        The number of imported and rejected rows
+
+    Raises
+    -----------------------
+    - DatabaseError if file errors
+    - TransferCancelled if cancelled by `progress`
+    """
+    # prepared INSERT statement of each target table
+    queries = {}
+
+    if not conn.transaction():
+        raise DatabaseError(conn.lastError().text())
+
+    rows, rejected = 0, 0
+    # partial rejects file, opened on the first rejected row
+    partial = f"{rejects}.part"
+    output, writer = None, None
+
+    try:
+        ranges = Validation.parseFile(filename, jobs)
+
+        try:
+            for end, valid, failed in ranges:
+                for first in range(0, len(valid), IMPORT_CHUNK_SIZE):
+                    chunk = valid[first : first + IMPORT_CHUNK_SIZE]
+                    rows += _insertRouted(
+                        conn, queries, chunk, federation, failed, dedup
+                    )
+
+                rejected += len(failed)
+
+                if failed:
+                    if output is None:
+                        # undecodable bytes are written back unchanged
+                        output = open(
+                            partial,
+                            "w",
+                            newline="",
+                            encoding="utf-8",
+                            errors="surrogateescape",
+                        )
+                        writer = csv.writer(output, quotechar='"')
+                        writer.writerow(REJECTS_HEADER)
+
+                    # rows rejected by the database are sorted in
+                    failed.sort(key=lambda reject: reject[0])
+                    writer.writerows(
+                        [line, reason] + row for line, reason, row in failed
+                    )
+
+                if progress is not None:
+                    progress(rows, end)
+
+            if dedup is not None:
+                dedup.finish()
+        finally:
+            ranges.close()
+            if output is not None:
+                output.close()
+    except (OSError, BrokenProcessPool) as err:
+        _finishAll(queries)
+        conn.rollback()
+        _removeRejects(partial)
+        raise DatabaseError(f"{err}")
+    except ValueError as err:
+        _finishAll(queries)
+        conn.rollback()
+        _removeRejects(partial)
+        raise DatabaseError(f"Invalid file content :: {err}")
+    except BaseException:
+        # the transaction is never left open
+        _finishAll(queries)
+        conn.rollback()
+        _removeRejects(partial)
+        raise
+
+    _finishAll(queries)
+    if not conn.commit():
+        _removeRejects(partial)
+        raise DatabaseError(conn.lastError().text())
+
+    if output is not None:
+        try:
+            os.replace(partial, rejects)
+        except OSError as err:
+            _removeRejects(partial)
+            raise DatabaseError(f"Rows imported, rejects not saved :: {err}")
+
+    return rows, rejected
+
+
+def _removeRejects(filename: str):
+    """Remove a partial rejects file, if any.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the partial file
+    """
+    # the error of the import is the one reported
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+@SqlTrace.traced
+def importArrow(
+    conn: QSqlDatabase,
+    filename: str,
+    progress: Callable[[int, int], None] = None,
+    federation: Federation = None,
+    dedup: DuplicateFilter = None,
+) -> int:
+    """Append the contents of an Arrow IPC or Parquet file.
+
+    The format is chosen by fileFormat(). Record batches are
+    converted column by column, and inserted as in importCSV(),
+    IMPORT_CHUNK_SIZE rows at a time within one transaction.
+    The `id` column is optional, null ids are auto-assigned;
+    dates may be stored as dates or as 'yyyy-mm-dd' strings.
+    Rows are numbered from 1 in error messages.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    filename : str
+        Filename of the input file
+    progress : Callable[[int, int], None]
+        Called after each chunk with the number of rows read so
+        far, and the corresponding share of the file size in
+        bytes, may raise TransferCancelled
+    federation : Federation
+        Yearly databases of the connection, `None` if single
+    dedup : DuplicateFilter
+        Filter skipping rows already in the database, `None`
+        imports all rows
+
+    Returns
+    -----------------------
+    int
+        The number of imported rows
+
+    Raises
+    -----------------------
+    - DatabaseError if pyarrow is not installed
+    - DatabaseError if file does not exist
+    - DatabaseError if invalid file content
+    - TransferCancelled if cancelled by `progress`
+    """
+    names = _arrowSchema().names
+
+    # prepared INSERT statement of each target table
+    queries = {}
+
+    if not conn.transaction():
+        raise DatabaseError(conn.lastError().text())
+
+    # rows read, and imported
+    read, rows = 0, 0
+
+    try:
+        size = os.path.getsize(filename)
+
+        if fileFormat(filename) == "parquet":
+            source = pyarrow.parquet.ParquetFile(filename)
+            fields = source.schema_arrow.names
+            total = source.metadata.num_rows
+            batches = source.iter_batches(batch_size=IMPORT_CHUNK_SIZE)
+        else:
+            source = pyarrow.ipc.open_file(pyarrow.memory_map(filename))
+            fields = source.schema.names
+            total = sum(
+                source.get_batch(i).num_rows
+                for i in range(source.num_record_batches)
+            )
+            batches = (
+                source.get_batch(i) for i in range(source.num_record_batches)
+            )
+
+        missing = [n for n in names[1:] if n not in fields]
+        if missing:
+            raise DatabaseError(f"Missing column '{missing[0]}'")
+
+        for batch in batches:
+            for offset in range(0, batch.num_rows, IMPORT_CHUNK_SIZE):
+                part = batch.slice(offset, IMPORT_CHUNK_SIZE)
+                columns = [
+                    _arrowColumn(part, name).to_pylist() for name in names
+                ]
+
+                chunk = list(
+                    enumerate(map(list, zip(*columns)), start=read + 1)
+                )
+                rows += _insertRouted(
+                    conn, queries, chunk, federation, dedup=dedup
+                )
+                read += len(chunk)
+
+                if progress is not None:
+                    progress(rows, size * read // total)
+
+        if dedup is not None:
+            dedup.finish()
+    except OSError as err:
+        _finishAll(queries)
+        conn.rollback()
+        raise DatabaseError(f"{err}")
+    except pyarrow.ArrowException as err:
+        _finishAll(queries)
+        conn.rollback()
+        raise DatabaseError(f"Invalid file content :: {err}")
+    except ValueError as err:
+        # undecodable bytes included
+        _finishAll(queries)
+        conn.rollback()
+        raise DatabaseError(f"Invalid file content :: {err}")
+    except BaseException:
+        # the transaction is never left open
+        _finishAll(queries)
+        conn.rollback()
+        raise
+
+    _finishAll(queries)
+    if not conn.commit():
+        raise DatabaseError(conn.lastError().text())
+
+    return rows
+
+
+def _arrowColumn(batch, name: str):
+    """Return a column of a record batch, with import types.
+
+    Parameters
+    -----------------------
+    batch : pyarrow.RecordBatch
+        Batch read from an Arrow IPC or Parquet file
+    name : str
+        Name of the column
+
+    Returns
+    -----------------------
+    pyarrow.Array
+        The column, all nulls if a missing `id` column; dates
+        are converted to 'yyyy-mm-dd' strings
+
+    Raises
+    -----------------------
+    - pyarrow.ArrowException if incompatible types
+    """
+    index = batch.schema.get_field_index(name)
+    if index == -1:
+        return pyarrow.nulls(batch.num_rows, pyarrow.int64())
+
+    column = batch.column(index)
+    if name == "date" and pyarrow.types.is_temporal(column.type):
+        return column.cast(pyarrow.date32()).cast(pyarrow.string())
+
+    return column
+
+
+def _insertRouted(
+    conn: QSqlDatabase,
+    queries: dict[str, QSqlQuery],
+    chunk: list[tuple[int, list]],
+    federation: Federation = None,
+    rejects: list[tuple[int, str, list]] = None,
+    dedup: DuplicateFilter = None,
+) -> int:
+    """Insert a chunk of CSV rows into their target tables.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    queries : dict[str, QSqlQuery]
+        Prepared INSERT statement of each table, extended with
+        the tables of the chunk
+    chunk : list[tuple[int, list]]
+        (line number, row) pairs
+    federation : Federation
+        Yearly databases of the connection, `None` if single
+    rejects : list[tuple[int, str, list]]
+        Extended with the (line number, reason, row) of invalid
+        rows, which are skipped; `None` raises on invalid rows
+    dedup : DuplicateFilter
+        Filter skipping rows already in the database, `None`
+        inserts all rows
+
+    Returns
+    -----------------------
+    int
+        The number of inserted rows
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid row, with its line number
+    """
+    # table -> (line number, row) pairs
+    parts = {}
+
+    if federation is None:
+        parts["expenses"] = chunk
+    else:
+        for line, row in chunk:
+            try:
+                if len(row) != EXPENSES_COLUMNS:
+                    raise DatabaseError("Invalid row")
+
+                table = federation.tableFor(row[1])
+                row = [federation.localId(row[0])] + row[1:]
+            except DatabaseError as err:
+                if rejects is None:
+                    raise DatabaseError(f"Error in inserting row {line}")
+
+                rejects.append((line, f"{err}", row))
+                continue
+
+            parts.setdefault(table, []).append((line, row))
+
+    inserted = 0
+    for table, part in parts.items():
+        if dedup is not None:
+            part = dedup.filter(table, part)
+
+        if table not in queries:
+            # NULL ids are auto-assigned by SQLite
+            # (id, primary key, autoincrement integer)
+            query = QSqlQuery(conn)
+            query.prepare(
+                f"""
+                INSERT INTO {table} (id, date, type, amount, justification)
+                VALUES (?, ?, ?, ?, ?) ;
+            """
+            )
+            queries[table] = query
+
+        inserted += _insertChunk(conn, queries[table], part, rejects)
+
+    return inserted
+
+
+def _finishAll(queries: dict[str, QSqlQuery]):
+    """Finish prepared statements.
+
+    Parameters
+    -----------------------
+    queries : dict[str, QSqlQuery]
+        Statements to finish
+    """
+    for query in queries.values():
+        query.finish()
+
+
+def _insertChunk(
+    conn: QSqlDatabase,
+    query: QSqlQuery,
+    chunk: list[tuple[int, list]],
+    rejects: list[tuple[int, str, list]] = None,
+) -> int:
+    """Insert a chunk of CSV rows with a batch-bound statement.
+
+    The chunk is wrapped in a savepoint: on failure, it is
+    rolled back and replayed row by row to locate the
+    offending line, or to skip the offending lines when
+    collecting rejects.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    query : QSqlQuery
+        Prepared INSERT statement
+    chunk : list[tuple[int, list]]
+        (line number, row) pairs
+    rejects : list[tuple[int, str, list]]
+        Extended with the (line number, reason, row) of invalid
+        rows, including rows with a wrong number of fields, which
+        are skipped; `None` raises on invalid rows
+
+    Returns
+    -----------------------
+    int
+        The number of inserted rows
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid row, with its line number
+    """
+    # rows of another length cannot be bound
+    if rejects is not None:
+        rejects.extend(
+            (line, f"Expected {EXPENSES_COLUMNS} fields, found {len(row)}", row)
+            for line, row in chunk
+            if len(row) != EXPENSES_COLUMNS
+        )
+        chunk = [
+            (line, row) for line, row in chunk if len(row) == EXPENSES_COLUMNS
+        ]
+
+    if not chunk:
+        return 0
+
+    # transposing rows into bound columns
+    columns = [[] for _ in range(EXPENSES_COLUMNS)]
+    for line, row in chunk:
+        if len(row) != EXPENSES_COLUMNS:
+            raise DatabaseError(f"Error in inserting row {line}")
+
+        # empty 1st field means auto-assigned id
+        columns[0].append(None if row[0] == "" else row[0])
+        for ic, col in enumerate(row[1:], start=1):
+            columns[ic].append(col)
+
+    savepoint = QSqlQuery(conn)
+    SqlTrace.execQuery(savepoint, "SAVEPOINT import_chunk ;")
+
+    for col in columns:
+        query.addBindValue(col)
+
+    # SQLite performs type-checking here
+    if SqlTrace.execBatch(query, len(chunk)):
+        SqlTrace.execQuery(savepoint, "RELEASE import_chunk ;")
+        return len(chunk)
+
+    # locating the first invalid row of the chunk
+    SqlTrace.execQuery(savepoint, "ROLLBACK TO import_chunk ;")
+    skipped = 0
+    for line, row in chunk:
+        for ic, col in enumerate(row):
+            query.addBindValue(None if ic == 0 and col == "" else col)
+
+        if not SqlTrace.execQuery(query):
+            if rejects is None:
+                raise DatabaseError(f"Error in inserting row {line}")
+
+            rejects.append((line, query.lastError().databaseText(), row))
+            skipped += 1
+
+    if skipped:
+        SqlTrace.execQuery(savepoint, "RELEASE import_chunk ;")
+        return len(chunk) - skipped
+
+    # should not be reached, batch failed for other reasons
+    raise DatabaseError(query.lastError().text())
+
+
+def _dateClause(dates: list[str]) -> str:
+    """Return the WHERE clause for a date range.
+
+    Parameters
+    -----------------------
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` selects all dates
+
+    Returns
+    -----------------------
+    str
+        The WHERE clause, with two placeholders if filtering
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid date range
+    """
+    if dates is None:
+        return "TRUE"
+
+    if len(dates) != 2:
+        raise DatabaseError("Invalid date interval")
+
+    return "date BETWEEN ? AND ?"
+
+
+@SqlTrace.traced
+def countRows(conn: QSqlDatabase, dates: list[str] = None) -> int:
+    """Return the number of expenses in a date range.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` counts all expenses
+
+    Returns
+    -----------------------
+    int
+        The number of expenses
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid date range
+    - DatabaseError if query errors
+    """
+    query = QSqlQuery(conn)
+    query.prepare(f"SELECT COUNT(*) FROM expenses WHERE {_dateClause(dates)} ;")
+    for d in dates or []:
+        query.addBindValue(d)
+
+    if not SqlTrace.execQuery(query) or not query.next():
+        raise DatabaseError(query.lastError().text())
+
+    count = query.value(0)
+    query.finish()
+
+    return count
+
+
+@SqlTrace.traced
+def exportCSV(
+    conn: QSqlDatabase,
+    filename: str,
+    dates: list[str] = None,
+    progress: Callable[[int, int], None] = None,
+) -> int:
+    """Dump the expenses in a date range to a CSV file.
+
+    Rows are streamed from a forward-only query and written in
+    chunks of EXPORT_CHUNK_SIZE rows, so that memory usage does
+    not depend on the size of the table. If the export is
+    aborted, the partial file is removed.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    filename : str
+        Filename of the output CSV file
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` exports all expenses
+    progress : Callable[[int, int], None]
+        Called after each chunk with the number of rows
+        written so far (twice, for uniformity with
+        importCSV()), may raise TransferCancelled
+
+    Returns
+    -----------------------
+    int
+        The number of exported rows
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid date range
+    - DatabaseError if query or file errors
+    - TransferCancelled if cancelled by `progress`
+    """
+    query = QSqlQuery(conn)
+    # no caching of rows already read
+    query.setForwardOnly(True)
+    query.prepare(
+        f"""
+        SELECT id, date, type, amount, justification
+        FROM expenses
+        WHERE {_dateClause(dates)}
+        ORDER BY id ;
+    """
+    )
+    for d in dates or []:
+        query.addBindValue(d)
+
+    if not SqlTrace.execQuery(query):
+        raise DatabaseError(query.lastError().text())
+
+    rows = 0
+    value = query.value
+    start = time.perf_counter()
+    cols = range(EXPENSES_COLUMNS)
+
+    # handwriting of csv file required
+    # (QSqlQuery cannot pass .mode commands)
+    try:
+        with open(
+            filename,
+            "w",
+            newline="",
+            encoding="utf-8",
+            buffering=EXPORT_BUFFER_SIZE,
+        ) as csvfile:
+            writer = csv.writer(
+                csvfile,
+                quotechar='"',
+                quoting=csv.QUOTE_NONNUMERIC,
+            )
+
+            chunk = []
+            while query.next():
+                chunk.append([value(i) for i in cols])
+
+                if len(chunk) == EXPORT_CHUNK_SIZE:
+                    writer.writerows(chunk)
+                    rows += len(chunk)
+                    chunk = []
+
+                    if progress is not None:
+                        progress(rows, rows)
+
+            writer.writerows(chunk)
+            rows += len(chunk)
+
+        SqlTrace.fetched(rows, time.perf_counter() - start)
+    except OSError as err:
+        query.finish()
+        raise DatabaseError(f"{err}")
+    except TransferCancelled:
+        query.finish()
+        os.remove(filename)
+        raise
+
+    query.finish()
+
+    return rows
+
+
+@SqlTrace.traced
+def exportArrow(
+    conn: QSqlDatabase,
+    filename: str,
+    dates: list[str] = None,
+    progress: Callable[[int, int], None] = None,
+) -> int:
+    """Dump the expenses in a date range to an Arrow IPC or Parquet file.
+
+    The format is chosen by fileFormat(). Rows are streamed
+    from a forward-only query into typed columns, and written
+    as one record batch (or Parquet row group) every
+    EXPORT_CHUNK_SIZE rows. If the export is aborted, the
+    partial file is removed.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    filename : str
+        Filename of the output file
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` exports all expenses
+    progress : Callable[[int, int], None]
+        Called after each batch with the number of rows
+        written so far (twice), may raise TransferCancelled
+
+    Returns
+    -----------------------
+    int
+        The number of exported rows
+
+    Raises
+    -----------------------
+    - DatabaseError if pyarrow is not installed
+    - DatabaseError if invalid date range
+    - DatabaseError if query or file errors
+    - TransferCancelled if cancelled by `progress`
+    """
+    schema = _arrowSchema()
+
+    query = QSqlQuery(conn)
+    # no caching of rows already read
+    query.setForwardOnly(True)
+    query.prepare(
+        f"""
+        SELECT id, date, type, amount, justification
+        FROM expenses
+        WHERE {_dateClause(dates)}
+        ORDER BY id ;
+    """
+    )
+    for d in dates or []:
+        query.addBindValue(d)
+
+    if not SqlTrace.execQuery(query):
+        raise DatabaseError(query.lastError().text())
+
+    rows = 0
+    value = query.value
+    start = time.perf_counter()
+    cols = range(EXPENSES_COLUMNS)
+
+    try:
+        if fileFormat(filename) == "parquet":
+            writer = pyarrow.parquet.ParquetWriter(filename, schema)
+        else:
+            writer = pyarrow.ipc.new_file(filename, schema)
+
+        with writer:
+            columns = [[] for _ in cols]
+            while query.next():
+                for i in cols:
+                    columns[i].append(value(i))
+
+                if len(columns[0]) == EXPORT_CHUNK_SIZE:
+                    _writeBatch(writer, schema, columns)
+                    rows += EXPORT_CHUNK_SIZE
+                    columns = [[] for _ in cols]
+
+                    if progress is not None:
+                        progress(rows, rows)
+
+            if columns[0] or rows == 0:
+                rows += len(columns[0])
+                _writeBatch(writer, schema, columns)
+
+        SqlTrace.fetched(rows, time.perf_counter() - start)
+    except OSError as err:
+        query.finish()
+        raise DatabaseError(f"{err}")
+    except pyarrow.ArrowException as err:
+        query.finish()
+        raise DatabaseError(f"Invalid expense data :: {err}")
+    except TransferCancelled:
+        query.finish()
+        os.remove(filename)
+        raise
+
+    query.finish()
+
+    return rows
+
+
+def _writeBatch(writer, schema, columns: list[list]):
+    """Write exported columns as a record batch.
+
+    Parameters
+    -----------------------
+    writer : pyarrow.ipc.RecordBatchFileWriter | pyarrow.parquet.ParquetWriter
+        Writer of the output file
+    schema : pyarrow.Schema
+        Schema of the output file
+    columns : list[list]
+        Values of each column, dates as 'yyyy-mm-dd' strings
+
+    Raises
+    -----------------------
+    - pyarrow.ArrowException if invalid values
+    """
+    dates = pyarrow.array(columns[1], pyarrow.string()).cast(pyarrow.date32())
+    batch = pyarrow.record_batch(
+        [columns[0], dates] + columns[2:], schema=schema
+    )
+    writer.write_batch(batch)
+
+
+@SqlTrace.traced
+def exportSummaryCSV(
+    conn: QSqlDatabase,
+    filename: str,
+    period: str,
+    dates: list[str] = None,
+) -> int:
+    """Write the expense totals by period and type to a CSV file.
+
+    The first row holds the column names ("period", the types
+    and "total"), the following ones the totals of each period.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    filename : str
+        Filename of the output CSV file
+    period : str
+        A key of Summary.PERIODS
+    dates : list[str]
+        - [startDate, endDate], both included
+        - `None` totals all expenses
+
+    Returns
+    -----------------------
+    int
+        The number of periods
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid period
+    - DatabaseError if invalid date range
+    - DatabaseError if query or file errors
+    """
+    statements = StatementCache(conn)
+    try:
+        types, rows = periodSummary(statements, period, dates)
+    finally:
+        statements.clear()
+
+    try:
+        with open(filename, "w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.writer(
+                csvfile,
+                quotechar='"',
+                quoting=csv.QUOTE_NONNUMERIC,
+            )
+
+            writer.writerow(["period"] + types + ["total"])
+            writer.writerows(
+                [label] + totals + [sum(totals)] for label, totals in rows
+            )
+    except OSError as err:
+        raise DatabaseError(f"{err}")
+
+    return len(rows)
+
+
+@SqlTrace.traced
+def exportChanges(
+    conn: QSqlDatabase, filename: str, name: str = DEFAULT_DESTINATION
+) -> tuple[int, int]:
+    """Write the changes since the last export to a destination.
+
+    Changes are logged by triggers, see Schema. The change file
+    is a CSV file with a CHANGES_HEADER header and one row per
+    changed expense, in id order: "U" rows hold the current
+    contents of the expense, "D" rows the id of a deleted one.
+    The first export to a destination holds all the expenses.
+    The watermark of the destination is advanced, and changes
+    exported to all destinations are dropped from the log,
+    within the same transaction: if the export fails, the next
+    one starts from the same watermark.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open connection to a single database
+    filename : str
+        Filename of the output change file
+    name : str
+        Name of the destination, owning the watermark
+
+    Returns
+    -----------------------
+    tuple[int, int]
+        The number of updated (or inserted) and deleted expenses
+
+    Raises
+    -----------------------
+    - DatabaseError if query or file errors
+    """
+    statements = StatementCache(conn)
+
+    if not conn.transaction():
+        raise DatabaseError(conn.lastError().text())
+
+    upserted, deleted = 0, 0
+
+    try:
+        query = statements.exec(
+            "SELECT seq FROM expense_watermarks WHERE name = ? ;", [name]
+        )
+        since = query.value(0) if query.next() else None
+        query.finish()
+
+        # the log may have been emptied, not its sequence
+        query = statements.exec(
+            """
+            SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence
+            WHERE name = 'expense_changes' ;
+        """
+        )
+        query.next()
+        last = query.value(0)
+        query.finish()
+
+        if since is None:
+            # new destination, all expenses
+            query = statements.exec(
+                """
+                SELECT 'U', id, date, type, amount, justification
+                FROM expenses
+                ORDER BY id ;
+            """
+            )
+        else:
+            # last state of each changed expense
+            query = statements.exec(
+                """
+                SELECT
+                    IIF(e.id IS NULL, 'D', 'U'), c.id,
+                    e.date, e.type, e.amount, e.justification
+                FROM (
+                    SELECT DISTINCT id FROM expense_changes
+                    WHERE seq > ? AND seq <= ?
+                ) AS c
+                LEFT JOIN expenses AS e ON e.id = c.id
+                ORDER BY c.id ;
+            """,
+                [since, last],
+            )
+
+        with open(filename, "w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.writer(
+                csvfile,
+                quotechar='"',
+                quoting=csv.QUOTE_NONNUMERIC,
+            )
+            writer.writerow(CHANGES_HEADER)
+
+            while query.next():
+                if query.value(0) == "D":
+                    writer.writerow(["D", query.value(1), "", "", "", ""])
+                    deleted += 1
+                else:
+                    writer.writerow([query.value(i) for i in range(6)])
+                    upserted += 1
+
+        query.finish()
+        SqlTrace.fetched(upserted + deleted)
+
+        statements.exec(
+            """
+            INSERT INTO expense_watermarks (name, seq) VALUES (?, ?)
+            ON CONFLICT (name) DO UPDATE SET seq = excluded.seq ;
+        """,
+            [name, last],
+        )
+        statements.exec(
+            """
+            DELETE FROM expense_changes
+            WHERE seq <= (SELECT MIN(seq) FROM expense_watermarks) ;
+        """
+        )
+    except OSError as err:
+        statements.clear()
+        conn.rollback()
+        raise DatabaseError(f"{err}")
+    except BaseException:
+        # the transaction is never left open
+        statements.clear()
+        conn.rollback()
+        raise
+
+    statements.clear()
+    if not conn.commit():
+        raise DatabaseError(conn.lastError().text())
+
+    return upserted, deleted
+
+
+@SqlTrace.traced
+def importChanges(conn: QSqlDatabase, filename: str) -> tuple[int, int]:
+    """Apply a change file written by exportChanges().
+
+    "U" rows insert the expense, or update it if its id exists,
+    "D" rows delete it if it exists: applying a file again
+    leaves the database unchanged. Rows are applied in batches
+    of IMPORT_CHUNK_SIZE, in file order, within one
+    transaction: a single invalid row rolls back the whole
+    file.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open connection to a single database
+    filename : str
+        Filename of the input change file
+
+    Returns
+    -----------------------
+    tuple[int, int]
+        The number of "U" and "D" rows
+
+    Raises
+    -----------------------
+    - DatabaseError if file does not exist
+    - DatabaseError if invalid file content
+    """
+    # contents are written only if changed
+    upsert = QSqlQuery(conn)
+    upsert.prepare(
+        """
+        INSERT INTO expenses (id, date, type, amount, justification)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET
+            date = excluded.date,
+            type = excluded.type,
+            amount = excluded.amount,
+            justification = excluded.justification
+        WHERE date IS NOT excluded.date
+            OR type IS NOT excluded.type
+            OR amount IS NOT excluded.amount
+            OR justification IS NOT excluded.justification ;
+    """
+    )
+    delete = QSqlQuery(conn)
+    delete.prepare("DELETE FROM expenses WHERE id = ? ;")
+    queries = {"upsert": upsert, "delete": delete}
+
+    if not conn.transaction():
+        raise DatabaseError(conn.lastError().text())
+
+    upserted, deleted = 0, 0
+
+    try:
+        with open(filename, "r", newline="", encoding="utf-8") as csvfile:
+            reader = csv.reader(csvfile, quotechar='"')
+
+            # (line number, row) pairs of each operation, and their ids
+            upserts, deletes, ids = [], [], set()
+
+            try:
+                if next(reader, None) != CHANGES_HEADER:
+                    raise DatabaseError("Invalid change file header")
+
+                for row in reader:
+                    valid = len(row) == len(CHANGES_HEADER)
+                    if not valid or row[0] not in ("U", "D"):
+                        raise DatabaseError(
+                            f"Invalid change in row {reader.line_num}"
+                        )
+
+                    # changes of the same expense are applied in order
+                    if row[1] in ids or len(ids) == IMPORT_CHUNK_SIZE:
+                        _applyChanges(conn, queries, upserts, deletes)
+                        upserts, deletes, ids = [], [], set()
+
+                    ids.add(row[1])
+                    if row[0] == "U":
+                        upserts.append((reader.line_num, row[1:]))
+                        upserted += 1
+                    else:
+                        deletes.append((reader.line_num, row[1]))
+                        deleted += 1
+
+                _applyChanges(conn, queries, upserts, deletes)
+            except csv.Error as err:
+                raise DatabaseError(
+                    f"CSV file error :: line {reader.line_num} :: {err}"
+                )
+    except OSError as err:
+        _finishAll(queries)
+        conn.rollback()
+        raise DatabaseError(f"{err}")
+    except ValueError as err:
+        # undecodable bytes included
+        _finishAll(queries)
+        conn.rollback()
+        raise DatabaseError(f"Invalid file content :: {err}")
+    except BaseException:
+        # the transaction is never left open
+        _finishAll(queries)
+        conn.rollback()
+        raise
+
+    _finishAll(queries)
+    if not conn.commit():
+        raise DatabaseError(conn.lastError().text())
+
+    return upserted, deleted
+
+
+def _applyChanges(
+    conn: QSqlDatabase,
+    queries: dict[str, QSqlQuery],
+    upserts: list[tuple[int, list]],
+    deletes: list[tuple[int, str]],
+):
+    """Apply a batch of changes of distinct expenses.
+
+    Parameters
+    -----------------------
+    conn : QSqlDatabase
+        Open database connection
+    queries : dict[str, QSqlQuery]
+        Prepared "upsert" and "delete" statements
+    upserts : list[tuple[int, list]]
+        (line number, row) pairs of the expenses to write
+    deletes : list[tuple[int, str]]
+        (line number, id) pairs of the expenses to delete
+
+    Raises
+    -----------------------
+    - DatabaseError if invalid row, with its line number
+    """
+    _insertChunk(conn, queries["upsert"], upserts)
+
+    if not deletes:
+        return
+
+    query = queries["delete"]
+    query.addBindValue([rowId for _, rowId in deletes])
+    if not SqlTrace.execBatch(query, len(deletes)):
+        raise DatabaseError(
+            f"Error in deleting rows {deletes[0][0]}-{deletes[-1][0]}"
+        )
+
+
+def copyDatabase(
+    source: str,
+    target: str,
+    progress: Callable[[int, int], None] = None,
+    pages: int = BACKUP_PAGES,
+) -> int:
+    """Copy a database file with the SQLite online backup API.
+
+    The source is copied `pages` pages at a time, through a
+    read-only connection of its own: it can stay open, and be
+    written, elsewhere (the copy restarts if written by other
+    connections). The copy is written next to `target`, with
+    a rollback journal, and renamed to it once complete, so
+    that `target` is never left partially written.
+
+    Parameters
+    -----------------------
+    source : str
+        Path of the database to copy
+    target : str
+        Path of the copy, replaced if it exists
+    progress : Callable[[int, int], None]
+        Called after each step with the number of pages copied
+        and the total, may raise TransferCancelled
+    pages : int
+        Number of pages copied per step
+
+    Returns
+    -----------------------
+    int
+        The number of copied pages
+
+    Raises
+    -----------------------
+    - DatabaseError if source does not exist
+    - DatabaseError if query or file errors
+    - TransferCancelled if cancelled by `progress`
+    """
+    if not os.path.isfile(source):
+        raise DatabaseError("Database does not exists")
+
+    partial = f"{target}.part"
+    uri = f"file:{pathname2url(os.path.abspath(source))}?mode=ro"
+
+    # (copied, total) pages
+    counts = [0, 0]
+
+    def step(_status: int, remaining: int, total: int):
+        counts[:] = [total - remaining, total]
+        if progress is not None:
+            progress(total - remaining, total)
+
+    src, dst = None, None
+    try:
+        src = sqlite3.connect(uri, uri=True)
+        dst = sqlite3.connect(partial)
+        src.backup(dst, pages=pages, progress=step)
+
+        # a single file, whatever the journal of the source
+        dst.execute("PRAGMA journal_mode = DELETE ;")
+        dst.close()
+        dst = None
+
+        os.replace(partial, target)
+    except (sqlite3.Error, OSError) as err:
+        _removePartial(dst, partial)
+        raise DatabaseError(f"{err}")
+    except TransferCancelled:
+        _removePartial(dst, partial)
+        raise
+    finally:
+        if src is not None:
+            src.close()
+
+    return counts[0]
+
+
+def _removePartial(conn: sqlite3.Connection, filename: str):
+    """Close and remove a partial database copy.
+
+    Parameters
+    -----------------------
+    conn : sqlite3.Connection
+        Connection to the copy, `None` if closed
+    filename : str
+        Path of the copy
+    """
+    if conn is not None:
+        conn.close()
+
+    for suffix in ["", "-journal"]:
+        if os.path.exists(filename + suffix):
+            os.remove(filename + suffix)
@@ -0,0 +1,852 @@
+"""Background transfer workers.
+
+Classes
+-----------------------
+WorkerMeta
+    Metaclass of abstract QObject classes.
+TransferWorker
+    Abstract worker running a transfer in a separate thread.
+ImportWorker
+    Worker importing a data file in a separate thread.
+ExportWorker
+    Worker exporting expenses to a data file in a separate thread.
+OpenWorker
+    Worker reading a database being opened in a separate thread.
+BackupWorker
+    Worker copying the open database to a backup file.
+RestoreWorker
+    Worker copying a backup file next to the open database.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import threading
+import time
+from abc import ABCMeta, abstractmethod
+
+from PyQt6 import QtCore
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtSql import QSqlDatabase
+
+from modules.Database import (
+    DatabaseError,
+    DEFAULT_PROFILE,
+    connect,
+    disconnect,
+)
+from modules.Duplicates import DuplicateFilter
+from modules.ExpenseModel import ExpenseModel
+from modules.Federation import Federation, connectFederation
+from modules.Schema import (
+    SCHEMA_VERSION,
+    migrateSchema,
+    schemaVersion,
+    validateSchema,
+)
+from modules.StatementCache import StatementCache
+from modules.Summary import periodSummary, typeSummary
+from modules.Transfer import (
+    FORMAT_NAMES,
+    TransferCancelled,
+    copyDatabase,
+    countRows,
+    exportFile,
+    fileFormat,
+    importCSVParallel,
+    importFile,
+)
+
+
+# name of the dedicated connection of the workers
+WORKER_CONNECTION = "sem-worker"
+
+
+class WorkerMeta(type(QObject), ABCMeta):
+    """Metaclass of abstract QObject classes.
+
+    QObject subclasses cannot take ABCMeta alone, the metaclass
+    of QObject being a different one.
+    """
+
+
+class TransferWorker(QObject, metaclass=WorkerMeta):
+    """Abstract worker running a transfer in a separate thread.
+
+    To be moved to a QThread, with run() connected to the
+    QThread.started signal. The transfer uses a dedicated
+    connection, opened and closed in the worker thread; a list
+    of yearly databases is opened as a federation.
+    Subclasses implement _transfer().
+
+    Public attributes
+    -----------------------
+    title: str
+        Description of the transfer
+    total: int
+        Amount of work of the transfer, in units of the second
+        argument of 'progress'
+    unit: str
+        What the first argument of 'progress' counts
+
+    Private attributes
+    -----------------------
+    __database: str | list[str]
+        Path of the database, or paths of the yearly databases
+    __profile: str
+        Performance profile of the dedicated connection
+    __readOnly: bool
+        Whether the dedicated connection is read-only
+    __cancelled: threading.Event
+        Set when cancellation is requested
+    __start: float
+        Starting time of the transfer
+
+    Public methods
+    -----------------------
+    __init__(str | list[str], str, str, bool)
+        Construct class instance.
+    cancel()
+        Request cancellation, thread-safe.
+
+    Protected methods
+    -----------------------
+    _transfer(QSqlDatabase, Federation) -> int
+        Run the transfer through the given connection.
+    _report(int, int)
+        Emit progress, abort if cancellation was requested.
+
+    Private methods
+    -----------------------
+    __connectAndTransfer() -> int
+        Run the transfer through the dedicated connection.
+    __rate(int) -> float
+        Return the number of rows processed per second.
+
+    Signals
+    -----------------------
+    progress[int, int, float]
+        Broadcast rows and work done, and rows per second.
+    succeeded[int]
+        Broadcast number of rows transferred.
+    failed[str]
+        Broadcast error message.
+    cancelled[]
+        Broadcast transfer cancellation.
+    finished[]
+        Broadcast end of the transfer, whatever the outcome.
+
+    Public slots
+    -----------------------
+    run()
+        Run the transfer.
+    """
+
+    def __init__(
+        self,
+        database: str | list[str],
+        title: str,
+        profile: str,
+        readOnly: bool = False,
+    ):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        database : str | list[str]
+            Path of the database, or paths of the yearly databases
+        title : str
+            Description of the transfer
+        profile : str
+            Performance profile of the dedicated connection
+        readOnly : bool
+            Whether to open a single database read-only, without
+            applying the profile
+        """
+        super().__init__()
+
+        self.title = title
+        self.total = 0
+        self.unit = "rows"
+        self.__database = database
+        self.__profile = profile
+        self.__readOnly = readOnly
+        self.__cancelled = threading.Event()
+        self.__start = None
+
+    def cancel(self):
+        """Request cancellation, thread-safe.
+
+        Must be connected with a direct connection, since the
+        worker thread is busy until the transfer ends.
+        """
+        self.__cancelled.set()
+
+    progress = pyqtSignal(int, int, float)
+    """Broadcast rows and work done, and rows per second.
+
+    Parameters
+    -----------------------
+    rows : int
+        Number of rows processed
+    done : int
+        Work done, out of 'total'
+    rate : float
+        Rows per second
+    """
+
+    succeeded = pyqtSignal(int)
+    """Broadcast number of rows transferred.
+
+    Parameters
+    -----------------------
+    rows : int
+        Number of transferred rows
+    """
+
+    failed = pyqtSignal(str)
+    """Broadcast error message.
+
+    Parameters
+    -----------------------
+    message : str
+        Error message
+    """
+
+    cancelled = pyqtSignal()
+    """Broadcast transfer cancellation."""
+
+    finished = pyqtSignal()
+    """Broadcast end of the transfer, whatever the outcome."""
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        """Run the transfer.
+
+        Emits one of 'succeeded', 'failed' or 'cancelled',
+        followed by 'finished'.
+        """
+        self.__start = time.perf_counter()
+
+        try:
+            rows = self.__connectAndTransfer()
+        except TransferCancelled:
+            self.cancelled.emit()
+        except DatabaseError as err:
+            self.failed.emit(f"{err}")
+        else:
+            self.progress.emit(rows, self.total, self.__rate(rows))
+            self.succeeded.emit(rows)
+        finally:
+            disconnect(WORKER_CONNECTION)
+            self.finished.emit()
+
+    @abstractmethod
+    def _transfer(self, conn: QSqlDatabase, federation: Federation) -> int:
+        """Run the transfer through the given connection.
+
+        Parameters
+        -----------------------
+        conn : QSqlDatabase
+            Dedicated connection
+        federation : Federation
+            Yearly databases of the connection, `None` if single
+
+        Returns
+        -----------------------
+        int
+            The number of transferred rows
+        """
+
+    def _report(self, rows: int, done: int):
+        """Emit progress, abort if cancellation was requested.
+
+        Parameters
+        -----------------------
+        rows : int
+            Number of rows processed
+        done : int
+            Work done, out of 'total'
+
+        Raises
+        -----------------------
+        - TransferCancelled if cancellation was requested
+        """
+        if self.__cancelled.is_set():
+            raise TransferCancelled()
+
+        self.progress.emit(rows, done, self.__rate(rows))
+
+    def __connectAndTransfer(self) -> int:
+        """Run the transfer through the dedicated connection.
+
+        Kept separate from run(), so that no reference to the
+        connection survives when it is removed.
+
+        Returns
+        -----------------------
+        int
+            The number of transferred rows
+        """
+        if isinstance(self.__database, list):
+            conn, federation = connectFederation(
+                self.__database, WORKER_CONNECTION, self.__profile
+            )
+        else:
+            conn = connect(
+                self.__database,
+                WORKER_CONNECTION,
+                self.__profile,
+                readOnly=self.__readOnly,
+            )
+            federation = None
+
+        return self._transfer(conn, federation)
+
+    def __rate(self, rows: int) -> float:
+        """Return the number of rows processed per second.
+
+        Parameters
+        -----------------------
+        rows : int
+            Number of rows processed
+
+        Returns
+        -----------------------
+        float
+            Rows per second since the start of the transfer
+        """
+        elapsed = time.perf_counter() - self.__start
+        return rows / elapsed if elapsed > 0.0 else 0.0
+
+
+class ImportWorker(TransferWorker):
+    """Worker importing a data file in a separate thread.
+
+    The format of the file follows its extension, see
+    Transfer.fileFormat(). Work is measured in bytes read from
+    the file. Given a rejects file, CSV files are validated in
+    parallel and invalid rows are skipped, see
+    Transfer.importCSVParallel().
+
+    Private attributes
+    -----------------------
+    __filename: str
+        Path of the data file
+    __rejects: str
+        Path of the CSV file of rejected rows, `None` if
+        aborting on invalid rows
+    __dedup: bool
+        Whether to skip rows already in the database
+
+    Public methods
+    -----------------------
+    __init__(str | list[str], str, str, str, bool)
+        Construct class instance.
+
+    Protected methods
+    -----------------------
+    _transfer(QSqlDatabase, Federation) -> int
+        Import the file through the given connection.
+
+    Signals
+    -----------------------
+    rejected[int, str]
+        Broadcast number of rejected rows and rejects file.
+    skipped[int]
+        Broadcast number of rows already in the database.
+    """
+
+    def __init__(
+        self,
+        database: str | list[str],
+        filename: str,
+        profile: str = DEFAULT_PROFILE,
+        rejects: str = None,
+        dedup: bool = False,
+    ):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        database : str | list[str]
+            Path of the database, or paths of the yearly databases
+        filename : str
+            Path of the data file
+        profile : str
+            Performance profile of the dedicated connection
+        rejects : str
+            Path of the CSV file of rejected rows, ignored if not
+            a CSV import; `None` aborts on invalid rows
+        dedup : bool
+            Whether to skip rows already in the database, see
+            Duplicates.DuplicateFilter
+
+        Raises
+        -----------------------
+        - DatabaseError if file does not exist
+        """
+        super().__init__(
+            database, f"{FORMAT_NAMES[fileFormat(filename)]} import", profile
+        )
+
+        if not os.path.isfile(filename):
+            raise DatabaseError("File does not exist")
+
+        self.total = os.path.getsize(filename)
+        self.__filename = filename
+        self.__rejects = rejects if fileFormat(filename) == "csv" else None
+        self.__dedup = dedup
+
+    rejected = pyqtSignal(int, str)
+    """Broadcast number of rejected rows and rejects file.
+
+    Emitted before 'succeeded', if rows were rejected.
+
+    Parameters
+    -----------------------
+    rows : int
+        Number of rejected rows
+    rejects : str
+        Path of the CSV file of rejected rows
+    """
+
+    skipped = pyqtSignal(int)
+    """Broadcast number of rows already in the database.
+
+    Emitted before 'succeeded', if rows were skipped.
+
+    Parameters
+    -----------------------
+    rows : int
+        Number of skipped rows
+    """
+
+    def _transfer(self, conn: QSqlDatabase, federation: Federation) -> int:
+        """Import the file through the given connection.
+
+        Parameters
+        -----------------------
+        conn : QSqlDatabase
+            Dedicated connection
+        federation : Federation
+            Yearly databases of the connection, `None` if single
+
+        Returns
+        -----------------------
+        int
+            The number of imported rows
+        """
+        dedup = DuplicateFilter(conn) if self.__dedup else None
+
+        if self.__rejects is None:
+            rows = importFile(
+                conn, self.__filename, self._report, federation, dedup
+            )
+        else:
+            rows, rejected = importCSVParallel(
+                conn,
+                self.__filename,
+                self.__rejects,
+                self._report,
+                federation,
+                dedup=dedup,
+            )
+            if rejected:
+                self.rejected.emit(rejected, self.__rejects)
+
+        if dedup is not None and dedup.skipped:
+            self.skipped.emit(dedup.skipped)
+
+        return rows
+
+
+class ExportWorker(TransferWorker):
+    """Worker exporting expenses to a data file in a separate thread.
+
+    The format of the file follows its extension, see
+    Transfer.fileFormat(). Work is measured in rows written to
+    the file.
+
+    Private attributes
+    -----------------------
+    __filename: str
+        Path of the data file
+    __dates: list[str]
+        Exported date range, `None` for all expenses
+
+    Public methods
+    -----------------------
+    __init__(str | list[str], str, list[str], str)
+        Construct class instance.
+
+    Protected methods
+    -----------------------
+    _transfer(QSqlDatabase, Federation) -> int
+        Export the expenses through the given connection.
+    """
+
+    def __init__(
+        self,
+        database: str | list[str],
+        filename: str,
+        dates: list[str],
+        profile: str = DEFAULT_PROFILE,
+    ):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        database : str | list[str]
+            Path of the database, or paths of the yearly databases
+        filename : str
+            Path of the data file
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` exports all expenses
+        profile : str
+            Performance profile of the dedicated connection
+        """
+        super().__init__(
+            database, f"{FORMAT_NAMES[fileFormat(filename)]} export", profile
+        )
+
+        self.__filename = filename
+        self.__dates = dates
+
+    def _transfer(self, conn: QSqlDatabase, federation: Federation) -> int:
+        """Export the expenses through the given connection.
+
+        Parameters
+        -----------------------
+        conn : QSqlDatabase
+            Dedicated connection
+        federation : Federation
+            Yearly databases of the connection, `None` if single
+
+        Returns
+        -----------------------
+        int
+            The number of exported rows
+        """
+        if federation is not None:
+            federation.setDateRange(self.__dates)
+
+        self.total = countRows(conn, self.__dates)
+        return exportFile(conn, self.__filename, self.__dates, self._report)
+
+
+class OpenWorker(TransferWorker):
+    """Worker reading a database being opened in a separate thread.
+
+    The schema is validated and migrated, then the number of
+    expenses and the first page of the list are broadcast,
+    followed by the totals by type and by period, all with the
+    default filter and sorting of the models. The database is
+    then opened again by the GUI thread, whose connection can
+    use the results. Work is measured in steps.
+
+    Private attributes
+    -----------------------
+    __period: str
+        Period of the totals by period
+
+    Public methods
+    -----------------------
+    __init__(str | list[str], str, str)
+        Construct class instance.
+
+    Protected methods
+    -----------------------
+    _transfer(QSqlDatabase, Federation) -> int
+        Read the database through the given connection.
+
+    Signals
+    -----------------------
+    pageLoaded[int, list]
+        Broadcast number of expenses and first page of the list.
+    summaryLoaded[list, list, list]
+        Broadcast totals by type and by period.
+    """
+
+    def __init__(
+        self,
+        database: str | list[str],
+        period: str,
+        profile: str = DEFAULT_PROFILE,
+    ):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        database : str | list[str]
+            Path of the database, or paths of the yearly databases
+        period : str
+            Period of the totals by period, a key of PERIODS
+        profile : str
+            Performance profile of the dedicated connection
+        """
+        super().__init__(database, "Opening database", profile)
+
+        # schema, list, summary
+        self.total = 3
+        self.__period = period
+
+    pageLoaded = pyqtSignal(int, list)
+    """Broadcast number of expenses and first page of the list.
+
+    Parameters
+    -----------------------
+    count : int
+        Number of expenses
+    rows : list[list]
+        Rows of the first page, see ExpenseModel.firstPage()
+    """
+
+    summaryLoaded = pyqtSignal(list, list, list)
+    """Broadcast totals by type and by period.
+
+    Parameters
+    -----------------------
+    typeRows : list[tuple[str, float]]
+        (type, total) pairs, sorted by type
+    types : list[str]
+        Types of the totals by period, in column order
+    periodRows : list[tuple[str, list[float]]]
+        (period, totals by type) pairs, in row order
+    """
+
+    def _transfer(self, conn: QSqlDatabase, federation: Federation) -> int:
+        """Read the database through the given connection.
+
+        Parameters
+        -----------------------
+        conn : QSqlDatabase
+            Dedicated connection
+        federation : Federation
+            Yearly databases of the connection, `None` if single
+
+        Returns
+        -----------------------
+        int
+            The number of expenses
+        """
+        # yearly databases are checked when connecting
+        if federation is None:
+            validateSchema(conn)
+            migrateSchema(conn)
+        self._report(0, 1)
+
+        statements = StatementCache(conn)
+        try:
+            model = ExpenseModel(statements, None, federation)
+            model.select()
+            count = model.rowCount()
+
+            self.pageLoaded.emit(count, model.firstPage())
+            self._report(count, 2)
+
+            typeRows = typeSummary(statements)
+            types, periodRows = periodSummary(statements, self.__period)
+            self.summaryLoaded.emit(typeRows, types, periodRows)
+        finally:
+            statements.clear()
+
+        return count
+
+
+class BackupWorker(TransferWorker):
+    """Worker copying the open database to a backup file.
+
+    The copy goes through the SQLite online backup API, a few
+    pages at a time, see Transfer.copyDatabase(): the database
+    stays usable meanwhile. Work is measured in pages.
+
+    Private attributes
+    -----------------------
+    __filename: str
+        Path of the backup file
+
+    Public methods
+    -----------------------
+    __init__(str, str, str)
+        Construct class instance.
+
+    Protected methods
+    -----------------------
+    _transfer(QSqlDatabase, Federation) -> int
+        Copy the database to the backup file.
+
+    Private methods
+    -----------------------
+    __step(int, int)
+        Report the progress of the copy.
+    """
+
+    def __init__(
+        self, database: str, filename: str, profile: str = DEFAULT_PROFILE
+    ):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        database : str
+            Path of the database
+        filename : str
+            Path of the backup file
+        profile : str
+            Performance profile of the dedicated connection
+        """
+        super().__init__(database, "Backup", profile)
+
+        self.unit = "pages"
+        self.__filename = filename
+
+    def _transfer(self, conn: QSqlDatabase, federation: Federation) -> int:
+        """Copy the database to the backup file.
+
+        Parameters
+        -----------------------
+        conn : QSqlDatabase
+            Dedicated connection, unused
+        federation : Federation
+            Always `None`
+
+        Returns
+        -----------------------
+        int
+            The number of copied pages
+        """
+        return copyDatabase(conn.databaseName(), self.__filename, self.__step)
+
+    def __step(self, done: int, total: int):
+        """Report the progress of the copy.
+
+        Parameters
+        -----------------------
+        done : int
+            Number of copied pages
+        total : int
+            Number of pages of the database
+        """
+        self.total = total
+        self._report(done, done)
+
+
+class RestoreWorker(TransferWorker):
+    """Worker copying a backup file next to the open database.
+
+    The backup is validated, then copied through the SQLite
+    online backup API, a few pages at a time, to a file which
+    replaces the database once the worker succeeds, see
+    ModelWrapper.swapRestored(). The backup is opened read-only,
+    so that it is not modified. Work is measured in pages.
+
+    Private attributes
+    -----------------------
+    __target: str
+        Path of the copy of the backup
+
+    Public methods
+    -----------------------
+    __init__(str, str)
+        Construct class instance.
+
+    Protected methods
+    -----------------------
+    _transfer(QSqlDatabase, Federation) -> int
+        Validate the backup and copy it.
+
+    Private methods
+    -----------------------
+    __step(int, int)
+        Report the progress of the copy.
+    """
+
+    def __init__(self, filename: str, target: str):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        filename : str
+            Path of the backup file
+        target : str
+            Path of the copy of the backup
+
+        Raises
+        -----------------------
+        - DatabaseError if file does not exist
+        """
+        super().__init__(filename, "Restore", DEFAULT_PROFILE, readOnly=True)
+
+        if not os.path.isfile(filename):
+            raise DatabaseError("File does not exist")
+
+        self.unit = "pages"
+        self.__target = target
+
+    def _transfer(self, conn: QSqlDatabase, federation: Federation) -> int:
+        """Validate the backup and copy it.
+
+        Parameters
+        -----------------------
+        conn : QSqlDatabase
+            Dedicated connection to the backup
+        federation : Federation
+            Always `None`
+
+        Returns
+        -----------------------
+        int
+            The number of copied pages
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid backup
+        - DatabaseError if schema version is not supported
+        """
+        validateSchema(conn)
+
+        version = schemaVersion(conn)
+        if version > SCHEMA_VERSION:
+            raise DatabaseError(
+                f"Database schema version {version} is not supported"
+            )
+
+        return copyDatabase(conn.databaseName(), self.__target, self.__step)
+
+    def __step(self, done: int, total: int):
+        """Report the progress of the copy.
+
+        Parameters
+        -----------------------
+        done : int
+            Number of copied pages
+        total : int
+            Number of pages of the backup
+        """
+        self.total = total
+        self._report(done, done)
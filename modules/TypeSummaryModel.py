@@ -0,0 +1,187 @@
+"""Expense summary model.
+
+Classes
+-----------------------
+TypeSummaryModel
+    Table model of the expense totals by type.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from typing import Any
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject
+
+from modules.Database import DatabaseError
+from modules.StatementCache import StatementCache
+from modules.Summary import typeSummary
+
+
+# names of the columns
+COLUMNS = ["type", "sum"]
+
+
+class TypeSummaryModel(QAbstractTableModel):
+    """Table model of the expense totals by type.
+
+    Rows are types, with their total. The totals are read in a
+    single query over the per-(day, type) aggregates, and held
+    in memory, so that no read cursor stays open.
+
+    Private attributes
+    -----------------------
+    __statements: StatementCache
+        Prepared statements of the database connection
+    __dates: list[str]
+        Current date filter, `None` if not filtering
+    __search: str
+        Text searched in the justifications, `None` if not searching
+    __rows: list[tuple[str, float]]
+        (type, total) pairs, in row order
+
+    Public methods
+    -----------------------
+    __init__(StatementCache, QObject)
+        Construct class instance.
+    select()
+        Recompute the totals.
+    setRows(list[tuple[str, float]])
+        Show totals computed elsewhere.
+    setDateFilter(list[str], str)
+        Filter the expenses with the specified dates and text.
+
+    Reimplemented methods
+    -----------------------
+    rowCount(QModelIndex) -> int
+    columnCount(QModelIndex) -> int
+    data(QModelIndex, Qt.ItemDataRole) -> Any
+    headerData(int, Qt.Orientation, Qt.ItemDataRole) -> Any
+    """
+
+    def __init__(self, statements: StatementCache, parent: QObject = None):
+        """Construct class instance.
+
+        Parameters
+        -----------------------
+        statements : StatementCache
+            Prepared statements of the database connection
+        parent : QObject
+            Parent QObject
+        """
+        super().__init__(parent)
+
+        self.__statements = statements
+        self.__dates = None
+        self.__search = None
+        self.__rows = []
+
+    def select(self):
+        """Recompute the totals.
+
+        Raises
+        -----------------------
+        - DatabaseError if query errors
+        """
+        self.beginResetModel()
+
+        try:
+            self.__rows = typeSummary(
+                self.__statements, self.__dates, self.__search
+            )
+        except DatabaseError:
+            self.__rows = []
+            raise
+        finally:
+            self.endResetModel()
+
+    def setRows(self, rows: list[tuple[str, float]]):
+        """Show totals computed elsewhere.
+
+        The totals must match the current filter, e.g. computed
+        by a background worker.
+
+        Parameters
+        -----------------------
+        rows : list[tuple[str, float]]
+            (type, total) pairs, sorted by type
+        """
+        self.beginResetModel()
+        self.__rows = [(etype, total) for etype, total in rows]
+        self.endResetModel()
+
+    def setDateFilter(self, dates: list[str], search: str = None):
+        """Filter the expenses with the specified dates and text.
+
+        Parameters
+        -----------------------
+        dates : list[str]
+            - [startDate, endDate], both included
+            - `None` removes the date filter
+        search : str
+            Text searched in the justifications, `None` for all
+
+        Raises
+        -----------------------
+        - DatabaseError if invalid date range
+        - DatabaseError if query errors
+        """
+        self.__dates = dates
+        self.__search = search
+        self.select()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of types."""
+        return 0 if parent.isValid() else len(self.__rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of columns."""
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(
+        self,
+        index: QModelIndex,
+        role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        """Return the type or the total of the given row."""
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        return self.__rows[index.row()][index.column()]
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        """Return column names and row numbers."""
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+
+        return section + 1
@@ -0,0 +1,362 @@
+"""Parallel parsing and validation of CSV files.
+
+Files are split into byte ranges ending on a line break outside
+quoted fields, which are parsed and validated independently,
+in worker processes for large files. Rows are checked with the
+rules of the CHECK constraints of the 'expenses' table (see
+Schema), so that invalid rows are found before reaching the
+database. The module does not import Qt, so that worker
+processes start quickly.
+
+Functions
+-----------------------
+validateRow()
+    Return the values of a CSV row, or why they are invalid.
+splitRanges()
+    Split a CSV file into byte ranges of whole records.
+parseRange()
+    Parse and validate a byte range of a CSV file.
+parseFile()
+    Parse and validate a CSV file, range by range.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from collections.abc import Iterator
+import concurrent.futures
+import csv
+import datetime
+import io
+import multiprocessing
+import os
+import re
+
+
+# bytes of a range, before extending it to a record boundary
+RANGE_SIZE = 8 << 20
+# bytes read at a time when looking for a record boundary
+SCAN_SIZE = 1 << 16
+# maximum length of a justification, as in the schema
+MAX_JUSTIFICATION = 100
+# number of fields of a row
+ROW_FIELDS = 5
+
+# numeric literals converted to numbers by SQLite
+NUMBER = re.compile(r"\s*[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?\s*")
+
+
+def validateRow(row: list[str]) -> tuple[list, str]:
+    """Return the values of a CSV row, or why they are invalid.
+
+    The checks follow the CHECK constraints of 'expenses': the
+    id is empty (auto-assigned) or an integer, the date is a
+    valid 'yyyy-mm-dd' date, the type is a single character,
+    the amount is a number and the justification is at most
+    MAX_JUSTIFICATION characters long.
+
+    Parameters
+    -----------------------
+    row : list[str]
+        Fields of the row
+
+    Returns
+    -----------------------
+    tuple[list, str]
+        - Values to insert, `None` if invalid
+        - Reason of the rejection, `None` if valid
+    """
+    if len(row) != ROW_FIELDS:
+        return None, f"Expected {ROW_FIELDS} fields, found {len(row)}"
+
+    rowId, date, etype, amount, justification = row
+
+    if rowId == "":
+        rowId = None
+    else:
+        try:
+            rowId = int(rowId)
+        except ValueError:
+            return None, f"Invalid id '{rowId}'"
+
+    # DATE(date) IS date
+    try:
+        valid = datetime.date.fromisoformat(date).isoformat() == date
+    except ValueError:
+        valid = False
+    if not valid:
+        return None, f"Invalid date '{date}'"
+
+    if len(etype) != 1:
+        return None, f"Invalid type '{etype}'"
+
+    if NUMBER.fullmatch(amount) is None:
+        return None, f"Invalid amount '{amount}'"
+
+    if len(justification) > MAX_JUSTIFICATION:
+        return None, (
+            f"Justification longer than {MAX_JUSTIFICATION} characters"
+        )
+
+    return [rowId, date, etype, float(amount), justification], None
+
+
+def splitRanges(
+    filename: str, size: int = RANGE_SIZE
+) -> list[tuple[int, int, int]]:
+    """Split a CSV file into byte ranges of whole records.
+
+    Each range extends past `size` bytes to the first line break
+    outside quoted fields, found by the parity of the quotes
+    (escaped quotes are doubled). The file is read once.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the CSV file
+    size : int
+        Minimum number of bytes of each range
+
+    Returns
+    -----------------------
+    list[tuple[int, int, int]]
+        (start, end, first line) of each range, lines numbered
+        from 1
+
+    Raises
+    -----------------------
+    - OSError if file errors
+    """
+    ranges = []
+
+    with open(filename, "rb") as f:
+        start, line = 0, 1
+
+        while True:
+            block = f.read(size)
+            if not block:
+                break
+
+            quotes = block.count(b'"') % 2
+            lines = block.count(b"\n")
+
+            # extending to the end of the current record
+            while True:
+                tail = f.read(SCAN_SIZE)
+                if not tail:
+                    break
+
+                cut = _recordEnd(tail, quotes)
+                if cut is not None:
+                    lines += tail.count(b"\n", 0, cut)
+                    block += tail[:cut]
+                    f.seek(start + len(block))
+                    break
+
+                quotes = (quotes + tail.count(b'"')) % 2
+                lines += tail.count(b"\n")
+                block += tail
+
+            ranges.append((start, start + len(block), line))
+            start, line = start + len(block), line + lines
+
+    return ranges
+
+
+def _recordEnd(data: bytes, quotes: int) -> int:
+    """Return the end of the first record ending in some data.
+
+    Parameters
+    -----------------------
+    data : bytes
+        Data following the start of the search
+    quotes : int
+        Parity of the quotes before the data
+
+    Returns
+    -----------------------
+    int
+        Offset after the first line break outside quoted
+        fields, `None` if not found
+    """
+    pos = 0
+    while True:
+        nl = data.find(b"\n", pos)
+        if nl < 0:
+            return None
+
+        quotes = (quotes + data.count(b'"', pos, nl)) % 2
+        if quotes == 0:
+            return nl + 1
+
+        pos = nl + 1
+
+
+def parseRange(
+    filename: str, start: int, end: int, firstLine: int
+) -> tuple[list[tuple[int, list]], list[tuple[int, str, list]]]:
+    """Parse and validate a byte range of a CSV file.
+
+    Runs in worker processes, all arguments and results can be
+    pickled. Rows are numbered by the line they end on, as in
+    Transfer.importCSV().
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the CSV file
+    start : int
+        Offset of the first byte of the range
+    end : int
+        Offset after the last byte of the range
+    firstLine : int
+        Line number of the first line of the range
+
+    Returns
+    -----------------------
+    tuple[list[tuple[int, list]], list[tuple[int, str, list]]]
+        - (line number, values) of valid rows
+        - (line number, reason, fields) of invalid rows
+
+    Raises
+    -----------------------
+    - OSError if file errors
+    """
+    with open(filename, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    # invalid bytes are kept, and their rows rejected
+    try:
+        text, checkEncoding = data.decode("utf-8"), False
+    except UnicodeDecodeError:
+        text, checkEncoding = data.decode("utf-8", "surrogateescape"), True
+
+    reader = csv.reader(io.StringIO(text, newline=""), quotechar='"')
+
+    valid, rejected = [], []
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as err:
+            line = firstLine + reader.line_num - 1
+            rejected.append((line, f"CSV error :: {err}", []))
+            continue
+
+        line = firstLine + reader.line_num - 1
+
+        if checkEncoding and not _encodable(row):
+            rejected.append((line, "Invalid UTF-8 text", row))
+            continue
+
+        values, reason = validateRow(row)
+        if reason is None:
+            valid.append((line, values))
+        else:
+            rejected.append((line, reason, row))
+
+    return valid, rejected
+
+
+def _encodable(row: list[str]) -> bool:
+    """Return whether the fields of a row are valid text.
+
+    Parameters
+    -----------------------
+    row : list[str]
+        Fields decoded with 'surrogateescape'
+
+    Returns
+    -----------------------
+    bool
+        Whether no field holds undecodable bytes
+    """
+    try:
+        for field in row:
+            field.encode("utf-8")
+    except UnicodeEncodeError:
+        return False
+
+    return True
+
+
+def parseFile(
+    filename: str, jobs: int = None, size: int = RANGE_SIZE
+) -> Iterator[tuple[int, list, list]]:
+    """Parse and validate a CSV file, range by range.
+
+    Ranges are parsed by a pool of `jobs` processes, at most
+    two per process ahead of the consumer, and yielded in file
+    order; files of a single range are parsed in the calling
+    process. Closing the iterator cancels pending ranges.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the CSV file
+    jobs : int
+        Number of worker processes, `None` for one per CPU
+    size : int
+        Minimum number of bytes of each range
+
+    Returns
+    -----------------------
+    Iterator[tuple[int, list, list]]
+        End offset, valid rows and invalid rows of each range,
+        as returned by parseRange()
+
+    Raises
+    -----------------------
+    - OSError if file errors
+    """
+    ranges = splitRanges(filename, size)
+    jobs = jobs or os.cpu_count() or 1
+
+    if len(ranges) == 1 or jobs == 1:
+        for start, end, line in ranges:
+            yield (end, *parseRange(filename, start, end, line))
+        return
+
+    # spawned workers do not inherit the threads of the caller
+    context = multiprocessing.get_context("spawn")
+    executor = concurrent.futures.ProcessPoolExecutor(jobs, context)
+
+    try:
+        pending = []
+        for start, end, line in ranges:
+            pending.append(
+                (end, executor.submit(parseRange, filename, start, end, line))
+            )
+
+            if len(pending) >= 2 * jobs:
+                end, future = pending.pop(0)
+                yield (end, *future.result())
+
+        for end, future in pending:
+            yield (end, *future.result())
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,699 @@
+"""Headless command-line interface.
+
+Functions
+-----------------------
+main()
+    Run a batch command on a database.
+"""
+
+# Copyright (c) 2022 Adriano Angelone
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the
+# Software.
+#
+# This file is part of sem-qt6.
+#
+# This file may be used under the terms of the GNU General
+# Public License version 3.0 as published by the Free Software
+# Foundation and appearing in the file LICENSE included in the
+# packaging of this file.  Please review the following
+# information to ensure the GNU General Public License version
+# 3.0 requirements will be met:
+# http://www.gnu.org/copyleft/gpl.html.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import argparse
+import json
+import sys
+from datetime import date
+
+
+# exit codes
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+
+# keys of modules.Database.PROFILES, not imported with Qt
+PROFILES = ["compat", "balanced", "bulk"]
+
+
+def main(argv: list[str] = None) -> int:
+    """Run a batch command on a database.
+
+    Prints a JSON document on stdout, or an error object on
+    stderr. Qt modules are only imported after parsing, and no
+    widget module is imported at all.
+
+    Parameters
+    -----------------------
+    argv : list[str]
+        Command-line arguments, `None` for sys.argv
+
+    Returns
+    -----------------------
+    int
+        EXIT_OK, EXIT_ERROR for database and file errors, or
+        EXIT_USAGE for invalid arguments
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+
+    if args.command is _import:
+        _checkImport(parser, args)
+    elif args.command is _summary:
+        _checkSummary(parser, args)
+
+    # deferred, --help and usage errors stay cheap
+    # pylint: disable=import-outside-toplevel
+    from PyQt6.QtCore import QCoreApplication
+
+    from modules.Database import DatabaseError
+
+    # required by QtSql, no event loop is run
+    app = QCoreApplication.instance() or QCoreApplication([])
+
+    try:
+        result = args.command(args)
+    except DatabaseError as err:
+        print(json.dumps({"error": f"{err}"}), file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        del app
+
+    print(json.dumps(result))
+    return EXIT_OK
+
+
+def _parser() -> argparse.ArgumentParser:
+    """Return the parser of the command-line arguments.
+
+    Returns
+    -----------------------
+    argparse.ArgumentParser
+        The parser, with one subcommand per operation
+    """
+    parser = argparse.ArgumentParser(
+        prog="sem", description="Simple expense manager, batch mode."
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILES,
+        help="database performance profile, overrides the configuration "
+        "file",
+    )
+    sub = parser.add_subparsers(required=True, metavar="command")
+
+    cmd = sub.add_parser("import", help="append a data file to a database")
+    cmd.add_argument("db", help="path of the database")
+    cmd.add_argument(
+        "csv", help="path of the data file (CSV, .arrow or .parquet)"
+    )
+    cmd.add_argument(
+        "--create",
+        action="store_true",
+        help="create the database if it does not exist",
+    )
+    cmd.add_argument(
+        "--rejects",
+        metavar="FILE",
+        help="skip invalid rows of a CSV file, writing them to FILE",
+    )
+    cmd.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="number of processes validating the CSV file "
+        "(requires --rejects, default: one per CPU)",
+    )
+    cmd.add_argument(
+        "--skip-duplicates",
+        action="store_true",
+        help="skip rows matching expenses already in the database "
+        "(also enabled by [import] skip_duplicates in the configuration "
+        "file)",
+    )
+    cmd.set_defaults(command=_import)
+
+    cmd = sub.add_parser("export", help="dump a database to a data file")
+    _addDatabasesArgument(cmd)
+    cmd.add_argument(
+        "csv", help="path of the data file (CSV, .arrow or .parquet)"
+    )
+    _addDateArguments(cmd)
+    cmd.set_defaults(command=_export)
+
+    cmd = sub.add_parser(
+        "export-changes",
+        help="write the changes since the last export to a change file",
+    )
+    cmd.add_argument("db", help="path of the database")
+    cmd.add_argument("csv", help="path of the change file")
+    cmd.add_argument(
+        "--name",
+        default="default",
+        help="destination of the changes, with its own watermark "
+        "(default: default)",
+    )
+    cmd.set_defaults(command=_exportChanges)
+
+    cmd = sub.add_parser(
+        "import-changes", help="apply a change file to a database"
+    )
+    cmd.add_argument("db", help="path of the database")
+    cmd.add_argument("csv", help="path of the change file")
+    cmd.add_argument(
+        "--create",
+        action="store_true",
+        help="create the database if it does not exist",
+    )
+    cmd.set_defaults(command=_importChanges)
+
+    cmd = sub.add_parser(
+        "backup", help="copy a database, even while it is in use"
+    )
+    cmd.add_argument("db", help="path of the database")
+    cmd.add_argument("file", help="path of the backup, replaced if it exists")
+    cmd.set_defaults(command=_backup)
+
+    cmd = sub.add_parser("summary", help="total expenses by type")
+    _addDatabasesArgument(cmd)
+    _addDateArguments(cmd)
+    cmd.add_argument(
+        "--by",
+        choices=["week", "month", "year"],
+        help="also group by period, pivoting types into columns",
+    )
+    cmd.add_argument(
+        "--csv",
+        metavar="FILE",
+        help="write the totals by period to a CSV file (requires --by)",
+    )
+    cmd.set_defaults(command=_summary)
+
+    cmd = sub.add_parser("analytics", help="statistics of the expense amounts")
+    _addDatabasesArgument(cmd)
+    _addDateArguments(cmd)
+    cmd.add_argument(
+        "--stat",
+        choices=["percentiles", "rolling", "balance", "outliers"],
+        default="percentiles",
+        help="percentiles by type, rolling monthly averages, running "
+        "balance, or outliers by type (default: percentiles)",
+    )
+    cmd.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse the arrays cached on disk until the databases change "
+        "(also enabled by [analytics] cache in the configuration file)",
+    )
+    cmd.set_defaults(command=_analytics)
+
+    cmd = sub.add_parser("stats", help="describe a database")
+    cmd.add_argument("db", help="path of the database")
+    cmd.set_defaults(command=_stats)
+
+    return parser
+
+
+def _addDatabasesArgument(parser: argparse.ArgumentParser):
+    """Add the database argument, accepting yearly databases.
+
+    Parameters
+    -----------------------
+    parser : argparse.ArgumentParser
+        Subcommand parser
+    """
+    parser.add_argument(
+        "db",
+        nargs="+",
+        help="path of the database, or of one database per year",
+    )
+
+
+def _addDateArguments(parser: argparse.ArgumentParser):
+    """Add the date range options to a subcommand parser.
+
+    Parameters
+    -----------------------
+    parser : argparse.ArgumentParser
+        Subcommand parser
+    """
+    parser.add_argument(
+        "--from",
+        dest="start",
+        type=_date,
+        default=date.min.isoformat(),
+        metavar="DATE",
+        help="start date, included (yyyy-mm-dd)",
+    )
+    parser.add_argument(
+        "--to",
+        dest="end",
+        type=_date,
+        default=date.max.isoformat(),
+        metavar="DATE",
+        help="end date, included (yyyy-mm-dd)",
+    )
+
+
+def _date(value: str) -> str:
+    """Check a date argument.
+
+    Parameters
+    -----------------------
+    value : str
+        The argument
+
+    Returns
+    -----------------------
+    str
+        The date, as yyyy-mm-dd
+
+    Raises
+    -----------------------
+    - argparse.ArgumentTypeError if not an ISO date
+    """
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(
+            f"invalid date '{value}' (yyyy-mm-dd)"
+        ) from err
+
+
+def _open(filename: str, profile: str = None, create: bool = False):
+    """Open a database, validating and migrating its schema.
+
+    Parameters
+    -----------------------
+    filename : str
+        Path of the database
+    profile : str
+        Performance profile, `None` for the configured one
+    create : bool
+        Whether to create the database if it does not exist
+
+    Returns
+    -----------------------
+    QSqlDatabase
+        The open default connection
+
+    Raises
+    -----------------------
+    - DatabaseError if database not found, or invalid
+    - DatabaseError if invalid configuration file or profile
+    """
+    # pylint: disable=import-outside-toplevel
+    import os
+
+    from modules.Config import databaseProfile
+    from modules.Database import DatabaseError, connect
+    from modules.Schema import createSchema, migrateSchema, validateSchema
+
+    if profile is None:
+        profile = databaseProfile()
+
+    if not os.path.isfile(filename):
+        if not create:
+            raise DatabaseError("Database does not exists")
+
+        conn = connect(filename, profile=profile, new=True)
+        createSchema(conn)
+        return conn
+
+    conn = connect(filename, profile=profile)
+    validateSchema(conn)
+    migrateSchema(conn)
+
+    return conn
+
+
+def _openSet(filenames: list[str], profile: str, dates: list[str]):
+    """Open a database, or a set of yearly databases as one.
+
+    Only the yearly databases matching the date range are read.
+
+    Parameters
+    -----------------------
+    filenames : list[str]
+        Path of the database, or of one database per year
+    profile : str
+        Performance profile, `None` for the configured one
+    dates : list[str]
+        [startDate, endDate], both included
+
+    Returns
+    -----------------------
+    QSqlDatabase
+        The open connection
+
+    Raises
+    -----------------------
+    - DatabaseError if database not found, or invalid
+    - DatabaseError if year of a database unknown or repeated
+    - DatabaseError if invalid configuration file or profile
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.Config import databaseProfile
+    from modules.Federation import connectFederation
+
+    if len(filenames) == 1:
+        return _open(filenames[0], profile)
+
+    if profile is None:
+        profile = databaseProfile()
+
+    conn, federation = connectFederation(filenames, profile=profile)
+    federation.setDateRange(dates)
+
+    return conn
+
+
+def _checkImport(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Check the combination of the import arguments.
+
+    Exits with EXIT_USAGE, through the parser, if invalid.
+
+    Parameters
+    -----------------------
+    parser : argparse.ArgumentParser
+        Parser of the arguments
+    args : argparse.Namespace
+        Parsed arguments
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.Transfer import fileFormat
+
+    if args.rejects is None and args.jobs is not None:
+        parser.error("--jobs requires --rejects")
+
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be positive")
+
+    if args.rejects is not None and fileFormat(args.csv) != "csv":
+        parser.error("--rejects requires a CSV file")
+
+
+def _checkSummary(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Check the combination of the summary arguments.
+
+    Exits with EXIT_USAGE, through the parser, if invalid.
+
+    Parameters
+    -----------------------
+    parser : argparse.ArgumentParser
+        Parser of the arguments
+    args : argparse.Namespace
+        Parsed arguments
+    """
+    if args.csv is not None and args.by is None:
+        parser.error("--csv requires --by")
+
+
+def _import(args: argparse.Namespace) -> dict:
+    """Append a data file to a database.
+
+    Parameters
+    -----------------------
+    args : argparse.Namespace
+        Parsed arguments
+
+    Returns
+    -----------------------
+    dict
+        The number of imported rows, of rejected rows if skipping
+        invalid rows, and of duplicates if skipping them
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.Config import skipDuplicates
+    from modules.Duplicates import DuplicateFilter
+    from modules.Transfer import importCSVParallel, importFile
+
+    conn = _open(args.db, args.profile, args.create)
+    dedup = None
+    if args.skip_duplicates or skipDuplicates():
+        dedup = DuplicateFilter(conn)
+
+    if args.rejects is None:
+        result = {"imported": importFile(conn, args.csv, dedup=dedup)}
+    else:
+        rows, rejected = importCSVParallel(
+            conn, args.csv, args.rejects, jobs=args.jobs, dedup=dedup
+        )
+        result = {"imported": rows, "rejected": rejected}
+
+    if dedup is not None:
+        result["duplicates"] = dedup.skipped
+    conn.close()
+
+    return result
+
+
+def _export(args: argparse.Namespace) -> dict:
+    """Dump a database to a data file.
+
+    Parameters
+    -----------------------
+    args : argparse.Namespace
+        Parsed arguments
+
+    Returns
+    -----------------------
+    dict
+        The number of exported rows
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.Transfer import exportFile
+
+    dates = [args.start, args.end]
+    conn = _openSet(args.db, args.profile, dates)
+    rows = exportFile(conn, args.csv, dates)
+    conn.close()
+
+    return {"exported": rows}
+
+
+def _exportChanges(args: argparse.Namespace) -> dict:
+    """Write the changes of a database since the last export.
+
+    Parameters
+    -----------------------
+    args : argparse.Namespace
+        Parsed arguments
+
+    Returns
+    -----------------------
+    dict
+        The number of updated and deleted expenses
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.Transfer import exportChanges
+
+    conn = _open(args.db, args.profile)
+    upserted, deleted = exportChanges(conn, args.csv, args.name)
+    conn.close()
+
+    return {"updated": upserted, "deleted": deleted}
+
+
+def _importChanges(args: argparse.Namespace) -> dict:
+    """Apply a change file to a database.
+
+    Parameters
+    -----------------------
+    args : argparse.Namespace
+        Parsed arguments
+
+    Returns
+    -----------------------
+    dict
+        The number of updated and deleted expenses
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.Transfer import importChanges
+
+    conn = _open(args.db, args.profile, args.create)
+    upserted, deleted = importChanges(conn, args.csv)
+    conn.close()
+
+    return {"updated": upserted, "deleted": deleted}
+
+
+def _backup(args: argparse.Namespace) -> dict:
+    """Copy a database with the SQLite online backup API.
+
+    Parameters
+    -----------------------
+    args : argparse.Namespace
+        Parsed arguments
+
+    Returns
+    -----------------------
+    dict
+        The number of copied pages
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.Transfer import copyDatabase
+
+    return {"pages": copyDatabase(args.db, args.file)}
+
+
+def _summary(args: argparse.Namespace) -> dict:
+    """Total expenses by type, and optionally by period.
+
+    Parameters
+    -----------------------
+    args : argparse.Namespace
+        Parsed arguments
+
+    Returns
+    -----------------------
+    dict
+        - The date range and the total of each type
+        - With --by, the total of each type in each period
+        - With --csv, the number of exported periods
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.StatementCache import StatementCache
+    from modules.Summary import periodSummary, typeSummary
+    from modules.Transfer import exportSummaryCSV
+
+    dates = [args.start, args.end]
+    conn = _openSet(args.db, args.profile, dates)
+
+    if args.csv is not None:
+        periods = exportSummaryCSV(conn, args.csv, args.by, dates)
+        conn.close()
+        return {"exported": periods}
+
+    statements = StatementCache(conn)
+    rows = typeSummary(statements, dates)
+    result = {
+        "from": args.start,
+        "to": args.end,
+        "totals": [{"type": t, "sum": s} for t, s in rows],
+    }
+
+    if args.by is not None:
+        types, rows = periodSummary(statements, args.by, dates)
+        result["by"] = args.by
+        result["periods"] = [
+            {"period": label, "totals": dict(zip(types, totals))}
+            for label, totals in rows
+        ]
+
+    statements.clear()
+    conn.close()
+
+    return result
+
+
+def _analytics(args: argparse.Namespace) -> dict:
+    """Compute a statistic of the expense amounts.
+
+    Parameters
+    -----------------------
+    args : argparse.Namespace
+        Parsed arguments
+
+    Returns
+    -----------------------
+    dict
+        The date range, the statistic and its rows
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.Analytics import loadAnalytics
+    from modules.Config import (
+        analyticsCache,
+        cacheDirectory,
+        databaseProfile,
+    )
+    from modules.Federation import ALL_EXPENSES, connectFederation
+
+    if len(args.db) == 1:
+        conn, table = _open(args.db[0], args.profile), "expenses"
+    else:
+        profile = args.profile or databaseProfile()
+        conn, _ = connectFederation(args.db, profile=profile)
+        table = ALL_EXPENSES
+
+    cache = None
+    if args.cache or analyticsCache():
+        cache = cacheDirectory()
+
+    analytics = loadAnalytics(conn, args.db, cache, table)
+    conn.close()
+
+    columns, rows = analytics.table(args.stat, [args.start, args.end])
+
+    return {
+        "from": args.start,
+        "to": args.end,
+        "statistic": args.stat,
+        "rows": [dict(zip(columns, row)) for row in rows],
+    }
+
+
+def _stats(args: argparse.Namespace) -> dict:
+    """Describe a database.
+
+    Parameters
+    -----------------------
+    args : argparse.Namespace
+        Parsed arguments
+
+    Returns
+    -----------------------
+    dict
+        Number of expenses, date range, schema version, size and
+        effective performance settings
+    """
+    # pylint: disable=import-outside-toplevel
+    from modules.Database import settings
+    from modules.Schema import schemaVersion
+    from modules.StatementCache import StatementCache
+
+    conn = _open(args.db, args.profile)
+    statements = StatementCache(conn)
+
+    query = statements.exec(
+        "SELECT COUNT(*), MIN(date), MAX(date) FROM expenses ;"
+    )
+    query.next()
+    stats = {
+        "expenses": query.value(0),
+        "first": query.value(1) or None,
+        "last": query.value(2) or None,
+    }
+    query.finish()
+
+    query = statements.exec(
+        """
+        SELECT page_count * page_size
+        FROM pragma_page_count(), pragma_page_size() ;
+    """
+    )
+    query.next()
+    stats["bytes"] = query.value(0)
+    query.finish()
+
+    stats["schema_version"] = schemaVersion(conn)
+    stats["settings"] = settings(conn)
+
+    statements.clear()
+    conn.close()
+
+    return stats
+
+
+if __name__ == "__main__":
+    sys.exit(main())
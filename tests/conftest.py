@@ -0,0 +1,85 @@
+"""Shared fixtures of the tests."""
+
+import os
+
+import pytest
+from PyQt6.QtSql import QSqlQuery
+from PyQt6.QtWidgets import QApplication
+
+from modules.Database import connect, disconnect
+from modules.Schema import createSchema
+
+
+# name of the connection of the tests
+TEST_CONNECTION = "test"
+
+# widgets are tested without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def app() -> QApplication:
+    """Application instance, required by QtSql and the widgets."""
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def databases(app):
+    """Factory of connections to new databases, at the latest version.
+
+    Called with the path and the name of the connection; the
+    connections are removed afterwards.
+    """
+    names = []
+
+    def create(filename, name: str = TEST_CONNECTION):
+        connection = connect(str(filename), name, "compat", new=True)
+        createSchema(connection)
+        names.append(name)
+        return connection
+
+    yield create
+
+    for name in names:
+        disconnect(name)
+
+
+@pytest.fixture
+def conn(databases, tmp_path):
+    """Connection to a new database, at the latest version."""
+    return databases(tmp_path / "test.db")
+
+
+def insertExpenses(conn, rows: list[tuple[str, str, float, str]]):
+    """Insert (date, type, amount, justification) rows."""
+    query = QSqlQuery(conn)
+    query.prepare(
+        """
+        INSERT INTO expenses (date, type, amount, justification)
+        VALUES (?, ?, ?, ?) ;
+    """
+    )
+    for column in zip(*rows):
+        query.addBindValue(list(column))
+
+    conn.transaction()
+    assert query.execBatch(), query.lastError().text()
+    conn.commit()
+    query.finish()
+
+
+def fetchAll(conn, sql: str, params: list = None) -> list[tuple]:
+    """Return all the rows of a query."""
+    query = QSqlQuery(conn)
+    query.prepare(sql)
+    for param in params or []:
+        query.addBindValue(param)
+    assert query.exec(), query.lastError().text()
+
+    rows = []
+    while query.next():
+        record = query.record()
+        rows.append(tuple(query.value(i) for i in range(record.count())))
+    query.finish()
+
+    return rows
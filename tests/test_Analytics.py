@@ -0,0 +1,98 @@
+"""Tests of the vectorized expense analytics."""
+
+import pytest
+
+from conftest import insertExpenses
+from modules import Analytics as AnalyticsModule
+from modules.Analytics import STATISTICS, loadAnalytics
+from modules.Database import DatabaseError
+
+pytest.importorskip("numpy")
+
+
+EXPENSES = [
+    ("2024-01-05", "a", 1.0, ""),
+    ("2024-01-05", "b", 10.0, ""),
+    ("2024-01-20", "a", 2.0, ""),
+    ("2024-03-01", "a", 3.0, ""),
+    ("2024-03-02", "a", 4.0, ""),
+    ("2024-03-02", "b", 20.0, ""),
+    ("2024-03-31", "a", 100.0, ""),
+]
+
+
+@pytest.fixture
+def analytics(conn, tmp_path):
+    """Analytics of EXPENSES, read from the database."""
+    insertExpenses(conn, EXPENSES)
+    return loadAnalytics(conn, [str(tmp_path / "test.db")])
+
+
+def test_percentiles(analytics):
+    assert analytics.percentiles() == [
+        ["a", 5, 1.2, 2.0, 3.0, 4.0, 80.8],
+        ["b", 2, 10.5, 12.5, 15.0, 17.5, 19.5],
+    ]
+    assert analytics.percentiles(["2024-03-01", "2024-03-01"]) == [
+        ["a", 1, 3.0, 3.0, 3.0, 3.0, 3.0]
+    ]
+
+
+def test_rolling_averages(analytics):
+    # February counts as zero
+    assert analytics.rollingAverages() == [
+        ["2024-01", 13.0, 13.0],
+        ["2024-02", 0.0, 6.5],
+        ["2024-03", 127.0, 46.67],
+    ]
+    assert analytics.rollingAverages(window=1)[2] == ["2024-03", 127.0, 127.0]
+    assert analytics.rollingAverages(["2025-01-01", "2025-12-31"]) == []
+
+
+def test_running_balance(analytics):
+    assert analytics.runningBalance(["2024-01-01", "2024-03-02"]) == [
+        ["2024-01-05", 11.0, 11.0],
+        ["2024-01-20", 2.0, 13.0],
+        ["2024-03-01", 3.0, 16.0],
+        ["2024-03-02", 24.0, 40.0],
+    ]
+
+
+def test_outliers(analytics):
+    assert analytics.outliers() == [[7, "2024-03-31", "a", 100.0]]
+    assert analytics.outliers(factor=100.0) == []
+
+
+def test_table(analytics):
+    columns, rows = analytics.table("balance")
+    assert columns == STATISTICS["balance"]
+    assert rows[-1] == ["2024-03-31", 100.0, 140.0]
+
+    with pytest.raises(DatabaseError, match="Unknown statistic"):
+        analytics.table("median")
+
+
+def test_cache_follows_database(conn, tmp_path):
+    insertExpenses(conn, EXPENSES)
+    filenames = [str(tmp_path / "test.db")]
+    cache = str(tmp_path / "cache")
+
+    first = loadAnalytics(conn, filenames, cache)
+    assert first.arrays()["ids"].flags.writeable
+
+    # memory-mapped from the cache
+    second = loadAnalytics(conn, filenames, cache)
+    assert not second.arrays()["ids"].flags.writeable
+    assert second.percentiles() == first.percentiles()
+
+    insertExpenses(conn, [("2024-04-01", "c", 5.0, "")])
+    third = loadAnalytics(conn, filenames, cache)
+    assert third.arrays()["ids"].flags.writeable
+    assert third.percentiles()[-1][:2] == ["c", 1]
+
+
+def test_numpy_required(conn, tmp_path, monkeypatch):
+    monkeypatch.setattr(AnalyticsModule, "numpy", None)
+
+    with pytest.raises(DatabaseError, match="numpy"):
+        loadAnalytics(conn, [str(tmp_path / "test.db")])
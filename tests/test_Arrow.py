@@ -0,0 +1,102 @@
+"""Tests of the imports and exports of Arrow IPC and Parquet files."""
+
+import datetime
+
+import pytest
+
+from conftest import fetchAll, insertExpenses
+from modules import Transfer
+from modules.Database import DatabaseError
+from modules.Transfer import exportFile, fileFormat, importFile
+
+pyarrow = pytest.importorskip("pyarrow")
+parquet = pytest.importorskip("pyarrow.parquet")
+
+
+EXPENSES = [
+    ("2024-01-01", "a", 0.1, "first"),
+    ("2024-01-02", "b", 1e15 + 0.125, 'sécond, "quoted"'),
+    ("2024-02-29", "a", -3.0, ""),
+]
+
+
+def contents(conn) -> list[tuple]:
+    """Return all the expenses, sorted by id."""
+    return fetchAll(
+        conn,
+        """
+        SELECT id, date, type, amount, justification
+        FROM expenses ORDER BY id ;
+    """,
+    )
+
+
+def test_formats():
+    assert fileFormat("data.ARROW") == "arrow"
+    assert fileFormat("data.feather") == "arrow"
+    assert fileFormat("data.parquet") == "parquet"
+    assert fileFormat("data.txt") == "csv"
+
+
+@pytest.mark.parametrize("extension", ["arrow", "parquet"])
+def test_round_trip(databases, tmp_path, extension):
+    source = databases(tmp_path / "source.db", "test-source")
+    target = databases(tmp_path / "target.db", "test-target")
+    insertExpenses(source, EXPENSES)
+    filename = str(tmp_path / f"data.{extension}")
+
+    assert exportFile(source, filename) == 3
+    assert importFile(target, filename) == 3
+
+    # amounts are kept bit for bit
+    assert contents(target) == contents(source)
+
+    assert exportFile(source, filename, ["2024-01-02", "2024-12-31"]) == 2
+
+
+def test_import_dates_and_missing_ids(conn, tmp_path):
+    filename = str(tmp_path / "data.parquet")
+    table = pyarrow.table(
+        {
+            "date": [datetime.date(2024, 3, 1), datetime.date(2024, 3, 2)],
+            "type": ["a", "b"],
+            "amount": [1.5, 2.5],
+            "justification": ["x", "y"],
+        }
+    )
+    parquet.write_table(table, filename)
+
+    assert importFile(conn, filename) == 2
+    assert contents(conn) == [
+        (1, "2024-03-01", "a", 1.5, "x"),
+        (2, "2024-03-02", "b", 2.5, "y"),
+    ]
+
+
+def test_import_rolls_back_invalid_files(conn, tmp_path):
+    filename = str(tmp_path / "data.parquet")
+
+    parquet.write_table(pyarrow.table({"date": ["2024-01-01"]}), filename)
+    with pytest.raises(DatabaseError):
+        importFile(conn, filename)
+
+    table = pyarrow.table(
+        {
+            "date": ["2024-01-01", "2024-13-01"],
+            "type": ["a", "b"],
+            "amount": [1.0, 2.0],
+            "justification": ["", ""],
+        }
+    )
+    parquet.write_table(table, filename)
+    with pytest.raises(DatabaseError, match="row 2"):
+        importFile(conn, filename)
+
+    assert contents(conn) == []
+
+
+def test_pyarrow_required(conn, tmp_path, monkeypatch):
+    monkeypatch.setattr(Transfer, "pyarrow", None)
+
+    with pytest.raises(DatabaseError, match="pyarrow"):
+        exportFile(conn, str(tmp_path / "data.arrow"))
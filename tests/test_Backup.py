@@ -0,0 +1,143 @@
+"""Tests of the online backup, and of the restore of backups."""
+
+import hashlib
+import os
+
+import pytest
+
+from conftest import fetchAll, insertExpenses
+from modules.Database import DatabaseError, connect, disconnect
+from modules.ModelWrapper import ModelWrapper
+from modules.Schema import createSchema
+from modules.Transfer import copyDatabase
+from modules.TransferWorker import RestoreWorker
+
+
+EXPENSES = [("2024-01-01", "a", 1.5, "x"), ("2024-01-02", "b", 2.25, "y")]
+
+
+def digest(filename) -> str:
+    """Hash of the contents of a file."""
+    with open(filename, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def runWorker(worker) -> list[str]:
+    """Run a worker in this thread, returning its signals."""
+    emitted = []
+    worker.succeeded.connect(lambda rows: emitted.append(("succeeded", rows)))
+    worker.failed.connect(lambda message: emitted.append(("failed", message)))
+    worker.cancelled.connect(lambda: emitted.append(("cancelled",)))
+    worker.run()
+    return [signal for signal, *_ in emitted]
+
+
+@pytest.fixture
+def backup(app, tmp_path) -> str:
+    """Path of a backup of EXPENSES, copied from a WAL database."""
+    source = tmp_path / "source.db"
+    conn = connect(str(source), "test-source", "balanced", new=True)
+    createSchema(conn)
+    insertExpenses(conn, EXPENSES)
+
+    # the rows are still in the write-ahead log
+    filename = str(tmp_path / "backup.db")
+    assert copyDatabase(str(source), filename, pages=1) > 1
+
+    del conn
+    disconnect("test-source")
+
+    return filename
+
+
+@pytest.fixture
+def wrapper(app, tmp_path):
+    """ModelWrapper with a new, empty database open."""
+    models = ModelWrapper(None, "balanced")
+    models.createDB(str(tmp_path / "test.db"))
+
+    yield models
+
+    models.closeDB()
+
+
+def test_backup_is_a_single_file(backup):
+    conn = connect(backup, "test-backup", "compat")
+    assert fetchAll(conn, "PRAGMA journal_mode ;") == [("delete",)]
+    assert fetchAll(
+        conn, "SELECT date, type, amount, justification FROM expenses ;"
+    ) == [tuple(row) for row in EXPENSES]
+
+    del conn
+    disconnect("test-backup")
+
+
+def test_restore_leaves_backup_untouched(backup, tmp_path):
+    before = digest(backup)
+    target = str(tmp_path / "target.db")
+
+    assert runWorker(RestoreWorker(backup, target)) == ["succeeded"]
+    assert digest(backup) == before
+    assert not [
+        name for name in os.listdir(tmp_path) if name.startswith("backup.db-")
+    ]
+
+
+def test_restore_from_wal_database(app, tmp_path):
+    # a database in WAL mode, used as a backup, keeps its mode
+    source = str(tmp_path / "source.db")
+    conn = connect(source, "test-source", "balanced", new=True)
+    createSchema(conn)
+    insertExpenses(conn, EXPENSES)
+    del conn
+    disconnect("test-source")
+    before = digest(source)
+
+    target = str(tmp_path / "target.db")
+    assert runWorker(RestoreWorker(source, target)) == ["succeeded"]
+    assert digest(source) == before
+
+    conn = connect(target, "test-target", readOnly=True)
+    assert fetchAll(conn, "SELECT COUNT(*) FROM expenses ;") == [(2,)]
+    del conn
+    disconnect("test-target")
+
+
+def test_restore_rejects_invalid_files(tmp_path, app):
+    invalid = tmp_path / "invalid.db"
+    invalid.write_bytes(b"not a database")
+
+    worker = RestoreWorker(str(invalid), str(tmp_path / "t.db"))
+    assert runWorker(worker) == ["failed"]
+    assert not (tmp_path / "t.db").exists()
+
+
+def test_swap_restored(wrapper, backup, tmp_path):
+    worker = wrapper.restoreWorker(backup)
+    assert runWorker(worker) == ["succeeded"]
+
+    wrapper.swapRestored()
+
+    database = str(tmp_path / "test.db")
+    conn = connect(database, "test-restored", readOnly=True)
+    assert fetchAll(conn, "SELECT COUNT(*) FROM expenses ;") == [(2,)]
+    assert not os.path.exists(f"{database}.restore")
+
+    del conn
+    disconnect("test-restored")
+
+
+def test_swap_refused_while_in_use(wrapper, backup, tmp_path):
+    database = str(tmp_path / "test.db")
+    other = connect(database, "test-other", "balanced")
+
+    assert runWorker(wrapper.restoreWorker(backup)) == ["succeeded"]
+    with pytest.raises(DatabaseError, match="in use"):
+        wrapper.swapRestored()
+
+    # the copy is dropped, the database is unchanged
+    assert not os.path.exists(f"{database}.restore")
+    assert fetchAll(other, "SELECT COUNT(*) FROM expenses ;") == [(0,)]
+
+    del other
+    disconnect("test-other")
@@ -0,0 +1,116 @@
+"""Tests of the batched edits of the expense list."""
+
+import pytest
+
+from conftest import fetchAll
+from modules.Database import DatabaseError, connect, disconnect
+from modules.ModelWrapper import ModelWrapper
+
+
+EXPENSES = ",2024-01-01,a,1.5,x\n,2024-01-02,b,2.5,y\n,2024-01-03,c,3.5,z\n"
+
+
+@pytest.fixture
+def wrapper(app, tmp_path):
+    """ModelWrapper of a database of three expenses, in batched mode."""
+    data = tmp_path / "data.csv"
+    data.write_text(EXPENSES, encoding="utf-8")
+
+    models = ModelWrapper(None, "balanced")
+    models.createDB(str(tmp_path / "test.db"))
+    models.initModels()
+    models.importCSV(str(data))
+    models.setBatchEditing(True)
+
+    yield models
+
+    models.closeDB()
+
+
+@pytest.fixture
+def stored(wrapper, tmp_path):
+    """Return the stored (id, amount, justification) of the expenses."""
+    conn = connect(str(tmp_path / "test.db"), "test-reader", readOnly=True)
+
+    def read() -> list[tuple]:
+        return fetchAll(
+            conn, "SELECT id, amount, justification FROM expenses ORDER BY id ;"
+        )
+
+    yield read
+
+    del conn
+    disconnect("test-reader")
+
+
+def edit(wrapper, rowId: int, column: int, value) -> bool:
+    """Edit a field of an expense through the list model."""
+    model = wrapper.listModel
+    row = next(r for r in range(model.rowCount()) if model.rowId(r) == rowId)
+    return model.setData(model.index(row, column), value)
+
+
+def value(wrapper, rowId: int, column: int):
+    """Return a field of an expense, as shown by the list model."""
+    model = wrapper.listModel
+    row = next(r for r in range(model.rowCount()) if model.rowId(r) == rowId)
+    return model.data(model.index(row, column))
+
+
+def test_edits_queued_until_saved(wrapper, stored):
+    counts = []
+    wrapper.listModel.pendingChanged.connect(counts.append)
+    before = stored()
+
+    assert edit(wrapper, 1, 3, 10.0)
+    assert edit(wrapper, 1, 4, "edited")
+    assert edit(wrapper, 2, 3, 20.0)
+
+    # shown, not written
+    assert value(wrapper, 1, 3) == 10.0
+    assert stored() == before
+    assert wrapper.listModel.pendingCount() == 2
+    assert counts == [1, 1, 2]
+
+    wrapper.saveEdits()
+    assert stored() == [(1, 10.0, "edited"), (2, 20.0, "y"), (3, 3.5, "z")]
+    assert wrapper.listModel.pendingCount() == 0
+    assert wrapper.sumModel.rowCount() == 3
+
+
+def test_revert(wrapper, stored):
+    before = stored()
+    assert edit(wrapper, 3, 4, "edited")
+
+    wrapper.revertEdits()
+    assert value(wrapper, 3, 4) == "z"
+    assert stored() == before
+    assert wrapper.listModel.pendingCount() == 0
+
+
+def test_invalid_edits_write_nothing(wrapper, stored):
+    before = stored()
+    assert edit(wrapper, 1, 3, 10.0)
+    assert edit(wrapper, 2, 2, "long type")
+
+    with pytest.raises(DatabaseError, match="expense 2"):
+        wrapper.saveEdits()
+
+    # all edits stay queued, none are written
+    assert stored() == before
+    assert wrapper.listModel.pendingCount() == 2
+
+    wrapper.listModel.discardEdits([2])
+    wrapper.saveEdits()
+    assert stored()[0] == (1, 10.0, "x")
+
+
+def test_leaving_batched_mode_saves(wrapper, stored):
+    assert edit(wrapper, 2, 4, "edited")
+
+    wrapper.setBatchEditing(False)
+    assert stored()[1] == (2, 2.5, "edited")
+
+    # edits are written at once
+    assert edit(wrapper, 3, 4, "direct")
+    assert stored()[2] == (3, 3.5, "direct")
@@ -0,0 +1,85 @@
+"""Tests of the column widths of the table views."""
+
+import pytest
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from modules.CQTableView import CQTableView
+
+
+class TextModel(QAbstractTableModel):
+    """Table of texts, replaced by resets."""
+
+    def __init__(self, rows: list[list[str]]):
+        super().__init__()
+        self.rows = rows
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else 3
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.rows[index.row()][index.column()]
+        return None
+
+    def reset(self, rows: list[list[str]]):
+        """Replace the rows, as sorting and filtering do."""
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+
+@pytest.fixture
+def view(app):
+    """View of a model of short texts, with room for all columns."""
+    widget = CQTableView(None)
+    widget.resize(800, 400)
+    widget.setModel(TextModel([["a", "b", "c"]] * 20))
+    widget.show()
+
+    yield widget
+
+    widget.close()
+    widget.deleteLater()
+
+
+def test_resets_keep_fitted_widths(view):
+    header = view.horizontalHeader()
+    widths = [header.sectionSize(col) for col in range(2)]
+
+    # visible longer texts widen the columns, shorter keep them
+    view.model().reset([["a" * 40, "b", "c"]] * 20)
+    assert header.sectionSize(0) > widths[0]
+    assert header.sectionSize(1) == widths[1]
+
+    wide = header.sectionSize(0)
+    view.model().reset([["a", "b", "c"]] * 20)
+    assert header.sectionSize(0) == wide
+
+
+def test_resets_keep_user_widths(view):
+    header = view.horizontalHeader()
+
+    # narrower than the contents, and wider than the cache
+    header.resizeSection(0, 40)
+    header.resizeSection(1, 300)
+
+    view.model().reset([["a" * 40, "b", "c"]] * 20)
+    assert [header.sectionSize(col) for col in range(2)] == [40, 300]
+
+    # also once rows are inserted, refitting the others
+    model = view.model()
+    model.beginInsertRows(QModelIndex(), 20, 20)
+    model.rows = model.rows + [["a", "b" * 60, "c"]]
+    model.endInsertRows()
+    assert [header.sectionSize(col) for col in range(2)] == [40, 300]
+
+
+def test_new_models_are_fitted(view):
+    header = view.horizontalHeader()
+    header.resizeSection(0, 40)
+
+    view.setModel(TextModel([["a" * 40, "b", "c"]]))
+    assert header.sectionSize(0) > 40
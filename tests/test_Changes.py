@@ -0,0 +1,104 @@
+"""Tests of the change log, and of the change files."""
+
+import csv
+
+import pytest
+
+from conftest import fetchAll, insertExpenses
+from modules.Database import DatabaseError
+from modules.Transfer import exportChanges, importChanges
+
+
+def contents(conn) -> list[tuple]:
+    """Return all the expenses, sorted by id."""
+    return fetchAll(
+        conn,
+        """
+        SELECT id, date, type, amount, justification
+        FROM expenses ORDER BY id ;
+    """,
+    )
+
+
+def test_changes_round_trip(databases, tmp_path):
+    source = databases(tmp_path / "source.db", "test-source")
+    target = databases(tmp_path / "target.db", "test-target")
+    changes = str(tmp_path / "changes.csv")
+
+    insertExpenses(
+        source,
+        [
+            (f"2024-01-{day:02d}", "a", day * 1.25, f"e{day}")
+            for day in range(1, 21)
+        ],
+    )
+
+    # the first export is a snapshot
+    assert exportChanges(source, changes) == (20, 0)
+    assert importChanges(target, changes) == (20, 0)
+    assert contents(target) == contents(source)
+
+    insertExpenses(source, [("2024-02-01", "b", 9.99, "new")])
+    fetchAll(source, "UPDATE expenses SET amount = 0.5 WHERE id = 3 ;")
+    fetchAll(source, "UPDATE expenses SET id = 100 WHERE id = 4 ;")
+    fetchAll(source, "DELETE FROM expenses WHERE id IN (5, 6) ;")
+
+    # 21 and 3 updated, 100 moved from 4, 5 and 6 deleted
+    assert exportChanges(source, changes) == (3, 3)
+    with open(changes, newline="", encoding="utf-8") as csvfile:
+        rows = list(csv.reader(csvfile))
+    assert sorted(row[1] for row in rows[1:]) == sorted(
+        ["3", "4", "5", "6", "21", "100"]
+    )
+
+    assert importChanges(target, changes) == (3, 3)
+    assert contents(target) == contents(source)
+
+    # applying a change file again has no effect
+    before = fetchAll(target, "SELECT COUNT(*) FROM expense_changes ;")
+    importChanges(target, changes)
+    assert contents(target) == contents(source)
+    assert fetchAll(target, "SELECT COUNT(*) FROM expense_changes ;") == before
+
+    # changes exported to every destination are dropped
+    assert fetchAll(source, "SELECT COUNT(*) FROM expense_changes ;") == [(0,)]
+    assert exportChanges(source, changes) == (0, 0)
+
+
+def test_importChanges_rejects_invalid_files(conn, tmp_path):
+    changes = tmp_path / "changes.csv"
+    changes.write_text("op,id\nU,1\n", encoding="utf-8")
+
+    with pytest.raises(DatabaseError, match="header"):
+        importChanges(conn, str(changes))
+
+    changes.write_text(
+        "op,id,date,type,amount,justification\n"
+        "U,1,2024-01-01,a,1.0,ok\n"
+        "X,2,,,,\n",
+        encoding="utf-8",
+    )
+    with pytest.raises(DatabaseError, match="row 3"):
+        importChanges(conn, str(changes))
+
+    assert contents(conn) == []
+
+
+def test_changes_kept_until_exported_everywhere(databases, tmp_path):
+    source = databases(tmp_path / "source.db", "test-source")
+    changes = str(tmp_path / "changes.csv")
+
+    insertExpenses(source, [("2024-01-01", "a", 1.0, "first")])
+    assert exportChanges(source, changes, "laptop") == (1, 0)
+    assert exportChanges(source, changes, "phone") == (1, 0)
+
+    fetchAll(source, "UPDATE expenses SET amount = 2.0 WHERE id = 1 ;")
+    insertExpenses(source, [("2024-01-02", "b", 3.0, "second")])
+
+    # the phone has not seen the changes yet
+    assert exportChanges(source, changes, "laptop") == (2, 0)
+    assert fetchAll(source, "SELECT COUNT(*) FROM expense_changes ;") != [(0,)]
+    assert exportChanges(source, changes, "laptop") == (0, 0)
+
+    assert exportChanges(source, changes, "phone") == (2, 0)
+    assert fetchAll(source, "SELECT COUNT(*) FROM expense_changes ;") == [(0,)]
@@ -0,0 +1,61 @@
+"""Tests of the performance profiles of the connections."""
+
+import pytest
+
+from modules import cli
+from modules.Database import (
+    NEW_DATABASE_SETTINGS,
+    PROFILES,
+    connect,
+    disconnect,
+    settings,
+)
+
+
+def expected(profile: str) -> dict:
+    """Settings of a profile, as reported by settings()."""
+    values = dict(PROFILES[profile])
+    values["journal_mode"] = values["journal_mode"].lower()
+    return values
+
+
+@pytest.fixture
+def connections(app):
+    """Factory of named connections, removed afterwards."""
+    names = []
+
+    def create(filename, name: str, profile: str, new: bool = False):
+        names.append(name)
+        return connect(str(filename), name, profile, new=new)
+
+    yield create
+
+    for name in names:
+        disconnect(name)
+
+
+@pytest.mark.parametrize("profile", list(PROFILES))
+def test_new_database_settings(connections, tmp_path, profile):
+    conn = connections(tmp_path / "test.db", "test", profile, new=True)
+
+    assert settings(conn).items() >= expected(profile).items()
+
+
+def test_existing_database_keeps_page_size(connections, tmp_path):
+    filename = tmp_path / "test.db"
+    conn = connections(filename, "test-bulk", "bulk", new=True)
+    # the page size is fixed by the first table
+    assert conn.exec("CREATE TABLE t (x) ;").isActive()
+    conn.close()
+
+    conn = connections(filename, "test-balanced", "balanced")
+    values = expected("balanced")
+    for key in NEW_DATABASE_SETTINGS:
+        values[key] = PROFILES["bulk"][key]
+
+    assert settings(conn).items() >= values.items()
+
+
+def test_cli_profiles():
+    # the CLI lists them without importing Qt
+    assert cli.PROFILES == list(PROFILES)
@@ -0,0 +1,103 @@
+"""Tests of the duplicate filter of the imports."""
+
+import json
+
+import pytest
+
+from conftest import fetchAll, insertExpenses
+from modules import Config
+from modules import ModelWrapper as ModelWrapperModule
+from modules.cli import EXIT_OK, main
+from modules.Duplicates import DuplicateFilter, contentHash
+from modules.ModelWrapper import ModelWrapper
+
+
+def test_contentHash_normalizes_amounts():
+    assert contentHash("2024-01-01", "a", 1, "x") == contentHash(
+        "2024-01-01", "a", 1.0, "x"
+    )
+    assert contentHash("2024-01-01", "a", 1.0, "x") != contentHash(
+        "2024-01-01", "a", 1.0, "y"
+    )
+
+
+def test_filter_matches_one_to_one(conn):
+    insertExpenses(
+        conn,
+        [
+            ("2024-01-01", "a", 1.5, "twice"),
+            ("2024-01-01", "a", 1.5, "twice"),
+            ("2024-01-02", "b", 2.0, "once"),
+        ],
+    )
+    dedup = DuplicateFilter(conn)
+
+    twice = ["", "2024-01-01", "a", "1.5", "twice"]
+    once = ["", "2024-01-02", "b", "2", "once"]
+    new = ["", "2024-01-03", "c", "3", "new"]
+    chunk = [(1, twice), (2, once), (3, twice), (4, new), (5, twice)]
+
+    # one row per matching expense, the third copy is new
+    assert dedup.filter("expenses", chunk) == [(4, new), (5, twice)]
+    assert dedup.skipped == 3
+
+    # matches are consumed across chunks
+    assert dedup.filter("expenses", [(6, twice), (7, once)]) == [
+        (6, twice),
+        (7, once),
+    ]
+    assert dedup.skipped == 3
+
+    dedup.finish()
+    assert fetchAll(
+        conn, "SELECT COUNT(*) FROM expense_hashes WHERE hash IS NULL ;"
+    ) == [(0,)]
+
+
+def test_filter_keeps_unhashable_rows(conn):
+    dedup = DuplicateFilter(conn)
+
+    # left to fail on insertion
+    chunk = [(1, ["", "2024-01-01", "a", "x", "bad amount"]), (2, ["short"])]
+    assert dedup.filter("expenses", chunk) == chunk
+    assert dedup.skipped == 0
+
+
+@pytest.mark.parametrize("skip", [True, False])
+def test_wrapper_import_follows_configuration(app, tmp_path, monkeypatch, skip):
+    monkeypatch.setattr(ModelWrapperModule, "skipDuplicates", lambda: skip)
+    data = tmp_path / "data.csv"
+    data.write_text(",2024-01-01,a,1.5,x\n,2024-01-02,b,2,y\n")
+
+    models = ModelWrapper(None, "compat")
+    models.createDB(str(tmp_path / "test.db"))
+    models.initModels()
+
+    assert models.importCSV(str(data)) == 0
+    assert models.importCSV(str(data)) == (2 if skip else 0)
+    assert models.listModel.rowCount() == (2 if skip else 4)
+
+    models.closeDB()
+
+
+@pytest.mark.parametrize("rejects", [False, True])
+def test_cli_import_skips_duplicates(
+    app, tmp_path, monkeypatch, capsys, rejects
+):
+    monkeypatch.setattr(Config, "skipDuplicates", lambda: False)
+    data = tmp_path / "data.csv"
+    data.write_text(",2024-01-01,a,1.5,x\n,2024-01-02,b,2,y\n")
+    database = str(tmp_path / "test.db")
+
+    argv = ["import", database, str(data), "--create"]
+    assert main(argv) == EXIT_OK
+
+    argv = ["import", database, str(data), "--skip-duplicates"]
+    if rejects:
+        argv += ["--rejects", str(tmp_path / "rejects.csv")]
+    capsys.readouterr()
+    assert main(argv) == EXIT_OK
+
+    result = json.loads(capsys.readouterr().out)
+    assert result["imported"] == 0
+    assert result["duplicates"] == 2
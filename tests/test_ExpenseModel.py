@@ -0,0 +1,124 @@
+"""Tests of the paging of the expense model."""
+
+import random
+
+import pytest
+from PyQt6.QtCore import Qt
+
+from conftest import fetchAll, insertExpenses
+from modules import ExpenseModel as ExpenseModelModule
+from modules.ExpenseModel import COLUMNS, ExpenseModel
+from modules.StatementCache import StatementCache
+
+
+# number of expenses of the tests
+COUNT = 53
+
+
+class CountingCache(StatementCache):
+    """Statement cache counting the pages read."""
+
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.pages = 0
+
+    def exec(self, sql: str, params: list = None, forwardOnly: bool = True):
+        if "LIMIT" in sql:
+            self.pages += 1
+        return super().exec(sql, params, forwardOnly)
+
+
+@pytest.fixture
+def statements(conn) -> CountingCache:
+    """Statements of the model."""
+    return CountingCache(conn)
+
+
+@pytest.fixture
+def model(conn, statements, monkeypatch):
+    """Model of COUNT expenses, 5 rows per page, 3 pages held."""
+    monkeypatch.setattr(ExpenseModelModule, "PAGE_SIZE", 5)
+    monkeypatch.setattr(ExpenseModelModule, "MAX_PAGES", 3)
+
+    rng = random.Random(7)
+    insertExpenses(
+        conn,
+        [
+            (
+                f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                rng.choice("abc"),
+                rng.randint(1, 20) / 4,
+                f"e{i}",
+            )
+            for i in range(COUNT)
+        ],
+    )
+
+    expenses = ExpenseModel(statements)
+    expenses.select()
+    return expenses
+
+
+def expected(conn, column: int, order: Qt.SortOrder) -> list[list]:
+    """Return all the expenses in the order of the model."""
+    direction = "DESC" if order == Qt.SortOrder.DescendingOrder else "ASC"
+    key = COLUMNS[column]
+    return [
+        list(row)
+        for row in fetchAll(
+            conn,
+            f"""
+            SELECT id, date, type, amount, justification FROM expenses
+            ORDER BY {key} {direction}, id {direction} ;
+        """,
+        )
+    ]
+
+
+def row(model, r: int) -> list:
+    """Return the values of a row of the model."""
+    return [model.data(model.index(r, c)) for c in range(len(COLUMNS))]
+
+
+@pytest.mark.parametrize("column", [1, 3, 4])
+@pytest.mark.parametrize(
+    "order", [Qt.SortOrder.AscendingOrder, Qt.SortOrder.DescendingOrder]
+)
+def test_pages_follow_sorting(conn, model, column, order):
+    model.sort(column, order)
+    rows = expected(conn, column, order)
+    assert model.rowCount() == COUNT
+
+    # random access, seeking from anchors or from the end
+    visits = list(range(COUNT))
+    random.Random(column).shuffle(visits)
+    for r in [0, COUNT - 1, 27] + visits:
+        assert row(model, r) == rows[r]
+
+
+def test_least_recently_used_pages_evicted(model, statements):
+    for r in (0, 5, 10):
+        row(model, r)
+    assert statements.pages == 3
+
+    # page 0 is used again, page 1 is evicted by page 3
+    row(model, 1)
+    row(model, 15)
+    assert statements.pages == 4
+
+    row(model, 2)
+    assert statements.pages == 4
+    row(model, 6)
+    assert statements.pages == 5
+
+
+def test_filter_and_count(conn, model):
+    model.setDateFilter(["2024-03-01", "2024-06-30"])
+    rows = [
+        r
+        for r in expected(conn, 1, Qt.SortOrder.DescendingOrder)
+        if "2024-03-01" <= r[1] <= "2024-06-30"
+    ]
+
+    assert model.rowCount() == len(rows)
+    assert [row(model, r) for r in range(len(rows))] == rows
@@ -0,0 +1,116 @@
+"""Tests of the per-year database federation."""
+
+import datetime
+
+import pytest
+
+from conftest import fetchAll, insertExpenses
+from modules.Database import DatabaseError, disconnect
+from modules.Federation import ID_STRIDE, connectFederation
+from modules.ModelWrapper import ModelWrapper
+from modules.Transfer import importCSV
+
+
+# name of the federation connection of the tests
+TEST_FEDERATION = "test-federation"
+
+
+@pytest.fixture
+def federation(databases, tmp_path):
+    """Connection and federation of the databases of 2023 and 2024."""
+    for year in (2023, 2024):
+        conn = databases(tmp_path / f"expenses-{year}.db", f"test-{year}")
+        insertExpenses(
+            conn, [(f"{year}-05-0{day}", "a", 1.0, "") for day in (1, 2)]
+        )
+        conn.close()
+        del conn
+
+    filenames = [str(tmp_path / f"expenses-{y}.db") for y in (2023, 2024)]
+    conn, federation = connectFederation(filenames, TEST_FEDERATION, "compat")
+
+    yield conn, federation
+
+    conn.close()
+    del conn
+    disconnect(TEST_FEDERATION)
+
+
+def test_ids_encode_years(federation):
+    conn, fed = federation
+
+    rows = fetchAll(conn, "SELECT id, date FROM expenses ORDER BY id ;")
+    assert [rowId for rowId, _ in rows] == [
+        2023 * ID_STRIDE + 1,
+        2023 * ID_STRIDE + 2,
+        2024 * ID_STRIDE + 1,
+        2024 * ID_STRIDE + 2,
+    ]
+
+    for rowId, date in rows:
+        table, local = fed.locate(rowId)
+        assert table == f"y{date[:4]}.expenses"
+        assert local == rowId % ID_STRIDE
+
+    assert fed.localId(str(2024 * ID_STRIDE + 7)) == "7"
+    assert fed.localId("") == ""
+
+
+def test_routing(federation):
+    _, fed = federation
+
+    assert fed.tableFor("2023-12-31") == "y2023.expenses"
+
+    with pytest.raises(DatabaseError):
+        fed.tableFor("2025-01-01")
+    with pytest.raises(DatabaseError):
+        fed.locate(2022 * ID_STRIDE + 1)
+
+
+def test_import_routes_rows_to_years(federation, tmp_path):
+    conn, fed = federation
+    data = tmp_path / "data.csv"
+    data.write_text(
+        ",2023-06-01,b,2.0,x\n,2024-06-01,b,3.0,y\n,2024-06-02,b,4.0,z\n",
+        encoding="utf-8",
+    )
+
+    assert importCSV(conn, str(data), federation=fed) == 3
+    assert fetchAll(conn, "SELECT COUNT(*) FROM y2023.expenses ;") == [(3,)]
+    assert fetchAll(conn, "SELECT COUNT(*) FROM y2024.expenses ;") == [(4,)]
+    assert fetchAll(
+        conn, "SELECT id FROM expenses WHERE type = 'b' ORDER BY id ;"
+    ) == [
+        (2023 * ID_STRIDE + 3,),
+        (2024 * ID_STRIDE + 3,),
+        (2024 * ID_STRIDE + 4,),
+    ]
+
+    # a row without a database rolls back all the files
+    data.write_text(",2023-06-03,c,1.0,x\n,2025-01-01,c,1.0,y\n")
+    with pytest.raises(DatabaseError):
+        importCSV(conn, str(data), federation=fed)
+    assert fetchAll(conn, "SELECT COUNT(*) FROM expenses ;") == [(7,)]
+
+
+def test_add_reports_missing_year(databases, tmp_path):
+    year = datetime.date.today().year
+    for y in (year - 1, year):
+        databases(tmp_path / f"expenses-{y}.db", f"test-{y}").close()
+
+    models = ModelWrapper(None, "compat")
+
+    # the message of the routing reaches the user
+    models.openFederation([str(tmp_path / f"expenses-{year - 1}.db")])
+    models.initModels()
+    with pytest.raises(DatabaseError, match="No database for the year"):
+        models.addDefaultRecord()
+
+    models.openFederation(
+        [str(tmp_path / f"expenses-{y}.db") for y in (year - 1, year)]
+    )
+    models.initModels()
+    models.addDefaultRecord()
+    assert models.listModel.rowCount() == 1
+
+    models.closeDB()
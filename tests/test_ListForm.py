@@ -0,0 +1,99 @@
+"""Tests of the live filtering of the list form."""
+
+import pytest
+from PyQt6.QtCore import QDate
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QCalendarWidget, QPushButton
+
+from modules import ListForm as ListFormModule
+from modules.ListForm import ListForm
+from modules.ModelWrapper import ModelWrapper
+
+
+# shortened delay of the tests, in ms
+DELAY = 20
+
+
+@pytest.fixture
+def form(app, monkeypatch):
+    """ListForm without models, recording its date requests."""
+    monkeypatch.setattr(ListFormModule, "FILTER_DELAY", DELAY)
+
+    widget = ListForm(None)
+    widget.requests = []
+    widget.filterRequested.connect(widget.requests.append)
+    widget.clearingRequested.connect(lambda: widget.requests.append(None))
+
+    yield widget
+
+    widget.deleteLater()
+
+
+@pytest.fixture
+def models(app, tmp_path):
+    """Models of a new, empty database."""
+    wrapper = ModelWrapper(None, "compat")
+    wrapper.createDB(str(tmp_path / "test.db"))
+    wrapper.initModels()
+
+    yield wrapper
+
+    wrapper.closeDB()
+
+
+def showModels(form: ListForm, models: ModelWrapper):
+    """Set the models of the wrapper on the form."""
+    form.setModels(
+        models.listModel, models.sumModel, models.periodModel, models.statsModel
+    )
+
+
+def select(form: ListForm, start: QDate, end: QDate):
+    """Select dates in the calendars of the form."""
+    calStart, calEnd = form.findChildren(QCalendarWidget)
+    calStart.setSelectedDate(start)
+    calEnd.setSelectedDate(end)
+
+
+def button(form: ListForm, text: str) -> QPushButton:
+    """Return the button of the form with a text."""
+    return next(b for b in form.findChildren(QPushButton) if b.text() == text)
+
+
+def test_calendar_changes_are_coalesced(form, models):
+    showModels(form, models)
+
+    for day in range(1, 6):
+        select(form, QDate(2024, 1, day), QDate(2024, 2, day))
+    QTest.qWait(5 * DELAY)
+
+    assert form.requests == [["2024-01-05", "2024-02-05"]]
+
+
+def test_unchanged_dates_are_not_requested(form, models):
+    showModels(form, models)
+
+    select(form, QDate(2024, 1, 1), QDate(2024, 2, 1))
+    QTest.qWait(5 * DELAY)
+    select(form, QDate(2024, 1, 2), QDate(2024, 2, 1))
+    select(form, QDate(2024, 1, 1), QDate(2024, 2, 1))
+    QTest.qWait(5 * DELAY)
+
+    assert form.requests == [["2024-01-01", "2024-02-01"]]
+
+    # explicit requests are always sent, and drop pending ones
+    select(form, QDate(2024, 3, 1), QDate(2024, 4, 1))
+    button(form, "Update").click()
+    button(form, "Clear").click()
+    QTest.qWait(5 * DELAY)
+
+    assert form.requests[1:] == [["2024-03-01", "2024-04-01"], None]
+
+
+def test_no_requests_without_models(form):
+    select(form, QDate(2024, 1, 1), QDate(2024, 2, 1))
+    button(form, "Update").click()
+    button(form, "Clear").click()
+    QTest.qWait(5 * DELAY)
+
+    assert form.requests == []
@@ -0,0 +1,99 @@
+"""Tests of the opening of databases in the background."""
+
+import pytest
+
+from conftest import fetchAll, insertExpenses
+from modules.Database import DatabaseError, connect, disconnect
+from modules.ModelWrapper import ModelWrapper
+from modules.Schema import BASE_STATEMENTS, SCHEMA_VERSION, schemaVersion
+
+
+EXPENSES = [
+    ("2024-01-01", "a", 1.5, "x"),
+    ("2024-01-02", "b", 2.5, "y"),
+    ("2024-02-01", "a", 3.0, "z"),
+]
+
+
+def table(model) -> list[list]:
+    """Return the contents of a table model."""
+    return [
+        [model.data(model.index(r, c)) for c in range(model.columnCount())]
+        for r in range(model.rowCount())
+    ]
+
+
+def openInWorker(models, database) -> list[str]:
+    """Open a database as MainWindow does, running the worker here."""
+    emitted = []
+    worker = models.openWorker(database)
+    worker.pageLoaded.connect(models.openLoaded)
+    worker.summaryLoaded.connect(models.fillSummary)
+    worker.succeeded.connect(lambda _: emitted.append("succeeded"))
+    worker.failed.connect(lambda _: emitted.append("failed"))
+
+    worker.run()
+    models.finishOpening()
+
+    return emitted
+
+
+@pytest.fixture
+def database(app, tmp_path) -> str:
+    """Path of a database of EXPENSES, of the original schema."""
+    filename = str(tmp_path / "test.db")
+    conn = connect(filename, "test-setup", "compat", new=True)
+    for statement in BASE_STATEMENTS:
+        fetchAll(conn, statement)
+    insertExpenses(conn, EXPENSES)
+
+    del conn
+    disconnect("test-setup")
+
+    return filename
+
+
+@pytest.fixture
+def models(app):
+    """ModelWrapper without database."""
+    wrapper = ModelWrapper(None, "compat")
+
+    yield wrapper
+
+    wrapper.closeDB()
+
+
+def test_worker_results_shown(models, database):
+    assert openInWorker(models, database) == ["succeeded"]
+
+    # migrated by the worker
+    conn = connect(database, "test-check", readOnly=True)
+    assert schemaVersion(conn) == SCHEMA_VERSION
+    del conn
+    disconnect("test-check")
+
+    # newest first
+    assert [row[1:] for row in table(models.listModel)] == [
+        list(row) for row in reversed(EXPENSES)
+    ]
+    assert table(models.sumModel) == [["a", 4.5], ["b", 2.5]]
+
+    # the models work on the connection of the GUI thread
+    models.applyDateFilter(["2024-01-01", "2024-01-31"])
+    assert models.listModel.rowCount() == 2
+    assert table(models.sumModel) == [["a", 1.5], ["b", 2.5]]
+
+
+def test_failed_opening_keeps_current_database(models, database, tmp_path):
+    assert openInWorker(models, database) == ["succeeded"]
+
+    invalid = tmp_path / "invalid.db"
+    invalid.write_bytes(b"not a database")
+    assert openInWorker(models, str(invalid)) == ["failed"]
+
+    assert models.listModel.rowCount() == 3
+
+    with pytest.raises(DatabaseError, match="does not exist"):
+        models.openWorker(str(tmp_path / "missing.db"))
+    with pytest.raises(DatabaseError, match="No database being opened"):
+        models.openLoaded(0, [])
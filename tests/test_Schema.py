@@ -0,0 +1,88 @@
+"""Tests of the versioning and of the migrations of the schema."""
+
+import pytest
+
+from conftest import fetchAll, insertExpenses
+from modules import Schema
+from modules.Database import DatabaseError, connect, disconnect
+from modules.Schema import (
+    BASE_STATEMENTS,
+    SCHEMA_VERSION,
+    migrateSchema,
+    schemaVersion,
+)
+from modules.StatementCache import StatementCache
+from modules.Summary import typeSummary
+
+
+EXPENSES = [
+    ("2024-01-01", "a", 1.5, "first"),
+    ("2024-01-02", "b", 2.25, "second"),
+    ("2024-02-01", "a", 0.1, "third"),
+]
+
+
+@pytest.fixture
+def original(app, tmp_path):
+    """Connection to a database of the original, unversioned schema."""
+    conn = connect(str(tmp_path / "old.db"), "test-old", "compat", new=True)
+    for statement in BASE_STATEMENTS:
+        fetchAll(conn, statement)
+    insertExpenses(conn, EXPENSES)
+
+    yield conn
+
+    conn.close()
+    del conn
+    disconnect("test-old")
+
+
+def objects(conn) -> list[tuple]:
+    """Return the type and name of the objects of the schema."""
+    return fetchAll(
+        conn,
+        """
+        SELECT type, name FROM sqlite_master
+        WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name ;
+    """,
+    )
+
+
+def test_migration_matches_new_schema(original, conn):
+    assert schemaVersion(original) == 0
+    migrateSchema(original)
+
+    assert schemaVersion(original) == SCHEMA_VERSION == schemaVersion(conn)
+    assert objects(original) == objects(conn)
+
+    # existing expenses are kept, and reach the derived tables
+    assert fetchAll(
+        original, "SELECT date, type, amount, justification FROM expenses ;"
+    ) == [tuple(row) for row in EXPENSES]
+    statements = StatementCache(original)
+    assert typeSummary(statements) == [("a", 1.6), ("b", 2.25)]
+    statements.clear()
+
+    # migrating again has no effect
+    migrateSchema(original)
+    assert objects(original) == objects(conn)
+
+
+def test_newer_databases_rejected(conn):
+    fetchAll(conn, f"PRAGMA user_version = {SCHEMA_VERSION + 1} ;")
+
+    with pytest.raises(DatabaseError, match="not supported"):
+        migrateSchema(conn)
+
+
+def test_failed_migration_rolled_back(original, monkeypatch):
+    before = objects(original)
+    migrations = Schema.MIGRATIONS + [["CREATE TABLE broken (x ;"]]
+    monkeypatch.setattr(Schema, "MIGRATIONS", migrations)
+    monkeypatch.setattr(Schema, "SCHEMA_VERSION", len(migrations))
+
+    with pytest.raises(DatabaseError):
+        migrateSchema(original)
+
+    assert schemaVersion(original) == 0
+    assert objects(original) == before
@@ -0,0 +1,63 @@
+"""Tests of the full-text search of the justifications."""
+
+import pytest
+
+from conftest import fetchAll, insertExpenses
+from modules.Search import matchExpression, searchClause
+
+
+EXPENSES = [
+    ("2024-01-01", "a", 1.0, "Café in Roma"),
+    ("2024-01-02", "b", 2.0, "train tickets to Milano"),
+    ("2024-01-03", "a", 3.0, "cafeteria, AND more"),
+    ("2024-01-04", "c", 4.0, 'the "best" pizza'),
+]
+
+
+def search(conn, text: str) -> list[int]:
+    """Return the ids of the expenses matching a text."""
+    clause, params = searchClause(text)
+    return [
+        rowId
+        for rowId, in fetchAll(
+            conn,
+            f"SELECT id FROM expenses WHERE {clause} ORDER BY id ;",
+            params,
+        )
+    ]
+
+
+def test_matchExpression():
+    assert matchExpression(None) is None
+    assert matchExpression("  - ") is None
+    assert matchExpression('caf "x') == '"caf"* """x"*'
+
+
+@pytest.mark.parametrize(
+    "text, ids",
+    [
+        (None, [1, 2, 3, 4]),
+        ("", [1, 2, 3, 4]),
+        ("cafe", [1, 3]),
+        ("CAFÉ roma", [1]),
+        ("tick mil", [2]),
+        ("and", [3]),
+        ("OR NOT", []),
+        ('"best"', [4]),
+        ("pizza*", [4]),
+    ],
+)
+def test_search(conn, text, ids):
+    insertExpenses(conn, EXPENSES)
+    assert search(conn, text) == ids
+
+
+def test_index_follows_changes(conn):
+    insertExpenses(conn, EXPENSES)
+
+    fetchAll(conn, "UPDATE expenses SET justification = 'bus' WHERE id = 2 ;")
+    fetchAll(conn, "DELETE FROM expenses WHERE id = 1 ;")
+
+    assert search(conn, "cafe") == [3]
+    assert search(conn, "train") == []
+    assert search(conn, "bus") == [2]
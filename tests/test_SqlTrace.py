@@ -0,0 +1,86 @@
+"""Tests of the timing of the SQL statements."""
+
+import json
+from collections import deque
+
+import pytest
+from PyQt6.QtSql import QSqlQuery
+
+from modules import SqlTrace
+from modules.Database import DatabaseError
+
+
+@pytest.fixture
+def tracing(monkeypatch):
+    """Enable tracing, in a ring buffer of three statements."""
+    monkeypatch.setattr(SqlTrace, "_records", deque(maxlen=3))
+
+
+def test_disabled(conn, monkeypatch):
+    monkeypatch.setattr(SqlTrace, "_records", None)
+
+    def operation():
+        pass
+
+    assert not SqlTrace.enabled()
+    assert SqlTrace.traced(operation) is operation
+
+    assert SqlTrace.execQuery(QSqlQuery(conn), "SELECT 1 ;")
+    assert SqlTrace.records() == []
+
+
+def test_records_statements(conn, tracing):
+    @SqlTrace.traced
+    def count():
+        query = QSqlQuery(conn)
+        SqlTrace.execQuery(query, "SELECT   COUNT(*)\n FROM expenses ;")
+        SqlTrace.fetched(1, 0.5)
+        query.finish()
+
+    count()
+    SqlTrace.execQuery(QSqlQuery(conn), "SELECT * FROM missing ;")
+
+    first, second = SqlTrace.records()
+    assert first["operation"].endswith("count")
+    assert first["sql"] == "SELECT COUNT(*) FROM expenses ;"
+    assert (first["rows"], first["fetchSeconds"], first["ok"]) == (1, 0.5, True)
+    assert second["operation"] is None
+    assert second["ok"] is False
+
+
+def test_ring_buffer_keeps_last_statements(conn, tracing):
+    query = QSqlQuery(conn)
+    for i in range(5):
+        SqlTrace.execQuery(query, f"SELECT {i} ;")
+
+    assert [r["sql"] for r in SqlTrace.records()] == [
+        "SELECT 2 ;",
+        "SELECT 3 ;",
+        "SELECT 4 ;",
+    ]
+
+    SqlTrace.clear()
+    assert SqlTrace.records() == []
+
+
+def test_batches_record_rows(conn, tracing):
+    query = QSqlQuery(conn)
+    query.prepare(
+        "INSERT INTO expenses (date, type, amount, justification) VALUES (?, ?, ?, ?) ;"
+    )
+    for column in (["2024-01-01"] * 2, ["a", "b"], [1.0, 2.0], ["x", "y"]):
+        query.addBindValue(column)
+
+    assert SqlTrace.execBatch(query, 2)
+    assert SqlTrace.records()[-1]["rows"] == 2
+
+
+def test_dump(conn, tracing, tmp_path):
+    SqlTrace.execQuery(QSqlQuery(conn), "SELECT 1 ;")
+
+    filename = tmp_path / "trace.json"
+    SqlTrace.dump(str(filename))
+    assert json.loads(filename.read_text()) == SqlTrace.records()
+
+    with pytest.raises(DatabaseError):
+        SqlTrace.dump(str(tmp_path / "missing" / "trace.json"))
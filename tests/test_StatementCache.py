@@ -0,0 +1,74 @@
+"""Tests of the cache of prepared statements."""
+
+import pytest
+
+from conftest import insertExpenses
+from modules import StatementCache as StatementCacheModule
+from modules.Database import DatabaseError
+from modules.StatementCache import StatementCache
+
+
+COUNT = "SELECT COUNT(*) FROM expenses WHERE date BETWEEN ? AND ? ;"
+
+
+def count(statements, dates: list[str]) -> int:
+    """Count the expenses between two dates."""
+    query = statements.exec(COUNT, dates)
+    query.next()
+    value = query.value(0)
+    query.finish()
+    return value
+
+
+@pytest.fixture
+def statements(conn):
+    """Cache of statements of a database with three expenses."""
+    insertExpenses(
+        conn,
+        [
+            ("2024-01-01", "a", 1.0, "x"),
+            ("2024-02-01", "a", 2.0, "y"),
+            ("2024-03-01", "b", 3.0, "z"),
+        ],
+    )
+    cache = StatementCache(conn)
+
+    yield cache
+
+    cache.clear()
+
+
+def test_statements_prepared_once(statements):
+    assert count(statements, ["2024-01-01", "2024-12-31"]) == 3
+    assert count(statements, ["2024-02-01", "2024-02-28"]) == 1
+    assert count(statements, ["2025-01-01", "2025-12-31"]) == 0
+
+    assert statements.stats() == {"hits": 2, "misses": 1, "size": 1}
+
+
+def test_values_are_bound(statements):
+    # a quote in a value is not SQL
+    assert count(statements, ["2024-01-01", "2024' OR '1' = '1"]) == 0
+
+
+def test_least_recently_used_evicted(statements, monkeypatch):
+    monkeypatch.setattr(StatementCacheModule, "MAX_STATEMENTS", 2)
+
+    for sql in ["SELECT 1 ;", "SELECT 2 ;", "SELECT 1 ;", "SELECT 3 ;"]:
+        statements.exec(sql).finish()
+    assert statements.stats() == {"hits": 1, "misses": 3, "size": 2}
+
+    # "SELECT 2" was evicted, "SELECT 1" kept
+    statements.exec("SELECT 1 ;").finish()
+    statements.exec("SELECT 2 ;").finish()
+    assert statements.stats() == {"hits": 2, "misses": 4, "size": 2}
+
+
+def test_errors(statements):
+    with pytest.raises(DatabaseError):
+        statements.exec("SELECT * FROM missing ;")
+    with pytest.raises(DatabaseError):
+        statements.exec("INSERT INTO expenses (type) VALUES (?) ;", ["long"])
+
+    statements.clear()
+    assert statements.stats()["size"] == 0
@@ -0,0 +1,139 @@
+"""Tests of the expense summaries, against the raw expenses."""
+
+import random
+
+from conftest import fetchAll, insertExpenses
+from modules.StatementCache import StatementCache
+from modules.Summary import periodSummary, typeSummary
+
+
+def randomExpenses(count: int, seed: int = 0) -> list[tuple]:
+    """Return random expenses of 2024, with 2- to 4-decimal amounts."""
+    rng = random.Random(seed)
+    return [
+        (
+            f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            rng.choice("abcde"),
+            round(rng.uniform(-50.0, 500.0), rng.choice([2, 2, 3, 4])),
+            "",
+        )
+        for _ in range(count)
+    ]
+
+
+def rawTotals(conn, dates: list[str] = None) -> list[tuple[str, float]]:
+    """Totals by type of the raw expenses."""
+    flt, params = "TRUE", []
+    if dates is not None:
+        flt, params = "date BETWEEN ? AND ?", dates
+
+    return fetchAll(
+        conn,
+        f"""
+        SELECT type, SUM(amount) FROM expenses WHERE {flt}
+        GROUP BY type ORDER BY type ;
+    """,
+        params,
+    )
+
+
+def test_rollup_matches_expenses(conn):
+    insertExpenses(conn, randomExpenses(20000))
+    statements = StatementCache(conn)
+
+    assert typeSummary(statements) == rawTotals(conn)
+
+    dates = ["2024-03-01", "2024-06-30"]
+    assert typeSummary(statements, dates) == rawTotals(conn, dates)
+
+    statements.clear()
+
+
+def test_search_matches_rollup(conn):
+    # the search reads the expenses, not the rollup
+    insertExpenses(conn, randomExpenses(2000))
+    insertExpenses(conn, [("2024-05-05", "a", 0.1, "zzz")] * 3)
+    statements = StatementCache(conn)
+
+    found = typeSummary(statements, search="zzz")
+    assert found == fetchAll(
+        conn,
+        "SELECT 'a', SUM(amount) FROM expenses WHERE justification = 'zzz' ;",
+    )
+
+    types, rows = periodSummary(statements, "year")
+    assert dict(zip(types, rows[0][1])) == dict(typeSummary(statements))
+
+    statements.clear()
+
+
+def test_rollup_exact_after_changes(conn):
+    insertExpenses(conn, randomExpenses(20000))
+    statements = StatementCache(conn)
+
+    fetchAll(conn, "DELETE FROM expenses WHERE id % 3 = 0 ;")
+    fetchAll(
+        conn, "UPDATE expenses SET amount = amount + 0.07 WHERE id % 5 = 0 ;"
+    )
+    fetchAll(
+        conn,
+        "UPDATE expenses SET date = '2024-04-01', type = 'e' WHERE id % 7 = 0 ;",
+    )
+
+    assert typeSummary(statements) == rawTotals(conn)
+
+    dates = ["2024-03-01", "2024-06-30"]
+    assert typeSummary(statements, dates) == rawTotals(conn, dates)
+
+    # emptied buckets are dropped
+    fetchAll(conn, "DELETE FROM expenses ;")
+    assert fetchAll(conn, "SELECT COUNT(*) FROM expense_rollup ;") == [(0,)]
+    assert typeSummary(statements) == []
+
+    statements.clear()
+
+
+def test_sub_cent_amounts(conn):
+    insertExpenses(
+        conn,
+        [("2024-01-01", "a", 0.004, "")] * 3 + [("2024-01-02", "b", 1.005, "")],
+    )
+    statements = StatementCache(conn)
+
+    assert (
+        typeSummary(statements)
+        == rawTotals(conn)
+        == [
+            ("a", 0.012),
+            ("b", 1.005),
+        ]
+    )
+
+    types, rows = periodSummary(statements, "month")
+    assert (types, rows) == (["a", "b"], [("2024-01", [0.012, 1.005])])
+
+    statements.clear()
+
+
+def test_inexact_amounts_read_expenses(conn):
+    # amounts the rollup cannot keep exactly, too small or too
+    # large, are totalled from the expenses
+    insertExpenses(conn, randomExpenses(2000))
+    insertExpenses(
+        conn,
+        [("2024-02-02", "a", 1e-9, ""), ("2024-03-03", "b", 1e15, "")],
+    )
+    statements = StatementCache(conn)
+
+    assert fetchAll(conn, "SELECT SUM(inexact) FROM expense_rollup ;") == [(2,)]
+    assert typeSummary(statements) == rawTotals(conn)
+
+    # dates without them are still read from the rollup
+    dates = ["2024-04-01", "2024-12-31"]
+    assert typeSummary(statements, dates) == rawTotals(conn, dates)
+
+    fetchAll(conn, "DELETE FROM expenses WHERE amount IN (1e-9, 1e15) ;")
+    assert fetchAll(conn, "SELECT SUM(inexact) FROM expense_rollup ;") == [(0,)]
+    assert typeSummary(statements) == rawTotals(conn)
+
+    statements.clear()
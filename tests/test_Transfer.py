@@ -0,0 +1,176 @@
+"""Tests of the transfers between databases and data files."""
+
+import csv
+
+import pytest
+from PyQt6.QtSql import QSqlQuery
+
+from conftest import fetchAll
+from modules import Transfer
+from modules.Database import DatabaseError
+from modules.Transfer import (
+    TransferCancelled,
+    _insertChunk,
+    importCSV,
+    importCSVParallel,
+)
+from modules.TransferWorker import TransferWorker
+
+
+def insertQuery(conn) -> QSqlQuery:
+    """Return the prepared statement of the imports."""
+    query = QSqlQuery(conn)
+    query.prepare(
+        """
+        INSERT INTO expenses (id, date, type, amount, justification)
+        VALUES (?, ?, ?, ?, ?) ;
+    """
+    )
+    return query
+
+
+def contents(conn) -> list[tuple]:
+    """Return all the expenses, sorted by id."""
+    return fetchAll(
+        conn,
+        """
+        SELECT id, date, type, amount, justification
+        FROM expenses ORDER BY id ;
+    """,
+    )
+
+
+# (line number, row) pairs, lines 3 and 5 invalid
+CHUNK = [
+    (1, ["", "2024-01-01", "a", 1.5, "first"]),
+    (2, ["", "2024-01-02", "b", 2.5, "second"]),
+    (3, ["", "2024-13-01", "c", 3.5, "bad date"]),
+    (4, ["", "2024-01-04", "d", 4.5, "fourth"]),
+    (5, ["", "2024-01-05", "ee", 5.5, "bad type"]),
+]
+
+
+def test_insertChunk_replays_invalid_rows(conn):
+    query = insertQuery(conn)
+    rejects = []
+
+    conn.transaction()
+    assert _insertChunk(conn, query, CHUNK, rejects) == 3
+    conn.commit()
+    query.finish()
+
+    assert [line for line, _, _ in rejects] == [3, 5]
+    assert [row for _, _, row in rejects] == [CHUNK[2][1], CHUNK[4][1]]
+    assert [row[4] for row in contents(conn)] == ["first", "second", "fourth"]
+
+
+def test_insertChunk_raises_on_first_invalid_row(conn):
+    query = insertQuery(conn)
+
+    conn.transaction()
+    with pytest.raises(DatabaseError, match="row 3"):
+        _insertChunk(conn, query, CHUNK)
+    conn.rollback()
+    query.finish()
+
+    assert contents(conn) == []
+
+
+def test_insertChunk_rejects_wrong_lengths(conn):
+    query = insertQuery(conn)
+    rejects = []
+    chunk = CHUNK[:2] + [(6, ["", "2024-01-06", "f"]), CHUNK[3]]
+
+    conn.transaction()
+    assert _insertChunk(conn, query, chunk, rejects) == 3
+    conn.commit()
+    query.finish()
+
+    assert rejects == [(6, "Expected 5 fields, found 3", chunk[2][1])]
+    assert [row[4] for row in contents(conn)] == ["first", "second", "fourth"]
+
+
+def test_importCSVParallel_writes_rejects(conn, tmp_path):
+    data = tmp_path / "data.csv"
+    data.write_text(
+        ",2024-01-01,a,1.5,ok\n,2024-13-01,b,2.0,bad\n,2024-01-03,c\n",
+        encoding="utf-8",
+    )
+    rejects = tmp_path / "rejects.csv"
+
+    assert importCSVParallel(conn, str(data), str(rejects), jobs=1) == (1, 2)
+    with open(rejects, newline="", encoding="utf-8") as csvfile:
+        assert [row[0] for row in csv.reader(csvfile)][1:] == ["2", "3"]
+    assert not (tmp_path / "rejects.csv.part").exists()
+
+
+def test_importCSVParallel_removes_partial_rejects(conn, tmp_path):
+    data = tmp_path / "data.csv"
+    data.write_text(",2024-13-01,a,1.5,bad\n", encoding="utf-8")
+    rejects = tmp_path / "rejects.csv"
+
+    def cancel(_rows, _read):
+        raise TransferCancelled()
+
+    with pytest.raises(TransferCancelled):
+        importCSVParallel(conn, str(data), str(rejects), cancel, jobs=1)
+
+    assert not rejects.exists()
+    assert not (tmp_path / "rejects.csv.part").exists()
+    assert contents(conn) == []
+
+
+def writeRows(filename, count: int, invalid: int = None):
+    """Write a CSV file of expenses, one of them invalid if given."""
+    lines = [
+        f",2024-01-{line % 28 + 1:02d},{'bad' if line == invalid else 'a'},"
+        f"{line}.5,row {line}"
+        for line in range(1, count + 1)
+    ]
+    filename.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_importCSV_in_chunks(conn, tmp_path, monkeypatch):
+    monkeypatch.setattr(Transfer, "IMPORT_CHUNK_SIZE", 4)
+    data = tmp_path / "data.csv"
+    writeRows(data, 10)
+    progress = []
+
+    assert (
+        importCSV(conn, str(data), lambda rows, _: progress.append(rows)) == 10
+    )
+    # the last, partial chunk is not reported
+    assert progress == [4, 8]
+    assert [row[4] for row in contents(conn)] == [
+        f"row {line}" for line in range(1, 11)
+    ]
+
+
+def test_importCSV_rolls_back_invalid_rows(conn, tmp_path, monkeypatch):
+    monkeypatch.setattr(Transfer, "IMPORT_CHUNK_SIZE", 4)
+    data = tmp_path / "data.csv"
+    writeRows(data, 10, invalid=7)
+
+    # the first chunk is rolled back with the second
+    with pytest.raises(DatabaseError, match="row 7"):
+        importCSV(conn, str(data))
+    assert contents(conn) == []
+
+
+def test_importCSV_rolls_back_undecodable_files(conn, tmp_path):
+    latin = tmp_path / "latin.csv"
+    latin.write_bytes(b",2024-01-01,a,1.5,ok\n,2024-01-02,b,2.0,caf\xe9\n")
+
+    with pytest.raises(DatabaseError, match="Invalid file content"):
+        importCSV(conn, str(latin))
+
+    # no transaction left open
+    valid = tmp_path / "valid.csv"
+    valid.write_text(",2024-01-01,a,1.5,ok\n", encoding="utf-8")
+    assert importCSV(conn, str(valid)) == 1
+    assert len(contents(conn)) == 1
+
+
+def test_transfer_worker_is_abstract():
+    with pytest.raises(TypeError, match="abstract"):
+        TransferWorker("test.db", "Transfer", "compat")
@@ -0,0 +1,143 @@
+"""Tests of the command-line interface: exit codes and output."""
+
+import json
+
+import pytest
+
+from modules.Schema import SCHEMA_VERSION
+from modules.cli import EXIT_ERROR, EXIT_OK, EXIT_USAGE, main
+
+
+# id, date, type, amount, justification
+EXPENSES = [
+    "1,2024-01-05,a,10.5,x",
+    "2,2024-02-10,b,3.25,y",
+    "3,2024-02-11,a,0.004,z",
+]
+
+
+def run(capsys, argv: list[str]) -> tuple[int, dict, dict]:
+    """Run the CLI, returning the exit code and the parsed outputs."""
+    code = main(argv)
+    out, err = capsys.readouterr()
+    return code, json.loads(out or "null"), json.loads(err or "null")
+
+
+@pytest.fixture
+def database(app, tmp_path, capsys) -> str:
+    """Path of a database with EXPENSES, imported by the CLI."""
+    data = tmp_path / "data.csv"
+    data.write_text("\n".join(EXPENSES) + "\n", encoding="utf-8")
+
+    filename = str(tmp_path / "test.db")
+    argv = ["--profile", "compat", "import", filename, str(data), "--create"]
+    assert run(capsys, argv) == (EXIT_OK, {"imported": 3}, None)
+
+    return filename
+
+
+def test_summary_prints_totals(database, capsys):
+    code, out, _ = run(capsys, ["summary", database, "--by", "month"])
+
+    assert code == EXIT_OK
+    assert out == {
+        "from": "0001-01-01",
+        "to": "9999-12-31",
+        "totals": [{"type": "a", "sum": 10.504}, {"type": "b", "sum": 3.25}],
+        "by": "month",
+        "periods": [
+            {"period": "2024-01", "totals": {"a": 10.5, "b": 0.0}},
+            {"period": "2024-02", "totals": {"a": 0.004, "b": 3.25}},
+        ],
+    }
+
+
+def test_summary_dates(database, capsys):
+    argv = ["summary", database, "--from", "2024-02-01", "--to", "2024-02-10"]
+    code, out, _ = run(capsys, argv)
+
+    assert code == EXIT_OK
+    assert out["totals"] == [{"type": "b", "sum": 3.25}]
+
+
+def test_import_rejects(database, tmp_path, capsys):
+    data = tmp_path / "more.csv"
+    data.write_text(",2024-03-01,a,1.0,ok\n,2024-03-02,b\n", encoding="utf-8")
+    rejects = tmp_path / "rejects.csv"
+
+    argv = ["import", database, str(data), "--rejects", str(rejects)]
+    assert run(capsys, argv + ["--jobs", "1"]) == (
+        EXIT_OK,
+        {"imported": 1, "rejected": 1},
+        None,
+    )
+    assert rejects.read_text(encoding="utf-8").splitlines()[1:] == [
+        '2,"Expected 5 fields, found 3",,2024-03-02,b'
+    ]
+
+
+def test_export_round_trip(database, tmp_path, capsys):
+    first = tmp_path / "first.csv"
+    assert run(capsys, ["export", database, str(first)]) == (
+        EXIT_OK,
+        {"exported": 3},
+        None,
+    )
+
+    copy = str(tmp_path / "copy.db")
+    argv = ["import", copy, str(first), "--create"]
+    assert run(capsys, argv) == (EXIT_OK, {"imported": 3}, None)
+
+    second = tmp_path / "second.csv"
+    argv = ["export", copy, str(second), "--from", "2024-02-01"]
+    assert run(capsys, argv) == (EXIT_OK, {"exported": 2}, None)
+    assert second.read_text().splitlines() == first.read_text().splitlines()[1:]
+
+
+def test_stats(database, capsys):
+    code, out, _ = run(capsys, ["stats", database])
+
+    assert code == EXIT_OK
+    assert out["expenses"] == 3
+    assert (out["first"], out["last"]) == ("2024-01-05", "2024-02-11")
+    assert out["schema_version"] == SCHEMA_VERSION
+    assert out["settings"]["journal_mode"] == "wal"
+
+
+def test_import_errors(database, tmp_path, capsys):
+    data = tmp_path / "bad.csv"
+    data.write_text(",2024-03-01,a,1.0,ok\n,2024-03-02,long,1.0,x\n")
+
+    code, out, err = run(capsys, ["import", database, str(data)])
+    assert (code, out) == (EXIT_ERROR, None)
+    assert "row 2" in err["error"]
+
+    # the valid row is rolled back
+    assert run(capsys, ["stats", database])[1]["expenses"] == 3
+
+
+def test_database_errors(tmp_path, app, capsys):
+    code, out, err = run(capsys, ["summary", str(tmp_path / "none.db")])
+
+    assert code == EXIT_ERROR
+    assert out is None
+    assert err == {"error": "Database does not exists"}
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["summary", "test.db", "--csv", "out.csv"],
+        ["summary", "test.db", "--from", "2024-13-01"],
+        ["export", "test.db", "out.csv", "--to", "yesterday"],
+        ["summary", "test.db", "--by", "day"],
+        ["--profile", "fast", "stats", "test.db"],
+        ["import", "test.db", "data.csv", "--jobs", "2"],
+    ],
+)
+def test_usage_errors(argv, capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(argv)
+
+    assert exc.value.code == EXIT_USAGE
+    assert "error:" in capsys.readouterr().err